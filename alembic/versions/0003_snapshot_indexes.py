@@ -0,0 +1,57 @@
+"""snapshot read-path indexes
+
+Revision ID: 0003_snapshot_indexes
+Revises: 0002_add_urls_json
+
+Builds the composite indexes used by the latest/history and best-price queries.
+Both are created CONCURRENTLY so the migration does not block scraper writes;
+Postgres refuses to do that inside a transaction, hence the autocommit block.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0003_snapshot_indexes'
+down_revision: str = '0002_add_urls_json'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_snapshots_product_id_captured_at',
+            'snapshots',
+            ['product_id', sa.text('captured_at DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            'ix_snapshots_product_id_price_captured_at',
+            'snapshots',
+            ['product_id', 'price', sa.text('captured_at DESC')],
+            postgresql_where=sa.text('price IS NOT NULL'),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_snapshots_product_id_price_captured_at',
+            table_name='snapshots',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            'ix_snapshots_product_id_captured_at',
+            table_name='snapshots',
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
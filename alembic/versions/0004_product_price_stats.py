@@ -0,0 +1,79 @@
+"""product price stats
+
+Revision ID: 0004_product_price_stats
+Revises: 0003_snapshot_indexes
+
+Adds the per-product price summary maintained by app.crud on every snapshot insert and
+backfills it from the existing snapshots.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0004_product_price_stats'
+down_revision: str = '0003_snapshot_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_price_stats',
+        sa.Column(
+            'product_id',
+            sa.Integer(),
+            sa.ForeignKey('products.id', ondelete='CASCADE'),
+            primary_key=True,
+        ),
+        sa.Column('snapshot_count', sa.Integer(), nullable=False),
+        sa.Column('latest_snapshot_id', sa.Integer(), nullable=True),
+        sa.Column('latest_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('last_captured_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('min_snapshot_id', sa.Integer(), nullable=True),
+        sa.Column('min_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('min_captured_at', sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column('max_snapshot_id', sa.Integer(), nullable=True),
+        sa.Column('max_price', sa.Numeric(10, 2), nullable=True),
+        sa.Column('max_captured_at', sa.TIMESTAMP(timezone=True), nullable=True),
+    )
+    op.execute(
+        """
+        INSERT INTO product_price_stats (
+            product_id, snapshot_count,
+            latest_snapshot_id, latest_price, last_captured_at,
+            min_snapshot_id, min_price, min_captured_at,
+            max_snapshot_id, max_price, max_captured_at
+        )
+        SELECT c.product_id, c.snapshot_count,
+               l.id, l.price, l.captured_at,
+               lo.id, lo.price, lo.captured_at,
+               hi.id, hi.price, hi.captured_at
+        FROM (
+            SELECT product_id, count(*) AS snapshot_count FROM snapshots GROUP BY product_id
+        ) AS c
+        JOIN (
+            SELECT DISTINCT ON (product_id) product_id, id, price, captured_at
+            FROM snapshots
+            ORDER BY product_id, captured_at DESC, id DESC
+        ) AS l ON l.product_id = c.product_id
+        LEFT JOIN (
+            SELECT DISTINCT ON (product_id) product_id, id, price, captured_at
+            FROM snapshots WHERE price IS NOT NULL
+            ORDER BY product_id, price, captured_at DESC, id DESC
+        ) AS lo ON lo.product_id = c.product_id
+        LEFT JOIN (
+            SELECT DISTINCT ON (product_id) product_id, id, price, captured_at
+            FROM snapshots WHERE price IS NOT NULL
+            ORDER BY product_id, price DESC, captured_at DESC, id DESC
+        ) AS hi ON hi.product_id = c.product_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_price_stats')
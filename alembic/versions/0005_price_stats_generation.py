@@ -0,0 +1,31 @@
+"""price stats generation
+
+Revision ID: 0005_price_stats_generation
+Revises: 0004_product_price_stats
+
+Adds the per-product write generation used to build ETags for conditional GETs.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0005_price_stats_generation'
+down_revision: str = '0004_product_price_stats'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'product_price_stats',
+        sa.Column('generation', sa.Integer(), nullable=False, server_default='1'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('product_price_stats', 'generation')
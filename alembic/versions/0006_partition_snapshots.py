@@ -0,0 +1,94 @@
+"""partition snapshots by month
+
+Revision ID: 0006_partition_snapshots
+Revises: 0005_price_stats_generation
+
+Rebuilds snapshots as a RANGE-partitioned table on captured_at with one partition per
+month plus a DEFAULT partition. Postgres requires the partition key in every unique
+constraint, so the primary key becomes (id, captured_at); ids still come from the
+original sequence and stay unique. Existing rows are copied under an exclusive lock, so
+run this in a maintenance window on large tables. Partitions are pre-created through
+PARTITION_MONTHS_AHEAD months after the migration date; scripts/manage_partitions.py
+keeps that horizon moving afterwards.
+"""
+
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+from app.partitions import add_months, create_partition_sql, month_start, months_between
+
+revision: str = '0006_partition_snapshots'
+down_revision: str = '0005_price_stats_generation'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITION_MONTHS_AHEAD = 3
+_COLUMNS = 'id, product_id, title, price, urls, captured_at'
+
+
+def _create_indexes() -> None:
+    op.create_index(
+        'ix_snapshots_product_id_captured_at',
+        'snapshots',
+        ['product_id', sa.text('captured_at DESC')],
+    )
+    op.create_index(
+        'ix_snapshots_product_id_price_captured_at',
+        'snapshots',
+        ['product_id', 'price', sa.text('captured_at DESC')],
+        postgresql_where=sa.text('price IS NOT NULL'),
+    )
+
+
+def _snapshot_table_sql(name: str, primary_key: str, suffix: str = '') -> str:
+    return f"""
+        CREATE TABLE {name} (
+            id integer NOT NULL DEFAULT nextval('snapshots_id_seq'),
+            product_id integer NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+            title text NOT NULL,
+            price numeric(10, 2),
+            urls json,
+            captured_at timestamptz NOT NULL DEFAULT now(),
+            PRIMARY KEY ({primary_key})
+        ){suffix}
+    """
+
+
+def _swap_in(primary_key: str, suffix: str) -> None:
+    """Move the current table aside and create an empty replacement named snapshots."""
+    op.execute('LOCK TABLE snapshots IN ACCESS EXCLUSIVE MODE')
+    op.execute('ALTER TABLE snapshots RENAME TO snapshots_old')
+    op.execute('ALTER TABLE snapshots_old RENAME CONSTRAINT snapshots_pkey TO snapshots_old_pkey')
+    op.drop_index('ix_snapshots_product_id_price_captured_at', table_name='snapshots_old')
+    op.drop_index('ix_snapshots_product_id_captured_at', table_name='snapshots_old')
+    op.execute(_snapshot_table_sql('snapshots', primary_key, suffix))
+
+
+def _copy_and_drop_old() -> None:
+    op.execute(f'INSERT INTO snapshots ({_COLUMNS}) SELECT {_COLUMNS} FROM snapshots_old')
+    op.execute('ALTER SEQUENCE snapshots_id_seq OWNED BY snapshots.id')
+    op.execute('DROP TABLE snapshots_old')
+    _create_indexes()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _swap_in('id, captured_at', ' PARTITION BY RANGE (captured_at)')
+    op.execute('CREATE TABLE snapshots_default PARTITION OF snapshots DEFAULT')
+
+    today = datetime.now(timezone.utc).date()
+    oldest = op.get_bind().scalar(sa.text('SELECT min(captured_at) FROM snapshots_old'))
+    first = month_start(oldest.date()) if oldest is not None else month_start(today)
+    for month in months_between(first, add_months(month_start(today), PARTITION_MONTHS_AHEAD)):
+        op.execute(create_partition_sql(month))
+
+    _copy_and_drop_old()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _swap_in('id', '')
+    _copy_and_drop_old()
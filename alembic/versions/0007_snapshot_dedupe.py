@@ -0,0 +1,34 @@
+"""snapshot dedupe columns
+
+Revision ID: 0007_snapshot_dedupe
+Revises: 0006_partition_snapshots
+
+Adds content_hash and last_seen_at so unchanged captures extend the previous row instead of
+inserting a new one. Existing rows keep a NULL hash and are never extended; the next capture
+of each item starts a new run.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0007_snapshot_dedupe'
+down_revision: str = '0006_partition_snapshots'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('snapshots', sa.Column('content_hash', sa.String(64), nullable=True))
+    op.add_column(
+        'snapshots', sa.Column('last_seen_at', sa.TIMESTAMP(timezone=True), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('snapshots', 'last_seen_at')
+    op.drop_column('snapshots', 'content_hash')
@@ -0,0 +1,66 @@
+"""interned snapshot urls
+
+Revision ID: 0008_interned_urls
+Revises: 0007_snapshot_dedupe
+
+Moves snapshot URLs out of the per-row JSON array. Each distinct URL is stored once in urls
+(unique on its SHA-256 hash), and snapshot_urls links snapshots to them in order. Existing
+arrays are backfilled before snapshots.urls is dropped. The hash is computed in SQL with
+sha256(), which requires Postgres 11 or newer, and matches app.urls.url_hash.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0008_interned_urls'
+down_revision: str = '0007_snapshot_dedupe'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_URL_HASH = "encode(sha256(convert_to(u.url, 'UTF8')), 'hex')"
+_ELEMENTS = (
+    'FROM snapshots s '
+    'CROSS JOIN LATERAL json_array_elements_text(s.urls) WITH ORDINALITY AS u(url, position)'
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'urls',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('url_hash', sa.String(64), nullable=False, unique=True),
+        sa.Column('url', sa.Text(), nullable=False),
+    )
+    op.create_table(
+        'snapshot_urls',
+        sa.Column('snapshot_id', sa.Integer(), primary_key=True),
+        sa.Column('position', sa.Integer(), primary_key=True),
+        sa.Column('url_id', sa.Integer(), sa.ForeignKey('urls.id'), nullable=False),
+    )
+    op.execute(
+        f'INSERT INTO urls (url_hash, url) SELECT DISTINCT {_URL_HASH}, u.url {_ELEMENTS} '
+        'ON CONFLICT (url_hash) DO NOTHING'
+    )
+    op.execute(
+        'INSERT INTO snapshot_urls (snapshot_id, position, url_id) '
+        f'SELECT s.id, u.position - 1, urls.id {_ELEMENTS} '
+        f'JOIN urls ON urls.url_hash = {_URL_HASH}'
+    )
+    op.drop_column('snapshots', 'urls')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('snapshots', sa.Column('urls', sa.JSON(), nullable=True))
+    op.execute(
+        'UPDATE snapshots s SET urls = agg.urls FROM ('
+        '  SELECT l.snapshot_id, json_agg(urls.url ORDER BY l.position) AS urls'
+        '  FROM snapshot_urls l JOIN urls ON urls.id = l.url_id GROUP BY l.snapshot_id'
+        ') agg WHERE agg.snapshot_id = s.id'
+    )
+    op.drop_table('snapshot_urls')
+    op.drop_table('urls')
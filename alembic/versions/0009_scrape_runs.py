@@ -0,0 +1,67 @@
+"""scrape runs
+
+Revision ID: 0009_scrape_runs
+Revises: 0008_interned_urls
+
+Adds scrape_runs and snapshots.run_id so the newest run of a product, and every item it
+returned, can be fetched through indexes. Existing snapshots have no run; /latest falls back
+to the single most recent snapshot for them.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0009_scrape_runs'
+down_revision: str = '0008_interned_urls'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'scrape_runs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column(
+            'product_id',
+            sa.Integer(),
+            sa.ForeignKey('products.id', ondelete='CASCADE'),
+            nullable=False,
+        ),
+        sa.Column(
+            'started_at',
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.text('NOW()'),
+            nullable=False,
+        ),
+        sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('duration_ms', sa.Integer(), nullable=True),
+        sa.Column('model', sa.Text(), nullable=True),
+    )
+    op.create_index(
+        'ix_scrape_runs_product_id_started_at',
+        'scrape_runs',
+        ['product_id', sa.text('started_at DESC'), sa.text('id DESC')],
+    )
+    op.add_column(
+        'snapshots',
+        sa.Column(
+            'run_id',
+            sa.Integer(),
+            sa.ForeignKey('scrape_runs.id', ondelete='SET NULL'),
+            nullable=True,
+        ),
+    )
+    # Partitioned parents cannot be indexed CONCURRENTLY; run_id starts out all NULL anyway.
+    op.create_index('ix_snapshots_run_id', 'snapshots', ['run_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_snapshots_run_id', table_name='snapshots')
+    op.drop_column('snapshots', 'run_id')
+    op.drop_index('ix_scrape_runs_product_id_started_at', table_name='scrape_runs')
+    op.drop_table('scrape_runs')
@@ -0,0 +1,29 @@
+"""product refresh interval
+
+Revision ID: 0010_product_refresh_interval
+Revises: 0009_scrape_runs
+
+Adds products.refresh_interval_minutes for the refresh scheduler. NULL uses the scheduler's
+default interval and 0 turns automatic refreshes off for the product.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0010_product_refresh_interval'
+down_revision: str = '0009_scrape_runs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('refresh_interval_minutes', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'refresh_interval_minutes')
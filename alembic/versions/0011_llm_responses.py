@@ -0,0 +1,41 @@
+"""llm response cache
+
+Revision ID: 0011_llm_responses
+Revises: 0010_product_refresh_interval
+
+Adds llm_responses, a cache of parsed model output keyed by model, system prompt and
+normalized user prompt, with an index on last_used_at for LRU eviction.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0011_llm_responses'
+down_revision: str = '0010_product_refresh_interval'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'llm_responses',
+        sa.Column('cache_key', sa.String(64), primary_key=True),
+        sa.Column('model', sa.Text(), nullable=False),
+        sa.Column('prompt', sa.Text(), nullable=False),
+        sa.Column('items', sa.JSON(), nullable=False),
+        sa.Column('total_tokens', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('last_used_at', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('hit_count', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.create_index('ix_llm_responses_last_used_at', 'llm_responses', ['last_used_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_llm_responses_last_used_at', table_name='llm_responses')
+    op.drop_table('llm_responses')
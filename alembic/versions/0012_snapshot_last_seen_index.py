@@ -0,0 +1,36 @@
+"""snapshot last_seen_at index
+
+Revision ID: 0012_snapshot_last_seen_index
+Revises: 0011_llm_responses
+
+Adds a partial (product_id, last_seen_at) index over extended runs. History and lowest-price
+reads filter on a plain captured_at range, which prunes partitions, and find the older runs
+whose last sighting falls inside the range through this index.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op  # type: ignore[attr-defined]
+
+revision: str = '0012_snapshot_last_seen_index'
+down_revision: str = '0011_llm_responses'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Partitioned parents cannot be indexed CONCURRENTLY; each partition gets its own index.
+    op.create_index(
+        'ix_snapshots_product_id_last_seen_at',
+        'snapshots',
+        ['product_id', 'last_seen_at'],
+        postgresql_where=sa.text('last_seen_at IS NOT NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_snapshots_product_id_last_seen_at', table_name='snapshots')
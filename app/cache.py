@@ -0,0 +1,136 @@
+"""
+In-process read cache for API endpoints.
+
+Bounded LRU with a TTL, keyed by product and query parameters, so repeated dashboard polls
+are answered without touching the database. Entries are invalidated per product when the
+API writes to that product; writes made by other processes (e.g. the scraper) become
+visible once the TTL expires. A load that overlaps an invalidation of its scope is returned to
+its caller but not stored, so a result read before a write is never cached after it.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple, TypeVar
+
+T = TypeVar('T')
+
+# Scope for entries that span products (e.g. product listings); dropped on every write.
+GLOBAL_SCOPE = None
+
+
+class ReadCache:
+    """
+    LRU/TTL cache of endpoint results grouped by product for targeted invalidation.
+
+    :param max_entries: Maximum number of cached results before LRU eviction
+    :param ttl_seconds: Lifetime of a cached result in seconds
+    :param enabled: When False every lookup goes straight to the loader
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._entries: OrderedDict[Tuple[Any, ...], Tuple[float, Any]] = OrderedDict()
+        self._by_product: Dict[Optional[int], Set[Tuple[Any, ...]]] = {}
+        # Bumped per scope on invalidation and for every scope on clear(); a load only stores
+        # its result if neither changed while it ran
+        self._generations: Dict[Optional[int], int] = {}
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> 'ReadCache':
+        """Build a cache configured by READ_CACHE_ENABLED/MAX_ENTRIES/TTL_SECONDS."""
+        return cls(
+            max_entries=int(os.getenv('READ_CACHE_MAX_ENTRIES', '1024')),
+            ttl_seconds=float(os.getenv('READ_CACHE_TTL_SECONDS', '30')),
+            enabled=os.getenv('READ_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no'),
+        )
+
+    async def get_or_load(
+        self,
+        product_id: Optional[int],
+        key: Tuple[Hashable, ...],
+        loader: Callable[[], Awaitable[T]],
+    ) -> T:
+        """
+        Return the cached result for (product_id, key), calling loader on a miss.
+
+        :param product_id: Product the result depends on, or GLOBAL_SCOPE for cross-product data
+        :param key: Endpoint name and query parameters identifying the result
+        :param loader: Coroutine factory producing the result on a miss
+        :return: The cached or freshly loaded result
+        """
+        if not self.enabled:
+            return await loader()
+
+        full_key = (product_id, *key)
+        entry = self._entries.get(full_key)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return entry[1]  # type: ignore[no-any-return]
+
+        self.misses += 1
+        generation = self._generation(product_id)
+        value = await loader()
+        if self._generation(product_id) == generation:
+            self._store(product_id, full_key, value, now + self.ttl_seconds)
+        return value
+
+    def _generation(self, product_id: Optional[int]) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(product_id, 0)
+
+    def _store(
+        self, product_id: Optional[int], full_key: Tuple[Any, ...], value: Any, expires: float
+    ) -> None:
+        self._entries[full_key] = (expires, value)
+        self._entries.move_to_end(full_key)
+        self._by_product.setdefault(product_id, set()).add(full_key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget(old_key)
+            self.evictions += 1
+
+    def _forget(self, full_key: Tuple[Any, ...]) -> None:
+        keys = self._by_product.get(full_key[0])
+        if keys is not None:
+            keys.discard(full_key)
+            if not keys:
+                del self._by_product[full_key[0]]
+
+    def invalidate(self, product_id: Optional[int]) -> None:
+        """Drop every entry for product_id, plus all cross-product entries."""
+        for scope in {product_id, GLOBAL_SCOPE}:
+            for full_key in self._by_product.pop(scope, set()):
+                self._entries.pop(full_key, None)
+            self._generations[scope] = self._generations.get(scope, 0) + 1
+        self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop all entries (counters are kept)."""
+        self._entries.clear()
+        self._by_product.clear()
+        self._generations.clear()
+        self._epoch += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -4,20 +4,89 @@ CRUD operations for Product and Snapshot entities.
 Provides async functions to create, retrieve, and query products and their snapshots.
 """
 
-from datetime import datetime
-from typing import List, Optional
+import hashlib
+import heapq
+import json
+from datetime import datetime, timedelta, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    true,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import aliased, selectinload
 
-from app.models import Product, Snapshot
+from app.downsample import lttb
+from app.models import (
+    LlmResponse,
+    Product,
+    ProductPriceStats,
+    ScrapeRun,
+    Snapshot,
+    SnapshotUrl,
+    Url,
+)
 from app.schemas import (
+    BucketSize,
+    DashboardItem,
+    PriceBucket,
     ProductCreate,
+    ProductListItem,
+    ProductPage,
     ProductRead,
+    ProductRow,
+    ScrapeRunCreate,
+    ScrapeRunRead,
+    SnapshotBase,
     SnapshotCreate,
     SnapshotRead,
+    SnapshotRow,
 )
+from app.urls import url_cache, url_hash
+
+P = TypeVar('P')
+
+# Product columns a caller may select in the paginated listing (``id`` is always returned).
+PRODUCT_LIST_FIELDS = ('name', 'prompt', 'created_at')
+
+
+async def get_product_by_prompt(db: AsyncSession, prompt: str) -> Optional[Product]:
+    """
+    Retrieve the Product scraped with prompt, if there is one.
+
+    :param db: Async database session
+    :param prompt: The unique prompt used as lookup key
+    :return: The Product instance, or None if no product has that prompt
+    """
+    result = await db.execute(select(Product).where(Product.prompt == prompt))
+    return result.scalar_one_or_none()
 
 
 async def get_or_create_product(db: AsyncSession, name: str, prompt: str) -> Product:
@@ -29,8 +98,7 @@ async def get_or_create_product(db: AsyncSession, name: str, prompt: str) -> Pro
     :param prompt: The unique prompt used as lookup key
     :return: The existing or newly created Product instance
     """
-    result = await db.execute(select(Product).where(Product.prompt == prompt))
-    prod = result.scalar_one_or_none()
+    prod = await get_product_by_prompt(db, prompt)
     if prod:
         return prod
 
@@ -41,6 +109,81 @@ async def get_or_create_product(db: AsyncSession, name: str, prompt: str) -> Pro
     return prod
 
 
+async def get_product_prompts(db: AsyncSession) -> List[Tuple[int, str]]:
+    """
+    Return (id, prompt) for every product, falling back to the name when prompt is empty.
+
+    :param db: Async database session
+    :return: One tuple per product, ordered by id
+    """
+    result = await db.execute(
+        select(Product.id, func.coalesce(func.nullif(Product.prompt, ''), Product.name)).order_by(
+            Product.id
+        )
+    )
+    return [(pid, prompt) for pid, prompt in result.all()]
+
+
+async def get_refresh_schedule(
+    db: AsyncSession,
+) -> List[Tuple[int, str, Optional[int], Optional[datetime]]]:
+    """
+    Return what the refresh scheduler needs for every product with refreshes enabled.
+
+    The last refresh is the later of the newest observation in product_price_stats (which
+    includes dedupe-extended captures) and the start of the newest scrape run, so runs that
+    returned no items still count.
+
+    :param db: Async database session
+    :return: (id, prompt, refresh_interval_minutes, last_refreshed_at) per product, by id;
+        the interval is None for products using the scheduler default
+    """
+    last_run = (
+        select(func.max(ScrapeRun.started_at))
+        .where(ScrapeRun.product_id == Product.id)
+        .correlate(Product)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(
+            Product.id,
+            func.coalesce(func.nullif(Product.prompt, ''), Product.name),
+            Product.refresh_interval_minutes,
+            ProductPriceStats.last_captured_at,
+            last_run,
+        )
+        .outerjoin(ProductPriceStats, ProductPriceStats.product_id == Product.id)
+        .where(
+            or_(Product.refresh_interval_minutes.is_(None), Product.refresh_interval_minutes > 0)
+        )
+        .order_by(Product.id)
+    )
+    schedule = []
+    for pid, prompt, interval, last_captured, last_started in result.all():
+        seen = [_utc(ts) for ts in (last_captured, last_started) if ts is not None]
+        schedule.append((pid, prompt, interval, max(seen) if seen else None))
+    return schedule
+
+
+async def set_refresh_interval(
+    db: AsyncSession, product_id: int, minutes: Optional[int]
+) -> Optional[Product]:
+    """
+    Set a product's refresh interval (None: scheduler default, 0: no automatic refreshes).
+
+    :param db: Async database session
+    :param product_id: Product to update
+    :param minutes: New interval in minutes
+    :return: The updated Product, or None if it does not exist
+    """
+    product = await db.get(Product, product_id)
+    if product is None:
+        return None
+    product.refresh_interval_minutes = minutes
+    await db.commit()
+    return product
+
+
 async def create_product(db: AsyncSession, product_in: ProductCreate) -> ProductRead:
     """
     Create a new Product and return it with its initial empty snapshots list.
@@ -77,6 +220,55 @@ async def get_products(db: AsyncSession) -> List[ProductRead]:
     return [ProductRead.model_validate(p) for p in result.scalars().all()]
 
 
+async def get_products_page(
+    db: AsyncSession,
+    limit: int,
+    after: Optional[int] = None,
+    name: Optional[str] = None,
+    prompt: Optional[str] = None,
+    fields: Sequence[str] = PRODUCT_LIST_FIELDS,
+    with_summary: bool = False,
+) -> ProductPage:
+    """
+    Retrieve one page of products using a keyset cursor on Product.id.
+
+    Snapshots are never loaded; with ``with_summary`` each row carries the latest price and
+    snapshot count, read from product_price_stats by primary key.
+
+    :param db: Async database session
+    :param limit: Maximum number of products to return
+    :param after: Cursor returned by the previous page (last Product.id seen)
+    :param name: Optional case-insensitive substring filter on Product.name
+    :param prompt: Optional case-insensitive substring filter on Product.prompt
+    :param fields: Product columns to return besides id (subset of PRODUCT_LIST_FIELDS)
+    :param with_summary: Include latest_price and snapshot_count for each product
+    :return: ProductPage with the items and the cursor for the next page
+    """
+    columns = [Product.id] + [getattr(Product, f) for f in fields]
+    if with_summary:
+        columns += [
+            ProductPriceStats.latest_price,
+            func.coalesce(ProductPriceStats.snapshot_count, 0).label('snapshot_count'),
+        ]
+
+    stmt = select(*columns).order_by(Product.id).limit(limit + 1)
+    if with_summary:
+        stmt = stmt.outerjoin(ProductPriceStats, ProductPriceStats.product_id == Product.id)
+    if after is not None:
+        stmt = stmt.where(Product.id > after)
+    if name:
+        stmt = stmt.where(Product.name.icontains(name, autoescape=True))
+    if prompt:
+        stmt = stmt.where(Product.prompt.icontains(prompt, autoescape=True))
+
+    rows = (await db.execute(stmt)).all()
+    # One extra row was requested only to learn whether another page exists.
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = [ProductListItem(**row._mapping) for row in rows]
+    return ProductPage(items=items, next_cursor=rows[-1].id if has_more else None)
+
+
 async def get_product(db: AsyncSession, product_id: int) -> ProductRead | None:
     """
     Retrieve a single product by ID, including its snapshots.
@@ -100,66 +292,981 @@ async def create_snapshot(db: AsyncSession, snapshot: SnapshotCreate) -> Snapsho
     :param snapshot: SnapshotCreate schema with product_id, title, price, urls, and optional captured_at
     :return: SnapshotRead schema of the newly created snapshot
     """
+    (created,) = await create_snapshots_bulk(db, [snapshot])
+    return created
+
+
+def snapshot_content_hash(snapshot: SnapshotBase) -> str:
+    """
+    Return the SHA-256 hex digest identifying a capture's content.
+
+    Covers product_id, title, price (normalized to cents) and the ordered urls, so two captures
+    hash equal exactly when they would render the same.
+
+    :param snapshot: Snapshot schema to hash
+    :return: 64-character hex digest
+    """
+    price = None if snapshot.price is None else f'{snapshot.price:.2f}'
+    payload = [snapshot.product_id, snapshot.title, price, list(snapshot.urls)]
+    return hashlib.sha256(json.dumps(payload, separators=(',', ':')).encode()).hexdigest()
+
+
+def _utc(value: datetime) -> datetime:
+    """Treat naive timestamps (as returned by SQLite) as UTC so they compare with aware ones."""
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+def _snapshot_read(snapshot: Snapshot, urls: Sequence[str]) -> SnapshotRead:
+    """Build the response schema for a freshly inserted snapshot whose URL links are known."""
+    return SnapshotRead(
+        id=snapshot.id,
+        product_id=snapshot.product_id,
+        title=snapshot.title,
+        price=snapshot.price,
+        urls=list(urls),
+        captured_at=snapshot.captured_at,
+        last_seen_at=snapshot.last_seen_at,
+    )
+
+
+async def intern_urls(db: AsyncSession, urls: Iterable[str]) -> Dict[str, int]:
+    """
+    Resolve URLs to urls.id, inserting the ones that are not stored yet.
+
+    Known URLs come from the in-process intern cache; the rest are inserted with a single
+    INSERT ... ON CONFLICT DO NOTHING and read back by hash, which is safe against concurrent
+    writers interning the same URL. Callers add the result to the cache after committing.
+
+    :param db: Async database session
+    :param urls: URLs to resolve (duplicates allowed)
+    :return: Mapping of every given URL to its id
+    """
+    wanted = set(urls)
+    ids = url_cache.lookup(wanted)
+    missing = {url_hash(url): url for url in wanted - ids.keys()}
+    if missing:
+        rows = [{'url_hash': h, 'url': missing[h]} for h in sorted(missing)]
+        stmt = _dialect_insert(db)(Url).values(rows)
+        await db.execute(stmt.on_conflict_do_nothing(index_elements=[Url.url_hash]))
+        result = await db.execute(
+            select(Url.url_hash, Url.id).where(Url.url_hash.in_(list(missing)))
+        )
+        ids.update({missing[row.url_hash]: row.id for row in result.all()})
+    return ids
+
+
+def _observed_at(snapshot: Snapshot) -> datetime:
+    """Return the last time a stored run was seen."""
+    return _utc(snapshot.last_seen_at or snapshot.captured_at)
+
+
+async def create_snapshots_bulk(
+    db: AsyncSession,
+    snapshots: Sequence[SnapshotCreate],
+    dedupe: bool = False,
+    run_id: Union[int, Sequence[int], None] = None,
+) -> List[SnapshotRead]:
+    """
+    Create many Snapshot records with a single multi-row INSERT ... RETURNING and one commit.
+
+    On Postgres the rows go out as one batched statement whose RETURNING rows are matched back
+    to input order; dialects without sentinel support (SQLite) fall back to one INSERT per row,
+    still inside a single transaction.
+
+    With ``dedupe``, a snapshot whose content hash matches the previous capture of the same item
+    (same product and title) extends that row's last_seen_at instead of inserting a new row, so
+    storage grows with price changes rather than with scrape frequency.
+
+    :param db: Async database session
+    :param snapshots: SnapshotCreate schemas to insert, in order
+    :param dedupe: Extend unchanged items' previous row instead of inserting a duplicate
+    :param run_id: Scrape run the snapshots belong to (or one run per snapshot); extended rows
+        move to that run too
+    :return: SnapshotRead schemas of the new (or extended) snapshots, in input order
+    """
+    if not snapshots:
+        await db.commit()
+        return []
     # Exclude None values to allow database default for captured_at when not specified.
-    db_obj = Snapshot(**snapshot.model_dump(exclude_none=True))
-    db.add(db_obj)
-    # commit immediately so it's visible in the DB
+    rows = []
+    for i, snap in enumerate(snapshots):
+        row = snap.model_dump(exclude_none=True)
+        row['content_hash'] = snapshot_content_hash(snap)
+        if run_id is not None:
+            row['run_id'] = run_id if isinstance(run_id, int) else run_id[i]
+        rows.append(row)
+
+    targets: List[Union[int, Snapshot]] = list(range(len(rows)))
+    extended: List[Snapshot] = []
+    if dedupe:
+        targets, rows, extended = await _collapse_unchanged(db, rows)
+
+    inserted: Sequence[Snapshot] = []
+    url_ids: Dict[str, int] = {}
+    if rows:
+        result = await db.scalars(
+            insert(Snapshot).returning(Snapshot, sort_by_parameter_order=True),
+            [{k: v for k, v in row.items() if k != 'urls'} for row in rows],
+        )
+        inserted = result.all()
+        url_ids = await intern_urls(db, [url for row in rows for url in row.get('urls', [])])
+        links = [
+            {'snapshot_id': snap.id, 'position': position, 'url_id': url_ids[url]}
+            for snap, row in zip(inserted, rows, strict=True)
+            for position, url in enumerate(row.get('urls', []))
+        ]
+        if links:
+            await db.execute(insert(SnapshotUrl), links)
+        for stored in inserted:
+            # Links were written after the row; reload them on the next eager query.
+            db.expire(stored, ['url_links'])
+    await db.flush()
+    await _apply_price_stats(db, inserted, extended)
+    created = [
+        _snapshot_read(inserted[t], rows[t].get('urls', []))
+        if isinstance(t, int)
+        else SnapshotRead.model_validate(t)
+        for t in targets
+    ]
     await db.commit()
-    await db.refresh(db_obj)
-    return SnapshotRead.model_validate(db_obj)
+    url_cache.add(url_ids)
+    return created
 
 
-async def get_latest_snapshots(db: AsyncSession, product_id: int) -> list[SnapshotRead]:
+async def record_scrape_run(
+    db: AsyncSession,
+    run_in: ScrapeRunCreate,
+    snapshots: Sequence[SnapshotCreate],
+    dedupe: bool = True,
+) -> Tuple[ScrapeRunRead, List[SnapshotRead]]:
+    """
+    Store a scrape run and its items in one transaction.
+
+    :param db: Async database session
+    :param run_in: Run metadata (product, start time, model call duration, model)
+    :param snapshots: Items returned by the run, in rank order
+    :param dedupe: Extend unchanged items' previous row instead of inserting a duplicate
+    :return: The stored run and the SnapshotRead of each item, in input order
+    """
+    run = ScrapeRun(**run_in.model_dump(), item_count=len(snapshots))
+    db.add(run)
+    await db.flush()
+    run_read = ScrapeRunRead.model_validate(run)
+    created = await create_snapshots_bulk(db, snapshots, dedupe=dedupe, run_id=run.id)
+    return run_read, created
+
+
+async def record_scrape_runs(
+    db: AsyncSession,
+    runs: Sequence[Tuple[ScrapeRunCreate, Sequence[SnapshotCreate]]],
+    dedupe: bool = True,
+) -> List[ScrapeRunRead]:
+    """
+    Store many scrape runs and all their items in one transaction and one snapshot insert.
+
+    :param db: Async database session
+    :param runs: (run metadata, items in rank order) per run
+    :param dedupe: Extend unchanged items' previous row instead of inserting a duplicate
+    :return: The stored runs, in input order
+    """
+    stored = [ScrapeRun(**run_in.model_dump(), item_count=len(snaps)) for run_in, snaps in runs]
+    db.add_all(stored)
+    await db.flush()
+    run_reads = [ScrapeRunRead.model_validate(run) for run in stored]
+    snapshots = [snap for _, snaps in runs for snap in snaps]
+    run_ids = [run.id for run, (_, snaps) in zip(stored, runs, strict=True) for _ in snaps]
+    await create_snapshots_bulk(db, snapshots, dedupe=dedupe, run_id=run_ids)
+    return run_reads
+
+
+async def start_scrape_run(db: AsyncSession, run_in: ScrapeRunCreate) -> ScrapeRunRead:
+    """
+    Store an empty scrape run whose items are added as they stream in.
+
+    :param db: Async database session
+    :param run_in: Run metadata; duration_ms is set by finish_scrape_run
+    :return: The stored run
+    """
+    run = ScrapeRun(**run_in.model_dump(), item_count=0)
+    db.add(run)
+    await db.commit()
+    return ScrapeRunRead.model_validate(run)
+
+
+async def add_scrape_run_items(
+    db: AsyncSession, run_id: int, snapshots: Sequence[SnapshotCreate], dedupe: bool = True
+) -> List[SnapshotRead]:
+    """
+    Append items to a started run, counting them on the run in the same transaction.
+
+    :param db: Async database session
+    :param run_id: Run returned by start_scrape_run
+    :param snapshots: Next items of the run, in rank order
+    :param dedupe: Extend unchanged items' previous row instead of inserting a duplicate
+    :return: The SnapshotRead of each item, in input order
+    """
+    await db.execute(
+        update(ScrapeRun)
+        .where(ScrapeRun.id == run_id)
+        .values(item_count=ScrapeRun.item_count + len(snapshots))
+    )
+    return await create_snapshots_bulk(db, snapshots, dedupe=dedupe, run_id=run_id)
+
+
+async def finish_scrape_run(db: AsyncSession, run_id: int, duration_ms: int) -> ScrapeRunRead:
+    """
+    Record the model call duration of a streamed run once its last item has arrived.
+
+    :param db: Async database session
+    :param run_id: Run returned by start_scrape_run
+    :param duration_ms: Wall-clock time of the whole model call in milliseconds
+    :return: The updated run
+    """
+    result = await db.execute(
+        update(ScrapeRun)
+        .where(ScrapeRun.id == run_id)
+        .values(duration_ms=duration_ms)
+        .returning(ScrapeRun)
+        .execution_options(populate_existing=True)
+    )
+    run = ScrapeRunRead.model_validate(result.scalar_one())
+    await db.commit()
+    return run
+
+
+async def get_scrape_runs(db: AsyncSession, product_id: int, limit: int) -> List[ScrapeRunRead]:
+    """
+    Return a product's most recent scrape runs, newest first.
+
+    :param db: Async database session
+    :param product_id: ID of the product
+    :param limit: Maximum number of runs to return
+    :return: List of ScrapeRunRead schemas
+    """
+    result = await db.execute(
+        select(ScrapeRun)
+        .where(ScrapeRun.product_id == product_id)
+        .order_by(ScrapeRun.started_at.desc(), ScrapeRun.id.desc())
+        .limit(limit)
+    )
+    return [ScrapeRunRead.model_validate(run) for run in result.scalars().all()]
+
+
+async def delete_products(db: AsyncSession, product_ids: Sequence[int]) -> int:
+    """
+    Delete products with their snapshots, scrape runs and price summary.
+
+    snapshot_urls has no foreign key to snapshots, so the products' URL links are deleted
+    first, in the same transaction.
+
+    :param db: Async database session
+    :param product_ids: IDs of the products to delete
+    :return: Number of products deleted
+    """
+    if not product_ids:
+        return 0
+    await db.execute(
+        delete(SnapshotUrl).where(
+            SnapshotUrl.snapshot_id.in_(
+                select(Snapshot.id).where(Snapshot.product_id.in_(product_ids))
+            )
+        )
+    )
+    # explicit rather than ON DELETE CASCADE, which SQLite only honours with foreign keys on
+    for model in (Snapshot, ScrapeRun, ProductPriceStats):
+        await db.execute(delete(model).where(model.product_id.in_(product_ids)))
+    result = await db.execute(delete(Product).where(Product.id.in_(product_ids)))
+    await db.commit()
+    return int(result.rowcount)
+
+
+async def delete_orphan_snapshot_urls(db: AsyncSession) -> int:
+    """
+    Delete URL links whose snapshot no longer exists.
+
+    A full sweep for snapshots removed outside delete_products and partition expiry (e.g. by
+    hand in SQL); both of those already delete the links they orphan.
+
+    :param db: Async database session
+    :return: Number of link rows deleted
+    """
+    result = await db.execute(
+        delete(SnapshotUrl).where(
+            ~select(Snapshot.id).where(Snapshot.id == SnapshotUrl.snapshot_id).exists()
+        )
+    )
+    await db.commit()
+    return int(result.rowcount)
+
+
+async def _latest_item_snapshots(
+    db: AsyncSession, keys: set[Tuple[int, str]]
+) -> Dict[Tuple[int, str], Snapshot]:
+    """Load the most recent stored snapshot of each (product_id, title) item."""
+    ranked = (
+        select(
+            Snapshot,
+            func.row_number()
+            .over(
+                partition_by=(Snapshot.product_id, Snapshot.title),
+                order_by=(Snapshot.captured_at.desc(), Snapshot.id.desc()),
+            )
+            .label('rn'),
+        )
+        .where(
+            Snapshot.product_id.in_({product_id for product_id, _ in keys}),
+            tuple_(Snapshot.product_id, Snapshot.title).in_(list(keys)),
+        )
+        .subquery()
+    )
+    latest = aliased(Snapshot, ranked)
+    result = await db.execute(select(latest).where(ranked.c.rn == 1))
+    return {(snap.product_id, snap.title): snap for snap in result.scalars().all()}
+
+
+async def _collapse_unchanged(
+    db: AsyncSession, rows: List[Dict[str, Any]]
+) -> Tuple[List[Union[int, Snapshot]], List[Dict[str, Any]], List[Snapshot]]:
+    """
+    Fold rows identical to their item's previous capture into that capture's run.
+
+    The previous capture is either the item's latest stored snapshot or an earlier row of the same
+    batch. A row only extends a run it comes after in time; out-of-order backfills always insert.
+
+    :return: Per input row, the index of the row to insert or the stored Snapshot it extended;
+        the rows left to insert; and the stored snapshots whose last_seen_at was moved
+    """
+    previous: Dict[Tuple[int, str], Union[int, Snapshot]] = dict(
+        await _latest_item_snapshots(db, {(row['product_id'], row['title']) for row in rows})
+    )
+    now = datetime.now(timezone.utc)
+    targets: List[Union[int, Snapshot]] = []
+    to_insert: List[Dict[str, Any]] = []
+    extended: Dict[int, Snapshot] = {}
+    for row in rows:
+        # Stamp captures here so they can be compared with the runs they may extend.
+        seen_at = _utc(row.setdefault('captured_at', now))
+        key = (row['product_id'], row['title'])
+        prev = previous.get(key)
+        if isinstance(prev, Snapshot):
+            if prev.content_hash == row['content_hash'] and seen_at >= _observed_at(prev):
+                prev.last_seen_at = seen_at
+                prev.run_id = row.get('run_id', prev.run_id)
+                extended[prev.id] = prev
+                targets.append(prev)
+                continue
+        elif prev is not None:
+            queued = to_insert[prev]
+            run_end = _utc(queued.get('last_seen_at', queued['captured_at']))
+            if queued['content_hash'] == row['content_hash'] and seen_at >= run_end:
+                queued['last_seen_at'] = seen_at
+                targets.append(prev)
+                continue
+        previous[key] = len(to_insert)
+        targets.append(len(to_insert))
+        to_insert.append(row)
+    return targets, to_insert, list(extended.values())
+
+
+def _dialect_insert(db: AsyncSession) -> Any:
+    """Return the INSERT construct supporting ON CONFLICT for the session's dialect."""
+    if db.get_bind().dialect.name == 'sqlite':
+        return sqlite.insert
+    return postgresql.insert
+
+
+async def _apply_price_stats(
+    db: AsyncSession, snapshots: Sequence[Snapshot], extended: Sequence[Snapshot] = ()
+) -> None:
+    """
+    Fold newly inserted snapshots into product_price_stats within the caller's transaction.
+
+    The batch is first reduced to one summary row per product, then merged into the table with a
+    single multi-row INSERT ... ON CONFLICT DO UPDATE that keeps whichever latest/min/max wins.
+    Ties on price go to the most recent capture, matching get_lowest_price_period. Extended runs
+    only compete for "latest" (by last sighting); their price was already counted on insert.
+    """
+    by_product: Dict[int, Tuple[List[Snapshot], List[Snapshot]]] = {}
+    for snap in snapshots:
+        by_product.setdefault(snap.product_id, ([], []))[0].append(snap)
+    for snap in extended:
+        by_product.setdefault(snap.product_id, ([], []))[1].append(snap)
+
+    rows = []
+    for product_id, (snaps, runs) in by_product.items():
+        latest = max([*snaps, *runs], key=lambda s: (_observed_at(s), s.id))
+        priced = [s for s in snaps if s.price is not None]
+        lowest = min(
+            priced, key=lambda s: (s.price, -s.captured_at.timestamp(), -s.id), default=None
+        )
+        highest = max(priced, key=lambda s: (s.price, s.captured_at, s.id), default=None)
+        rows.append(
+            {
+                'product_id': product_id,
+                'snapshot_count': len(snaps),
+                'generation': 1,
+                'latest_snapshot_id': latest.id,
+                'latest_price': latest.price,
+                'last_captured_at': latest.last_seen_at or latest.captured_at,
+                'min_snapshot_id': lowest.id if lowest else None,
+                'min_price': lowest.price if lowest else None,
+                'min_captured_at': lowest.captured_at if lowest else None,
+                'max_snapshot_id': highest.id if highest else None,
+                'max_price': highest.price if highest else None,
+                'max_captured_at': highest.captured_at if highest else None,
+            }
+        )
+    if not rows:
+        return
+
+    stmt = _dialect_insert(db)(ProductPriceStats).values(rows)
+    new, cur = stmt.excluded, ProductPriceStats.__table__.c
+    newer = or_(cur.last_captured_at.is_(None), new.last_captured_at >= cur.last_captured_at)
+    lower = and_(
+        new.min_price.is_not(None),
+        or_(
+            cur.min_price.is_(None),
+            new.min_price < cur.min_price,
+            and_(new.min_price == cur.min_price, new.min_captured_at >= cur.min_captured_at),
+        ),
+    )
+    higher = and_(
+        new.max_price.is_not(None),
+        or_(
+            cur.max_price.is_(None),
+            new.max_price > cur.max_price,
+            and_(new.max_price == cur.max_price, new.max_captured_at >= cur.max_captured_at),
+        ),
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cur.product_id],
+        set_={
+            'snapshot_count': cur.snapshot_count + new.snapshot_count,
+            'generation': cur.generation + 1,
+            **{
+                col: case((cond, new[col]), else_=cur[col])
+                for cond, cols in (
+                    (newer, ('latest_snapshot_id', 'latest_price', 'last_captured_at')),
+                    (lower, ('min_snapshot_id', 'min_price', 'min_captured_at')),
+                    (higher, ('max_snapshot_id', 'max_price', 'max_captured_at')),
+                )
+                for col in cols
+            },
+        },
+    )
+    await db.execute(stmt)
+
+
+def _price_stats_select() -> Select[Any]:
+    """Build a query recomputing every product's price summary from the snapshots table."""
+
+    observed_at = func.coalesce(Snapshot.last_seen_at, Snapshot.captured_at)
+
+    def _first(order_by: Any, priced: bool = False) -> Any:
+        ranked = select(
+            Snapshot.product_id,
+            Snapshot.id,
+            Snapshot.price,
+            Snapshot.captured_at,
+            observed_at.label('observed_at'),
+            func.row_number().over(partition_by=Snapshot.product_id, order_by=order_by).label('rn'),
+        )
+        if priced:
+            ranked = ranked.where(Snapshot.price.is_not(None))
+        return ranked.subquery()
+
+    counts = (
+        select(Snapshot.product_id, func.count(Snapshot.id).label('snapshot_count'))
+        .group_by(Snapshot.product_id)
+        .subquery()
+    )
+    latest = _first((observed_at.desc(), Snapshot.id.desc()))
+    lowest = _first((Snapshot.price, Snapshot.captured_at.desc(), Snapshot.id.desc()), True)
+    highest = _first((Snapshot.price.desc(), Snapshot.captured_at.desc(), Snapshot.id.desc()), True)
+    return (
+        select(
+            counts.c.product_id,
+            counts.c.snapshot_count,
+            latest.c.id.label('latest_snapshot_id'),
+            latest.c.price.label('latest_price'),
+            latest.c.observed_at.label('last_captured_at'),
+            lowest.c.id.label('min_snapshot_id'),
+            lowest.c.price.label('min_price'),
+            lowest.c.captured_at.label('min_captured_at'),
+            highest.c.id.label('max_snapshot_id'),
+            highest.c.price.label('max_price'),
+            highest.c.captured_at.label('max_captured_at'),
+        )
+        .join(latest, and_(latest.c.product_id == counts.c.product_id, latest.c.rn == 1))
+        .outerjoin(lowest, and_(lowest.c.product_id == counts.c.product_id, lowest.c.rn == 1))
+        .outerjoin(highest, and_(highest.c.product_id == counts.c.product_id, highest.c.rn == 1))
+        # SQLite needs an explicit WHERE to parse INSERT ... SELECT ... ON CONFLICT
+        .where(true())
+    )
+
+
+async def compute_price_stats(db: AsyncSession) -> Dict[int, Dict[str, Any]]:
+    """
+    Recompute every product's price summary from snapshots without writing it.
+
+    :param db: Async database session
+    :return: Mapping of product_id to the summary row as a dict
+    """
+    result = await db.execute(_price_stats_select())
+    return {row.product_id: dict(row._mapping) for row in result.all()}
+
+
+async def get_price_stats(db: AsyncSession) -> Dict[int, Dict[str, Any]]:
+    """
+    Return the stored product_price_stats rows, with the same columns as compute_price_stats.
+
+    :param db: Async database session
+    :return: Mapping of product_id to the stored summary row as a dict
+    """
+    columns = ProductPriceStats.__table__.c
+    names = _price_stats_select().selected_columns.keys()
+    result = await db.execute(select(*[columns[name] for name in names]))
+    return {row.product_id: dict(row._mapping) for row in result.all()}
+
+
+async def rebuild_price_stats(db: AsyncSession) -> int:
     """
-    Return all snapshots for product_id having the most recent timestamp.
+    Recompute product_price_stats from scratch out of the snapshots table.
+
+    Rows are upserted rather than replaced so each product's generation keeps increasing, which
+    keeps previously issued ETags from matching a rebuilt row.
+
+    :param db: Async database session
+    :return: Number of product summary rows written
     """
+    select_stmt = _price_stats_select()
+    names = list(select_stmt.selected_columns.keys())
+    stmt = _dialect_insert(db)(ProductPriceStats).from_select(names, select_stmt)
+    cur = ProductPriceStats.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[cur.product_id],
+        set_={
+            **{name: stmt.excluded[name] for name in names if name != 'product_id'},
+            'generation': cur.generation + 1,
+        },
+    )
+    result = await db.execute(stmt)
+    # Products whose snapshots have all disappeared no longer have a summary.
+    await db.execute(
+        delete(ProductPriceStats).where(~cur.product_id.in_(select(Snapshot.product_id).distinct()))
+    )
+    await db.commit()
+    return int(result.rowcount)
+
+
+async def get_product_version(db: AsyncSession, product_id: int) -> Optional[int]:
     """
-    Return the most recent snapshot for a product (by timestamp).
+    Return the product's write generation (0 if it has never had a snapshot).
+
+    Two primary-key lookups in one query; cheap enough to run on every conditional GET.
+
+    :param db: Async database session
+    :param product_id: ID of the product
+    :return: Generation counter from product_price_stats, or None if the product does not exist
+    """
+    result = await db.execute(
+        select(func.coalesce(ProductPriceStats.generation, 0))
+        .select_from(Product)
+        .outerjoin(ProductPriceStats, ProductPriceStats.product_id == Product.id)
+        .where(Product.id == product_id)
+    )
+    version: Optional[int] = result.scalar_one_or_none()
+    return version
+
+
+async def get_history_window_start(
+    db: AsyncSession, product_id: int, days: int
+) -> Optional[datetime]:
+    """
+    Return the timestamp of the oldest history point inside the past-N-days window, if any.
+
+    The history window slides with time, so this identifies which points have aged out without a
+    write having happened.
+
+    :param db: Async database session
+    :param product_id: ID of the product
+    :param days: Number of days to look back from now
+    :return: Oldest capture or last-seen time in the window, or None when the window is empty
+    """
+    cutoff = _history_cutoff(days)
+    runs = _history_runs(product_id, cutoff)
+    first_point = case((runs.captured_at >= cutoff, runs.captured_at), else_=runs.last_seen_at)
+    result = await db.execute(select(func.min(first_point)))
+    start: Optional[datetime] = result.scalar_one_or_none()
+    return start
+
+
+async def get_existing_product_ids(db: AsyncSession, product_ids: Sequence[int]) -> set[int]:
+    """
+    Return the subset of product_ids that exist, in a single query.
+
+    :param db: Async database session
+    :param product_ids: Product IDs to check
+    :return: Set of IDs that have a matching Product row
+    """
+    result = await db.execute(select(Product.id).where(Product.id.in_(set(product_ids))))
+    return set(result.scalars().all())
+
+
+async def get_latest_snapshots(db: AsyncSession, product_id: int) -> list[SnapshotRead]:
+    """
+    Return every snapshot observed by the product's most recent scrape run.
+
+    The newest non-empty run is found through (product_id, started_at) on scrape_runs and its
+    rows through snapshots.run_id, in a single query. Products without runs (snapshots posted
+    directly, or written before runs were recorded) get their single most recent snapshot,
+    resolved through product_price_stats.latest_snapshot_id or the (product_id, captured_at)
+    index.
 
     :param db: Async database session
     :param product_id: ID of the product to query
-    :return: List with a single SnapshotRead schema for the latest snapshot, or empty if none
+    :return: List of SnapshotRead schemas, empty if the product has no snapshots
     """
-    stmt = (
-        select(Snapshot)
-        .where(Snapshot.product_id == product_id)
-        .order_by(Snapshot.captured_at.desc())
+    newest_run = (
+        select(ScrapeRun.id)
+        .where(ScrapeRun.product_id == product_id, ScrapeRun.item_count > 0)
+        .order_by(ScrapeRun.started_at.desc(), ScrapeRun.id.desc())
         .limit(1)
+        .scalar_subquery()
+    )
+    result = await db.execute(
+        select(Snapshot).where(Snapshot.run_id == newest_run).order_by(Snapshot.id)
+    )
+    run_snaps = result.scalars().all()
+    if run_snaps:
+        return [SnapshotRead.model_validate(s) for s in run_snaps]
+
+    result = await db.execute(
+        select(Snapshot)
+        .join(ProductPriceStats, ProductPriceStats.latest_snapshot_id == Snapshot.id)
+        .where(ProductPriceStats.product_id == product_id)
     )
-    result = await db.execute(stmt)
     snap = result.scalar_one_or_none()
+    if snap is None:
+        result = await db.execute(
+            select(Snapshot)
+            .where(Snapshot.product_id == product_id)
+            .order_by(Snapshot.captured_at.desc())
+            .limit(1)
+        )
+        snap = result.scalar_one_or_none()
     return [SnapshotRead.model_validate(snap)] if snap else []
 
 
+def _history_cutoff(days: int) -> datetime:
+    """Return the start of the past-N-days history window."""
+    return datetime.now(timezone.utc) - timedelta(days=days)
+
+
+def _seen_since(start: datetime, *conditions: ColumnElement[bool]) -> type[Snapshot]:
+    """
+    Alias snapshots to the runs matching conditions that were seen at or after start.
+
+    Runs first captured since start are matched on a plain captured_at range, which prunes
+    partitions and walks the (product_id, captured_at) indexes. Older runs extended past start
+    come from the partial (product_id, last_seen_at) index. An OR or coalesce over both
+    columns could use neither, so the two are combined with UNION ALL.
+    """
+    recent = select(Snapshot).where(*conditions, Snapshot.captured_at >= start)
+    extended = select(Snapshot).where(
+        *conditions, Snapshot.captured_at < start, Snapshot.last_seen_at >= start
+    )
+    return aliased(Snapshot, union_all(recent, extended).subquery('seen'))
+
+
+def _history_runs(product_id: int, cutoff: datetime) -> type[Snapshot]:
+    """Alias snapshots to a product's runs seen since cutoff (first or last sighting)."""
+    return _seen_since(cutoff, Snapshot.product_id == product_id)
+
+
+def _history_stmt(product_id: int, cutoff: datetime) -> Select[tuple[Snapshot]]:
+    """Build the query for a product's snapshot runs seen since cutoff, oldest capture first."""
+    runs = _history_runs(product_id, cutoff)
+    return select(runs).order_by(runs.captured_at)
+
+
+class _RunExpander(Generic[P]):
+    """
+    Turn deduplicated runs back into the capture series they stand for.
+
+    Each stored row yields a point at captured_at and, if it was extended, a second point at
+    last_seen_at carrying the same id and content, marked as a repeat. Rows arrive ordered by
+    captured_at; last-seen points are held in a heap until no earlier capture can follow, so
+    output stays time-ordered.
+    Points are SnapshotRead models or SnapshotRow dicts; ``repeat`` copies one to a new time.
+    """
+
+    def __init__(self, cutoff: datetime, repeat: Callable[[P, datetime], P]):
+        self.cutoff = cutoff
+        self.repeat = repeat
+        self._pending: List[Tuple[datetime, int, P]] = []
+
+    def push(
+        self, point: P, captured_at: datetime, last_seen_at: Optional[datetime], key: int
+    ) -> List[P]:
+        """Add the next row; return the points that are now safe to emit."""
+        start = _utc(captured_at)
+        points = self._release(start)
+        if start >= self.cutoff:
+            points.append(point)
+        if last_seen_at is not None and _utc(last_seen_at) > start:
+            repeat = self.repeat(point, last_seen_at)
+            heapq.heappush(self._pending, (_utc(last_seen_at), key, repeat))
+        return points
+
+    def drain(self) -> List[P]:
+        """Return the remaining last-seen points once all rows have been pushed."""
+        return self._release(None)
+
+    def _release(self, until: Optional[datetime]) -> List[P]:
+        points = []
+        while self._pending and (until is None or self._pending[0][0] <= until):
+            points.append(heapq.heappop(self._pending)[2])
+        return points
+
+
 async def get_snapshot_history(db: AsyncSession, product_id: int, days: int) -> List[SnapshotRead]:
     """
     Return the list of snapshots for a product over the past N days.
 
+    Deduplicated runs are expanded into their first and last sightings, so the series looks as
+    if every unchanged capture had been stored.
+
     :param db: Async database session
     :param product_id: ID of the product to query
     :param days: Number of days to look back from now
     :return: List of SnapshotRead schemas ordered by captured_at
     """
+    cutoff = _history_cutoff(days)
+    result = await db.execute(_history_stmt(product_id, cutoff))
+    expander = _RunExpander(cutoff, _repeat_read)
+    points = []
+    for snap in result.scalars().all():
+        read = SnapshotRead.model_validate(snap)
+        points += expander.push(read, read.captured_at, read.last_seen_at, read.id)
+    return points + expander.drain()
+
+
+def _repeat_read(read: SnapshotRead, seen_at: datetime) -> SnapshotRead:
+    return read.model_copy(update={'captured_at': seen_at, 'repeat': True})
+
+
+def _repeat_row(row: SnapshotRow, seen_at: datetime) -> SnapshotRow:
+    return {**row, 'captured_at': seen_at, 'repeat': True}
+
+
+def _snapshot_row_columns(snapshots: type[Snapshot] = Snapshot) -> Tuple[Any, ...]:
+    """Snapshot columns read by the fast path, in SnapshotRow field order (urls are joined in)."""
+    return (
+        snapshots.product_id,
+        snapshots.title,
+        snapshots.price,
+        snapshots.id,
+        snapshots.captured_at,
+        snapshots.last_seen_at,
+    )
+
+
+async def _urls_by_snapshot(db: AsyncSession, snapshot_ids: Select[Any]) -> Dict[int, List[str]]:
+    """Return the ordered URLs of every snapshot whose id snapshot_ids selects, in one query."""
+    result = await db.execute(
+        select(SnapshotUrl.snapshot_id, Url.url)
+        .join(Url, Url.id == SnapshotUrl.url_id)
+        .where(SnapshotUrl.snapshot_id.in_(snapshot_ids))
+        .order_by(SnapshotUrl.snapshot_id, SnapshotUrl.position)
+    )
+    urls: Dict[int, List[str]] = {}
+    for snapshot_id, url in result.all():
+        urls.setdefault(snapshot_id, []).append(url)
+    return urls
+
+
+def _snapshot_row(row: Any, urls: Dict[int, List[str]]) -> SnapshotRow:
+    return {
+        'product_id': row.product_id,
+        'title': row.title,
+        'price': row.price,
+        'urls': urls.get(row.id, []),
+        'id': row.id,
+        'captured_at': row.captured_at,
+        'last_seen_at': row.last_seen_at,
+        'repeat': False,
+    }
+
+
+async def get_snapshot_history_rows(
+    db: AsyncSession, product_id: int, days: int
+) -> List[SnapshotRow]:
     """
-    Return list of snapshots for a product over the past N days.
+    Fast-path twin of get_snapshot_history returning plain dicts built from column tuples.
+
+    Skips ORM entity construction and per-row model validation; encode the result with
+    schemas.snapshot_rows_adapter.
 
     :param db: Async database session
     :param product_id: ID of the product to query
     :param days: Number of days to look back from now
-    :return: List of SnapshotRead schemas ordered by captured_at
+    :return: List of SnapshotRow dicts ordered by captured_at
+    """
+    cutoff = _history_cutoff(days)
+    runs = _history_runs(product_id, cutoff)
+    urls = await _urls_by_snapshot(db, select(runs.id))
+    result = await db.execute(select(*_snapshot_row_columns(runs)).order_by(runs.captured_at))
+    expander = _RunExpander(cutoff, _repeat_row)
+    points: List[SnapshotRow] = []
+    for row in result.all():
+        points += expander.push(_snapshot_row(row, urls), row.captured_at, row.last_seen_at, row.id)
+    return points + expander.drain()
+
+
+async def get_product_rows(db: AsyncSession, product_id: Optional[int] = None) -> List[ProductRow]:
     """
-    from datetime import datetime, timedelta, timezone
+    Fast-path twin of get_products/get_product returning plain dicts built from column tuples.
+
+    Three queries in total (products, snapshots, URLs) regardless of the number of products;
+    encode the result with schemas.product_rows_adapter or product_row_adapter.
+
+    :param db: Async database session
+    :param product_id: Restrict to one product; None returns every product
+    :return: List of ProductRow dicts ordered by id, snapshots ordered by id
+    """
+    condition: ColumnElement[bool] = (
+        true() if product_id is None else Snapshot.product_id == product_id
+    )
+    products_stmt = select(Product.name, Product.prompt, Product.id, Product.created_at)
+    if product_id is not None:
+        products_stmt = products_stmt.where(Product.id == product_id)
+    products = (await db.execute(products_stmt.order_by(Product.id))).all()
+    if not products:
+        return []
 
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    urls = await _urls_by_snapshot(db, select(Snapshot.id).where(condition))
     result = await db.execute(
-        select(Snapshot)
-        .where(
-            Snapshot.product_id == product_id,
-            Snapshot.captured_at >= cutoff,
+        select(*_snapshot_row_columns()).where(condition).order_by(Snapshot.product_id, Snapshot.id)
+    )
+    snapshots: Dict[int, List[SnapshotRow]] = {}
+    for row in result.all():
+        snapshots.setdefault(row.product_id, []).append(_snapshot_row(row, urls))
+    return [
+        {
+            'name': p.name,
+            'prompt': p.prompt,
+            'id': p.id,
+            'created_at': p.created_at,
+            'snapshots': snapshots.get(p.id, []),
+        }
+        for p in products
+    ]
+
+
+async def stream_snapshot_history(
+    db: AsyncSession, product_id: int, days: int, chunk_size: int = 500
+) -> AsyncIterator[SnapshotRead]:
+    """
+    Yield a product's snapshots over the past N days without materializing the full list.
+
+    Rows are read through a server-side cursor, ``chunk_size`` at a time, so memory use stays
+    flat regardless of the size of the range.
+
+    :param db: Async database session
+    :param product_id: ID of the product to query
+    :param days: Number of days to look back from now
+    :param chunk_size: Number of rows fetched from the cursor per round-trip
+    :return: Async iterator of SnapshotRead schemas ordered by captured_at
+    """
+    cutoff = _history_cutoff(days)
+    stmt = _history_stmt(product_id, cutoff).execution_options(yield_per=chunk_size)
+    result = await db.stream_scalars(stmt)
+    expander = _RunExpander(cutoff, _repeat_read)
+    async for snap in result:
+        read = SnapshotRead.model_validate(snap)
+        for point in expander.push(read, read.captured_at, read.last_seen_at, read.id):
+            yield point
+    for point in expander.drain():
+        yield point
+
+
+def _bucket_start(
+    dialect: str, bucket: BucketSize, column: ColumnElement[datetime]
+) -> ColumnElement[datetime]:
+    """Truncate a timestamp column to the start of its hour/day/ISO week for the given dialect."""
+    if dialect == 'sqlite':
+        # SQLite has no date_trunc; format to the bucket start ('weekday 0', '-6 days' -> Monday).
+        if bucket == 'hour':
+            return func.strftime('%Y-%m-%d %H:00:00', column)
+        if bucket == 'day':
+            return func.strftime('%Y-%m-%d 00:00:00', column)
+        return func.strftime('%Y-%m-%d 00:00:00', column, 'weekday 0', '-6 days')
+    return func.date_trunc(bucket, column)
+
+
+async def get_price_buckets(
+    db: AsyncSession,
+    product_id: int,
+    days: int,
+    bucket: BucketSize = 'day',
+    max_points: Optional[int] = None,
+) -> List[PriceBucket]:
+    """
+    Aggregate a product's priced snapshots over the past N days into OHLC buckets.
+
+    Grouping happens in SQL over every sighting: each row's captured_at plus, for deduplicated
+    runs, its last_seen_at. Open/close are the first/last prices in each bucket by time. When
+    max_points is given and there are more buckets than that, the series is reduced with
+    largest-triangle-three-buckets over the close prices.
+
+    :param db: Async database session
+    :param product_id: ID of the product to query
+    :param days: Number of days to look back from now
+    :param bucket: Bucket width ('hour', 'day' or 'week')
+    :param max_points: Optional cap on the number of buckets returned
+    :return: List of PriceBucket schemas ordered by bucket_start
+    """
+    cutoff = _history_cutoff(days)
+    priced = and_(Snapshot.product_id == product_id, Snapshot.price.is_not(None))
+    points = union_all(
+        select(Snapshot.id, Snapshot.price, Snapshot.captured_at.label('seen_at')).where(
+            priced, Snapshot.captured_at >= cutoff
+        ),
+        select(Snapshot.id, Snapshot.price, Snapshot.last_seen_at.label('seen_at')).where(
+            priced, Snapshot.last_seen_at >= cutoff, Snapshot.last_seen_at > Snapshot.captured_at
+        ),
+    ).subquery()
+    bucket_start = _bucket_start(db.get_bind().dialect.name, bucket, points.c.seen_at)
+    ranked = select(
+        bucket_start.label('bucket_start'),
+        points.c.price,
+        func.row_number()
+        .over(partition_by=bucket_start, order_by=(points.c.seen_at, points.c.id))
+        .label('rn_first'),
+        func.row_number()
+        .over(partition_by=bucket_start, order_by=(points.c.seen_at.desc(), points.c.id.desc()))
+        .label('rn_last'),
+    ).subquery()
+    stmt = (
+        select(
+            ranked.c.bucket_start,
+            func.max(case((ranked.c.rn_first == 1, ranked.c.price))).label('open'),
+            func.max(ranked.c.price).label('high'),
+            func.min(ranked.c.price).label('low'),
+            func.max(case((ranked.c.rn_last == 1, ranked.c.price))).label('close'),
+            func.count().label('count'),
         )
-        .order_by(Snapshot.captured_at)
+        .group_by(ranked.c.bucket_start)
+        .order_by(ranked.c.bucket_start)
     )
-    return [SnapshotRead.model_validate(s) for s in result.scalars().all()]
+    result = await db.execute(stmt)
+    buckets = [PriceBucket(**row._mapping) for row in result.all()]
+
+    if max_points is not None and len(buckets) > max_points:
+        series = [(b.bucket_start.timestamp(), float(b.close or 0)) for b in buckets]
+        buckets = [buckets[i] for i in lttb(series, max_points)]
+    return buckets
 
 
 async def get_lowest_price_period(
@@ -172,16 +1279,174 @@ async def get_lowest_price_period(
     Return the snapshot with the lowest price for product_id between start and end datetimes.
     If multiple snapshots share the same lowest price, return the most recent one.
     If start is None, no lower bound is applied. If end is None, no upper bound is applied.
+    A deduplicated run counts if any part of it (captured_at to last_seen_at) overlaps the range.
+    When the range covers all captures, the all-time minimum is read from product_price_stats.
     """
-    stmt = (
-        select(Snapshot).where(Snapshot.product_id == product_id).where(Snapshot.price.is_not(None))
-    )
-    if start is not None:
-        stmt = stmt.where(Snapshot.captured_at >= start)
+    if start is None:
+        stats_stmt = (
+            select(Snapshot)
+            .join(ProductPriceStats, ProductPriceStats.min_snapshot_id == Snapshot.id)
+            .where(ProductPriceStats.product_id == product_id)
+        )
+        if end is not None:
+            stats_stmt = stats_stmt.where(ProductPriceStats.last_captured_at <= end)
+        snap = (await db.execute(stats_stmt)).scalar_one_or_none()
+        if snap is not None:
+            return SnapshotRead.model_validate(snap)
+
+    conditions: List[ColumnElement[bool]] = [
+        Snapshot.product_id == product_id,
+        Snapshot.price.is_not(None),
+    ]
     if end is not None:
-        stmt = stmt.where(Snapshot.captured_at <= end)
-    stmt = stmt.order_by(Snapshot.price.asc(), Snapshot.captured_at.desc()).limit(1)
+        conditions.append(Snapshot.captured_at <= end)
+    if start is None:
+        snapshots: type[Snapshot] = Snapshot
+        stmt = select(Snapshot).where(*conditions)
+    else:
+        snapshots = _seen_since(start, *conditions)
+        stmt = select(snapshots)
+    stmt = stmt.order_by(snapshots.price.asc(), snapshots.captured_at.desc()).limit(1)
 
     result = await db.execute(stmt)
     snap = result.scalar_one_or_none()
     return SnapshotRead.model_validate(snap) if snap else None
+
+
+async def get_dashboard(
+    db: AsyncSession,
+    product_ids: Sequence[int],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[DashboardItem]:
+    """
+    Return the latest and the lowest-price snapshot of many products in a single query.
+
+    Latest snapshots come from product_price_stats. Without a date range the lowest price is
+    the stored all-time minimum too; with one, it is ranked per product with a window function
+    over the range, using the same overlap and tie rules as get_lowest_price_period. Both
+    lookups are combined with UNION ALL and joined to snapshots once.
+
+    :param db: Async database session
+    :param product_ids: Products to summarize
+    :param start: Optional lower bound for the lowest-price search
+    :param end: Optional upper bound for the lowest-price search
+    :return: One DashboardItem per requested id, in request order
+    """
+    ids = list(dict.fromkeys(product_ids))
+    stats = ProductPriceStats
+    latest = select(
+        stats.product_id,
+        stats.latest_snapshot_id.label('snapshot_id'),
+        literal('latest').label('role'),
+    ).where(stats.product_id.in_(ids))
+    if start is None and end is None:
+        best = select(
+            stats.product_id, stats.min_snapshot_id.label('snapshot_id'), literal('best')
+        ).where(stats.product_id.in_(ids), stats.min_snapshot_id.is_not(None))
+    else:
+        conditions: List[ColumnElement[bool]] = [
+            Snapshot.product_id.in_(ids),
+            Snapshot.price.is_not(None),
+        ]
+        if end is not None:
+            conditions.append(Snapshot.captured_at <= end)
+        if start is None:
+            snapshots: type[Snapshot] = Snapshot
+        else:
+            # the range is applied inside the alias, along with the other conditions
+            snapshots, conditions = _seen_since(start, *conditions), []
+        ranked = select(
+            snapshots.product_id,
+            snapshots.id,
+            func.row_number()
+            .over(
+                partition_by=snapshots.product_id,
+                order_by=(snapshots.price, snapshots.captured_at.desc(), snapshots.id.desc()),
+            )
+            .label('rn'),
+        ).where(*conditions)
+        ranked_sq = ranked.subquery()
+        best = select(ranked_sq.c.product_id, ranked_sq.c.id, literal('best')).where(
+            ranked_sq.c.rn == 1
+        )
+    roles = union_all(latest, best).subquery()
+    result = await db.execute(
+        select(Snapshot, roles.c.role).join(roles, roles.c.snapshot_id == Snapshot.id)
+    )
+
+    items = {pid: DashboardItem(product_id=pid) for pid in ids}
+    for snap, role in result.all():
+        setattr(items[snap.product_id], role, SnapshotRead.model_validate(snap))
+    return list(items.values())
+
+
+async def get_llm_response(
+    db: AsyncSession, cache_key: str, fresh_after: datetime
+) -> Optional[Tuple[List[Dict[str, Any]], Optional[int]]]:
+    """
+    Return a cached model response created after fresh_after, marking it as used.
+
+    :param db: Async database session
+    :param cache_key: Key built by scraper.llm_cache.cache_key
+    :param fresh_after: Oldest creation time still within the TTL
+    :return: (items, total_tokens) on a hit, None on a miss or an expired entry
+    """
+    result = await db.execute(
+        update(LlmResponse)
+        .where(LlmResponse.cache_key == cache_key, LlmResponse.created_at >= fresh_after)
+        .values(last_used_at=datetime.now(timezone.utc), hit_count=LlmResponse.hit_count + 1)
+        .returning(LlmResponse.items, LlmResponse.total_tokens)
+    )
+    row = result.first()
+    await db.commit()
+    return (row.items, row.total_tokens) if row is not None else None
+
+
+async def store_llm_response(
+    db: AsyncSession,
+    cache_key: str,
+    model: str,
+    prompt: str,
+    items: List[Dict[str, Any]],
+    total_tokens: Optional[int],
+    fresh_after: datetime,
+    max_entries: int,
+) -> int:
+    """
+    Cache a model response, then evict expired rows and the least recently used beyond max_entries.
+
+    :param db: Async database session
+    :param cache_key: Key built by scraper.llm_cache.cache_key
+    :param model: Model that produced the response
+    :param prompt: Normalized user prompt (kept for inspection)
+    :param items: Parsed items to cache
+    :param total_tokens: Tokens the call used, if reported
+    :param fresh_after: Rows created before this are expired and deleted
+    :param max_entries: Number of rows to keep
+    :return: Number of rows evicted
+    """
+    now = datetime.now(timezone.utc)
+    values = {
+        'model': model,
+        'prompt': prompt,
+        'items': items,
+        'total_tokens': total_tokens,
+        'created_at': now,
+        'last_used_at': now,
+        'hit_count': 0,
+    }
+    stmt = _dialect_insert(db)(LlmResponse).values(cache_key=cache_key, **values)
+    await db.execute(stmt.on_conflict_do_update(index_elements=['cache_key'], set_=values))
+    keep = (
+        select(LlmResponse.cache_key)
+        .order_by(LlmResponse.last_used_at.desc(), LlmResponse.cache_key)
+        .limit(max_entries)
+    )
+    result = await db.execute(
+        delete(LlmResponse).where(
+            or_(LlmResponse.created_at < fresh_after, LlmResponse.cache_key.not_in(keep))
+        )
+    )
+    await db.commit()
+    return result.rowcount
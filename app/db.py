@@ -1,21 +1,39 @@
 """
 Database configuration for asynchronous SQLAlchemy.
 
-- Loads environment variables for Postgres connection.
+- Loads environment variables for Postgres connection and pool tuning.
 - Creates AsyncEngine and async_sessionmaker for DB sessions.
 - init_models() can be used to auto-create tables if not using Alembic.
+- warmup_pool() pre-opens connections; pool_stats() reports checkout wait and utilization.
+
+Pool settings (all optional):
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_POOL_WARMUP (connections opened at startup), DB_PGBOUNCER (transaction-mode pooling).
+
+Read replica (optional):
+    POSTGRES_REPLICA_HOST / POSTGRES_REPLICA_PORT route read-only sessions from
+    AsyncReadSessionLocal to a replica sharing the primary's credentials; REPLICA_PIN_SECONDS
+    is how long reads stay on the primary after a write. Without a replica host both session
+    makers use the primary engine.
 """
 
+import asyncio
 import os
+import time
+from typing import Any, Dict, Mapping
+from uuid import uuid4
 
 from dotenv import load_dotenv
+from sqlalchemy import text
 from sqlalchemy.engine import URL
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 load_dotenv()
 DATABASE_URL = URL.create(
@@ -27,13 +45,108 @@ DATABASE_URL = URL.create(
     database=os.environ['POSTGRES_DB'],
 )
 
-engine: AsyncEngine = create_async_engine(DATABASE_URL, echo=False)
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class PoolMetrics:
+    """Counters describing how long requests wait to check a connection out of the pool."""
+
+    def __init__(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        if timed_out:
+            self.timeouts += 1
+        else:
+            self.checkouts += 1
+        self.wait_seconds_total += waited
+        self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+
+def instrumented_pool_class(metrics: PoolMetrics) -> type[AsyncAdaptedQueuePool]:
+    """Return an AsyncAdaptedQueuePool subclass that records checkout wait time into metrics."""
+
+    class InstrumentedPool(AsyncAdaptedQueuePool):
+        def _do_get(self) -> Any:
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except PoolTimeoutError:
+                metrics.record(time.perf_counter() - start, timed_out=True)
+                raise
+            metrics.record(time.perf_counter() - start)
+            return conn
+
+    return InstrumentedPool
+
+
+def engine_options(env: Mapping[str, str], metrics: PoolMetrics) -> Dict[str, Any]:
+    """
+    Build create_async_engine keyword arguments from pool-related environment variables.
+
+    With DB_PGBOUNCER enabled, asyncpg's statement cache and SQLAlchemy's prepared-statement
+    cache are disabled and statements get unique names, as required by pgbouncer in
+    transaction pooling mode.
+
+    :param env: Environment mapping (normally os.environ)
+    :param metrics: PoolMetrics that the pool will record checkout waits into
+    :return: Keyword arguments for create_async_engine
+    """
+    options: Dict[str, Any] = {
+        'echo': False,
+        'poolclass': instrumented_pool_class(metrics),
+        'pool_size': int(env.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(env.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': float(env.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(env.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': _flag(env.get('DB_POOL_PRE_PING', '1')),
+    }
+    if _flag(env.get('DB_PGBOUNCER', '0')):
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f'__asyncpg_{uuid4()}__',
+        }
+    return options
+
+
+pool_metrics = PoolMetrics()
+POOL_WARMUP = int(os.getenv('DB_POOL_WARMUP', '0'))
+
+engine: AsyncEngine = create_async_engine(DATABASE_URL, **engine_options(os.environ, pool_metrics))
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
 
+REPLICA_HOST = os.getenv('POSTGRES_REPLICA_HOST')
+REPLICA_PIN_SECONDS = float(os.getenv('REPLICA_PIN_SECONDS', '5'))
+replica_pool_metrics = PoolMetrics()
+if REPLICA_HOST:
+    REPLICA_DATABASE_URL = DATABASE_URL.set(
+        host=REPLICA_HOST,
+        port=int(os.getenv('POSTGRES_REPLICA_PORT', os.environ['POSTGRES_PORT'])),
+    )
+    replica_engine: AsyncEngine = create_async_engine(
+        REPLICA_DATABASE_URL, **engine_options(os.environ, replica_pool_metrics)
+    )
+else:
+    replica_engine = engine
+HAS_REPLICA = replica_engine is not engine
+
+# Sessions for read-only handlers; bound to the replica when one is configured.
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=replica_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 async def init_models() -> None:
     """Optional: auto-create tables at startup if you’re not using Alembic."""
@@ -42,3 +155,58 @@ async def init_models() -> None:
     async with engine.begin() as conn:
         # Create database tables based on ORM metadata if not using Alembic
         await conn.run_sync(Base.metadata.create_all)
+
+
+async def warmup_pool(connections: int, target: AsyncEngine | None = None) -> int:
+    """
+    Open connections concurrently and return them to the pool so first requests skip setup.
+
+    :param connections: Number of connections to open (capped at pool_size + max_overflow)
+    :param target: Engine to warm up (defaults to the primary engine)
+    :return: Number of connections that were opened
+    """
+    target = target or engine
+    pool = target.pool
+    overflow = getattr(pool, '_max_overflow', 0)
+    if overflow >= 0:  # a negative max_overflow means unbounded
+        connections = min(connections, pool.size() + overflow)  # type: ignore[attr-defined]
+    if connections <= 0:
+        return 0
+    conns = await asyncio.gather(*(target.connect() for _ in range(connections)))
+    try:
+        await asyncio.gather(*(conn.execute(text('SELECT 1')) for conn in conns))
+    finally:
+        await asyncio.gather(*(conn.close() for conn in conns))
+    return len(conns)
+
+
+def pool_stats(
+    target: AsyncEngine | None = None, metrics: PoolMetrics | None = None
+) -> Dict[str, Any]:
+    """
+    Report pool occupancy and checkout wait counters.
+
+    :param target: Engine whose pool to inspect (defaults to the primary engine)
+    :param metrics: Metrics recorded by that engine's pool (defaults to pool_metrics)
+    :return: Dict with size, checked-out count, utilization and wait statistics
+    """
+    target = target or engine
+    metrics = metrics or pool_metrics
+    pool = target.pool
+    size = pool.size()  # type: ignore[attr-defined]
+    capacity = size + max(getattr(pool, '_max_overflow', 0), 0)
+    checked_out = pool.checkedout()  # type: ignore[attr-defined]
+    return {
+        'size': size,
+        'max_overflow': getattr(pool, '_max_overflow', 0),
+        'checked_out': checked_out,
+        'overflow': pool.overflow(),  # type: ignore[attr-defined]
+        'utilization': checked_out / capacity if capacity else 0.0,
+        'checkouts': metrics.checkouts,
+        'timeouts': metrics.timeouts,
+        'wait_seconds_total': metrics.wait_seconds_total,
+        'wait_seconds_avg': metrics.wait_seconds_total / metrics.checkouts
+        if metrics.checkouts
+        else 0.0,
+        'wait_seconds_max': metrics.wait_seconds_max,
+    }
@@ -0,0 +1,57 @@
+"""
+Downsampling helpers for chart series.
+
+Implements largest-triangle-three-buckets (LTTB), which keeps the points that best
+preserve the visual shape of a series when it has to be reduced to a fixed size.
+"""
+
+from typing import List, Sequence, Tuple
+
+
+def lttb(points: Sequence[Tuple[float, float]], threshold: int) -> List[int]:
+    """
+    Select at most ``threshold`` points from an x-ordered series using LTTB.
+
+    The first and last points are always kept; every bucket in between contributes the point
+    forming the largest triangle with the previously kept point and the next bucket's average.
+
+    :param points: (x, y) pairs ordered by x
+    :param threshold: Maximum number of points to keep (values below 3 keep the endpoints only)
+    :return: Indices into ``points`` of the kept points, in ascending order
+    """
+    n = len(points)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    if threshold < 3:
+        return [0, n - 1]
+
+    kept = [0]
+    # Interior points are split into (threshold - 2) buckets of roughly equal size.
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+
+        # Average of the next bucket (or the last point for the final bucket).
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= n - 1 or next_start >= next_end:
+            avg_x, avg_y = points[n - 1]
+        else:
+            span = points[next_start:next_end]
+            avg_x = sum(p[0] for p in span) / len(span)
+            avg_y = sum(p[1] for p in span) / len(span)
+
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        kept.append(best)
+        a = best
+
+    kept.append(n - 1)
+    return kept
@@ -0,0 +1,166 @@
+"""
+In-process background jobs for work that should not hold an HTTP request open.
+
+A JobManager runs coroutines as asyncio tasks behind a semaphore, so at most
+``max_concurrency`` jobs do work at once and at most ``max_pending`` are queued or running.
+Job state lives in memory: ``GET /jobs/{id}`` is answered by the worker that accepted the job,
+and finished jobs are forgotten oldest-first once more than ``max_finished`` are kept.
+"""
+
+import asyncio
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from uuid import uuid4
+
+# queued -> running -> succeeded | failed; running jobs report finer progress in Job.stage
+JOB_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+_DONE = ('succeeded', 'failed')
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when max_pending jobs are already queued or running."""
+
+
+class Job:
+    """Status of one background job, updated in place by the job's coroutine."""
+
+    def __init__(self, kind: str, product_id: Optional[int] = None) -> None:
+        self.id = uuid4().hex
+        self.kind = kind
+        self.product_id = product_id
+        self.status = 'queued'
+        self.stage: Optional[str] = None
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.run_id: Optional[int] = None
+        self.item_count: Optional[int] = None
+        self.error: Optional[str] = None
+        self._done = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in _DONE
+
+
+JobWork = Callable[[Job], Awaitable[Any]]
+
+
+class JobManager:
+    """
+    Bounded executor for background jobs with status lookup by id.
+
+    :param max_concurrency: Jobs allowed to run at the same time
+    :param max_pending: Jobs allowed to be queued or running before submit is refused
+    :param max_finished: Finished jobs kept for status lookups
+    """
+
+    def __init__(self, max_concurrency: int = 2, max_pending: int = 100, max_finished: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._tasks: Set[asyncio.Task[None]] = set()
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> 'JobManager':
+        """Build a manager configured by JOB_MAX_CONCURRENCY/MAX_PENDING/MAX_FINISHED."""
+        return cls(
+            max_concurrency=int(os.getenv('JOB_MAX_CONCURRENCY', '2')),
+            max_pending=int(os.getenv('JOB_MAX_PENDING', '100')),
+            max_finished=int(os.getenv('JOB_MAX_FINISHED', '1000')),
+        )
+
+    @property
+    def full(self) -> bool:
+        """True when submit would be refused."""
+        return len(self._tasks) >= self.max_pending
+
+    def submit(self, kind: str, work: JobWork, product_id: Optional[int] = None) -> Job:
+        """
+        Queue work to run in the background and return its Job immediately.
+
+        :param kind: Short label for the job type (e.g. 'scrape')
+        :param work: Coroutine function receiving the Job; it may set stage, run_id and item_count
+        :param product_id: Product the job works on, if any
+        :return: The queued Job
+        :raises JobQueueFull: If max_pending jobs are already queued or running
+        """
+        if self.full:
+            self.rejected += 1
+            raise JobQueueFull(f'{len(self._tasks)} jobs are already pending')
+        job = Job(kind, product_id)
+        self._jobs[job.id] = job
+        self.submitted += 1
+        task = asyncio.create_task(self._run(job, work))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job: Job, work: JobWork) -> None:
+        try:
+            async with self._slots:
+                job.status = 'running'
+                job.started_at = datetime.now(timezone.utc)
+                await work(job)
+            job.status = 'succeeded'
+            self.succeeded += 1
+        except asyncio.CancelledError:
+            job.status, job.error = 'failed', 'cancelled'
+            self.failed += 1
+            raise
+        except Exception as e:
+            job.status, job.error = 'failed', f'{type(e).__name__}: {e}'
+            self.failed += 1
+        finally:
+            job.finished_at = datetime.now(timezone.utc)
+            job._done.set()
+            self._prune()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[: max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job with job_id, or None if it is unknown or was pruned."""
+        return self._jobs.get(job_id)
+
+    async def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        """
+        Wait until a job finishes.
+
+        :param job_id: Job to wait for
+        :param timeout: Seconds to wait before asyncio.TimeoutError (None waits forever)
+        :return: The finished Job, or None if it is unknown
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            await asyncio.wait_for(job._done.wait(), timeout)
+        return job
+
+    async def shutdown(self) -> None:
+        """Cancel queued and running jobs and wait for them to stop."""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return job counters and current queue depth."""
+        return {
+            'pending': len(self._tasks),
+            'max_concurrency': self.max_concurrency,
+            'max_pending': self.max_pending,
+            'submitted': self.submitted,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'rejected': self.rejected,
+        }
@@ -5,17 +5,35 @@ Provides endpoints to create and list products, manage snapshots,
 and query snapshot history and best price information.
 """
 
+import hashlib
+import os
 from contextlib import asynccontextmanager
 from datetime import date, datetime, time, timezone
-from typing import AsyncGenerator, List, Optional
+from math import ceil
+from time import monotonic
+from typing import Any, AsyncGenerator, Awaitable, Dict, List, Optional, Tuple
 
-from fastapi import Depends, FastAPI, HTTPException, Query
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app import crud, schemas
-from app.db import AsyncSessionLocal
-from scraper.openai_client import fetch_shopping_items
+from app import db as app_db
+from app.cache import GLOBAL_SCOPE, ReadCache
+from app.db import AsyncReadSessionLocal, AsyncSessionLocal
+from app.jobs import Job, JobManager, JobQueueFull
+from app.urls import url_cache
+from scraper.llm_cache import LLMResponseCache
+from scraper.openai_client import (
+    backend,
+    coalescer,
+    fetch_shopping_items,
+    stream_shopping_items,
+    upstream,
+)
+from scraper.pipeline import STREAM_SCRAPES, fetch_run, save_run, stream_run
 
 
 @asynccontextmanager
@@ -23,7 +41,7 @@ async def lifespan(app: FastAPI):  # type: ignore
     # auto-create tables if they do not exist, retry until the database is ready
     import asyncio
 
-    from app.db import init_models
+    from app.db import HAS_REPLICA, POOL_WARMUP, init_models, replica_engine, warmup_pool
 
     retries = 5
     while True:
@@ -35,21 +53,54 @@ async def lifespan(app: FastAPI):  # type: ignore
             if not retries:
                 raise
             await asyncio.sleep(2)
+    # pre-open pooled connections so the first requests after boot skip connection setup
+    if POOL_WARMUP > 0:
+        await warmup_pool(POOL_WARMUP)
+        if HAS_REPLICA:
+            await warmup_pool(POOL_WARMUP, replica_engine)
     yield
+    await scrape_jobs.shutdown()
 
 
 app = FastAPI(title='gpt-shop-viz', lifespan=lifespan)
+
+# Shared LRU/TTL cache for the read endpoints, invalidated per product on writes below
+read_cache = ReadCache.from_env()
+# Bounded executor for scrapes started by the API, so requests never wait on the model
+scrape_jobs = JobManager.from_env()
+# Persistent cache of model answers; the factory is resolved per call so tests can swap it
+llm_cache = LLMResponseCache.from_env(lambda: app_db.AsyncSessionLocal())
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],
     allow_credentials=True,
     allow_methods=['*'],
     allow_headers=['*'],
+    expose_headers=['ETag'],
 )
 
 
 # Use module-level constants for Query defaults to satisfy lint rules (B008)
-_DEFAULT_DATE_QUERY = Query(None)
+_START_DATE_QUERY = Query(None)
+_END_DATE_QUERY = Query(None)
+_PAGE_LIMIT_QUERY = Query(50, ge=1, le=200)
+_FIELDS_QUERY = Query(None, description='Comma-separated product fields to return')
+_MAX_POINTS_QUERY = Query(None, ge=3, le=5000, description='Downsample to at most N buckets')
+_RUNS_LIMIT_QUERY = Query(20, ge=1, le=500)
+_IDS_QUERY = Query(..., description='Comma-separated product ids')
+
+# Upper bound on rows accepted by POST /snapshots/batch in one request
+_MAX_SNAPSHOT_BATCH = 1000
+
+# Upper bound on products summarized by one GET /products/dashboard request
+_MAX_DASHBOARD_IDS = 500
+
+# Rows encoded per chunk written by the NDJSON history stream
+_NDJSON_CHUNK_ROWS = 200
+
+# Opt-in fast JSON path for the product list/detail and history endpoints: read column tuples
+# and encode them with a pydantic-core TypeAdapter instead of validating a model per row.
+FAST_JSON = os.getenv('FAST_JSON_RESPONSES', '0').lower() in ('1', 'true', 'yes')
 
 
 @app.get('/health', tags=['health'])
@@ -57,6 +108,37 @@ async def health_check() -> dict[str, str]:
     return {'status': 'ok'}
 
 
+@app.get('/stats/cache', tags=['health'])
+async def cache_stats() -> dict[str, Any]:
+    """Hit/miss/eviction counters of the read cache, URL intern cache and LLM response cache."""
+    return {
+        **read_cache.stats(),
+        'url_intern': url_cache.stats(),
+        'llm_responses': llm_cache.stats(),
+    }
+
+
+@app.get('/stats/upstream', tags=['health'])
+async def upstream_stats() -> dict[str, Any]:
+    """Model API call, retry, circuit-breaker and request-coalescing counters for this process."""
+    return {**upstream.stats(), 'coalescing': coalescer.stats(), 'backend': backend.stats()}
+
+
+@app.get('/stats/jobs', tags=['health'])
+async def job_stats() -> dict[str, Any]:
+    """Queue depth and outcome counters of the background scrape executor."""
+    return scrape_jobs.stats()
+
+
+@app.get('/stats/pool', tags=['health'])
+async def pool_stats() -> dict[str, Any]:
+    """Connection pool utilization and checkout wait time."""
+    stats = {'primary': app_db.pool_stats()}
+    if app_db.HAS_REPLICA:
+        stats['replica'] = app_db.pool_stats(app_db.replica_engine, app_db.replica_pool_metrics)
+    return stats
+
+
 # The database initialization has been moved into the lifespan context above.
 
 
@@ -70,39 +152,326 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
 
 db_dep = Depends(get_db)
 
+# Cookie marking a client that just wrote, so its follow-up reads skip the lagging replica
+_PIN_COOKIE = 'db_pin'
+# product_id -> monotonic deadline until which reads of that product stay on the primary
+_primary_pins: Dict[int, float] = {}
+
+
+def _pin_products(*product_ids: int) -> None:
+    """Route every client's reads of these products to the primary for REPLICA_PIN_SECONDS."""
+    if not app_db.HAS_REPLICA:
+        return
+    now = monotonic()
+    if len(_primary_pins) > 1024:
+        for pid in [pid for pid, deadline in _primary_pins.items() if deadline <= now]:
+            del _primary_pins[pid]
+    for pid in product_ids:
+        _primary_pins[pid] = now + app_db.REPLICA_PIN_SECONDS
+
+
+def _pin_primary(response: Response, *product_ids: int) -> None:
+    """Route this client's and these products' reads to the primary for REPLICA_PIN_SECONDS."""
+    if not app_db.HAS_REPLICA:
+        return
+    _pin_products(*product_ids)
+    response.set_cookie(
+        _PIN_COOKIE,
+        'primary',
+        max_age=ceil(app_db.REPLICA_PIN_SECONDS),
+        httponly=True,
+        samesite='lax',
+    )
+
+
+def _use_primary(request: Request) -> bool:
+    """Whether a read request must see the primary (no replica, or a recent write)."""
+    if not app_db.HAS_REPLICA or request.cookies.get(_PIN_COOKIE) == 'primary':
+        return True
+    product_id = request.path_params.get('product_id')
+    # runs before path validation: leave malformed ids to the route's 422
+    if product_id is None or not str(product_id).isdigit():
+        return False
+    return _primary_pins.get(int(product_id), 0.0) > monotonic()
+
+
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """Session for GET handlers: the replica unless the request is pinned to the primary."""
+    maker = AsyncSessionLocal if _use_primary(request) else AsyncReadSessionLocal
+    session: AsyncSession = maker()
+    try:
+        yield session
+    finally:
+        await session.close()
+
+
+read_db_dep = Depends(get_read_db)
+
+
+def _etag(product_id: int, version: Optional[int], *params: Any) -> Optional[str]:
+    """
+    Build a strong ETag from a product's write generation and the request parameters.
+
+    Missing products (version None) get no ETag, so they are never answered with a 304.
+    """
+    if version is None:
+        return None
+    digest = hashlib.blake2b(repr(params).encode(), digest_size=6).hexdigest()
+    return f'"{product_id}-{version}-{digest}"'
+
+
+async def _product_version(db: AsyncSession, product_id: int) -> Optional[int]:
+    """
+    Return the product's write generation (None if it does not exist), via the read cache.
+
+    Cached bodies are keyed by this version, so a body and its ETag always agree even while a
+    write from another process is still hidden by the cache TTL.
+    """
+    return await read_cache.get_or_load(
+        product_id, ('version',), lambda: crud.get_product_version(db, product_id)
+    )
+
+
+async def _encode(adapter: TypeAdapter[Any], rows: Awaitable[Any]) -> bytes:
+    """Await the rows and encode them to JSON bytes in one pass."""
+    return adapter.dump_json(await rows)
+
+
+def _json_response(body: bytes, response: Response) -> Response:
+    """Wrap pre-encoded JSON, keeping headers (ETag, Cache-Control) already set on response."""
+    return Response(content=body, media_type='application/json', headers=dict(response.headers))
+
+
+def _date_range(
+    start_date: Optional[date], end_date: Optional[date]
+) -> tuple[Optional[datetime], Optional[datetime]]:
+    """Convert inclusive query dates to UTC datetimes spanning whole days (None stays None)."""
+    start_dt = (
+        datetime.combine(start_date, time.min).replace(tzinfo=timezone.utc) if start_date else None
+    )
+    end_dt = datetime.combine(end_date, time.max).replace(tzinfo=timezone.utc) if end_date else None
+    return start_dt, end_dt
+
+
+def _check_etag(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Return a 304 response if the client's If-None-Match matches etag.
 
-@app.post('/products', response_model=schemas.ProductRead)
+    Otherwise attach the ETag to the outgoing response and return None. ``no-cache`` makes
+    browsers revalidate every time, which is what turns unchanged polls into 304s. Without an
+    etag (the product does not exist) the request always falls through to the handler.
+    """
+    if etag is None:
+        return None
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        if etag in tags or '*' in tags:
+            return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+async def _scrape_product(job: Job, product_id: int, prompt: str, bypass_cache: bool) -> None:
+    """Background job body: fetch items for prompt and store them as a scrape run."""
+    if STREAM_SCRAPES:
+        job.stage = 'streaming'
+
+        def _stored(count: int) -> None:
+            job.item_count = count
+            # the write is newer than the 202's pin; keep reads off the lagging replica
+            _pin_products(product_id)
+            read_cache.invalidate(product_id)
+
+        # The request's session is closed once the 202 is sent, so the job opens its own
+        async with app_db.AsyncSessionLocal() as session:
+            run, _ = await stream_run(
+                session,
+                product_id,
+                prompt,
+                stream=stream_shopping_items,
+                cache=llm_cache,
+                bypass_cache=bypass_cache,
+                on_items=_stored,
+            )
+        job.run_id, job.item_count = run.id, run.item_count
+        return
+    job.stage = 'fetching'
+    fetched = await fetch_run(
+        prompt, fetch=fetch_shopping_items, cache=llm_cache, bypass_cache=bypass_cache
+    )
+    job.stage = 'saving'
+    async with app_db.AsyncSessionLocal() as session:
+        run, snapshots = await save_run(session, product_id, fetched)
+    _pin_products(product_id)
+    read_cache.invalidate(product_id)
+    job.run_id, job.item_count = run.id, len(snapshots)
+
+
+def _queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=503, detail='Too many scrapes in progress', headers={'Retry-After': '5'}
+    )
+
+
+@app.post('/products', response_model=schemas.ProductAccepted, status_code=202)
 async def create_product(
-    product_in: schemas.ProductCreate, db: AsyncSession = db_dep
-) -> schemas.ProductRead:
-    # create product entry and bootstrap initial snapshots via OpenAI
+    product_in: schemas.ProductCreate,
+    response: Response,
+    bypass_cache: bool = False,
+    db: AsyncSession = db_dep,
+) -> schemas.ProductAccepted:
+    """
+    Create a product and queue its initial scrape, returning 202 without waiting for the model.
+
+    Poll ``GET /jobs/{job_id}`` (also sent as the Location header) for the scrape's progress.
+    With SCRAPE_STREAMING (the default) each item is stored as soon as the model has generated
+    it and the job's item_count grows as they arrive; otherwise snapshots appear once the job
+    has succeeded. A prompt answered within LLM_CACHE_TTL_SECONDS is served from the response
+    cache unless ``bypass_cache`` is set.
+    """
+    if scrape_jobs.full:
+        raise _queue_full()
     product = await crud.create_product(db, product_in)
-    items = await fetch_shopping_items(product.prompt or product.name)
-    for item in items:
-        snap_in = schemas.SnapshotCreate(
+    read_cache.invalidate(product.id)
+    prompt = product.prompt or product.name
+    try:
+        job = scrape_jobs.submit(
+            'scrape',
+            lambda job: _scrape_product(job, product.id, prompt, bypass_cache),
             product_id=product.id,
-            title=item['title'],
-            price=item.get('price'),
-            urls=item.get('urls', []),
         )
-        await crud.create_snapshot(db, snap_in)
-    return product
+    except JobQueueFull as e:
+        # the queue filled up while the product was being created; don't leave it unscraped
+        await crud.delete_products(db, [product.id])
+        read_cache.invalidate(product.id)
+        raise _queue_full() from e
+    _pin_primary(response, product.id)
+    response.headers['Location'] = f'/jobs/{job.id}'
+    return schemas.ProductAccepted(**product.model_dump(), job_id=job.id)
+
+
+@app.get('/jobs/{job_id}', response_model=schemas.JobRead)
+async def read_job(job_id: str) -> schemas.JobRead:
+    """Report the status of a background job started by this API process."""
+    job = scrape_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    return schemas.JobRead.model_validate(job)
 
 
 @app.get('/products', response_model=List[schemas.ProductRead])
 async def list_products(
-    db: AsyncSession = db_dep,
-) -> List[schemas.ProductRead]:
-    return await crud.get_products(db)
+    response: Response,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.ProductRead] | Response:
+    if FAST_JSON:
+        body = await read_cache.get_or_load(
+            GLOBAL_SCOPE,
+            ('products', 'json'),
+            lambda: _encode(schemas.product_rows_adapter, crud.get_product_rows(db)),
+        )
+        return _json_response(body, response)
+    return await read_cache.get_or_load(GLOBAL_SCOPE, ('products',), lambda: crud.get_products(db))
+
+
+@app.get(
+    '/products/page',
+    response_model=schemas.ProductPage,
+    response_model_exclude_unset=True,
+)
+async def list_products_page(
+    limit: int = _PAGE_LIMIT_QUERY,
+    after: Optional[int] = None,
+    name: Optional[str] = None,
+    prompt: Optional[str] = None,
+    fields: Optional[str] = _FIELDS_QUERY,
+    summary: bool = False,
+    db: AsyncSession = read_db_dep,
+) -> schemas.ProductPage:
+    """
+    List products one page at a time, without their snapshots.
+
+    Pass the returned ``next_cursor`` as ``after`` to fetch the following page. ``fields``
+    restricts the product columns returned (id is always included) and ``summary`` adds the
+    latest price and snapshot count per product.
+    """
+    selected: Tuple[str, ...] = crud.PRODUCT_LIST_FIELDS
+    if fields is not None:
+        selected = tuple(f.strip() for f in fields.split(',') if f.strip())
+        unknown = set(selected) - set(crud.PRODUCT_LIST_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=422, detail=f'Unknown product fields: {", ".join(sorted(unknown))}'
+            )
+    return await read_cache.get_or_load(
+        GLOBAL_SCOPE,
+        ('products_page', limit, after, name, prompt, selected, summary),
+        lambda: crud.get_products_page(
+            db,
+            limit=limit,
+            after=after,
+            name=name,
+            prompt=prompt,
+            fields=selected,
+            with_summary=summary,
+        ),
+    )
+
+
+@app.get('/products/dashboard', response_model=List[schemas.DashboardItem])
+async def products_dashboard(
+    ids: str = _IDS_QUERY,
+    start_date: Optional[date] = _START_DATE_QUERY,
+    end_date: Optional[date] = _END_DATE_QUERY,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.DashboardItem]:
+    """
+    Get the latest snapshot and the lowest-price snapshot of many products in one call.
+
+    ``ids`` is a comma-separated list of product ids (at most _MAX_DASHBOARD_IDS). The lowest
+    price is searched between start_date and end_date inclusive, or over all captures when both
+    are omitted. Unknown ids come back with ``latest`` and ``best`` set to null.
+    """
+    try:
+        product_ids = [int(part) for part in ids.split(',') if part.strip()]
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail='ids must be comma-separated integers') from e
+    if not product_ids or len(product_ids) > _MAX_DASHBOARD_IDS:
+        raise HTTPException(
+            status_code=422, detail=f'Between 1 and {_MAX_DASHBOARD_IDS} ids are required'
+        )
+    start_dt, end_dt = _date_range(start_date, end_date)
+    return await read_cache.get_or_load(
+        GLOBAL_SCOPE,
+        ('dashboard', tuple(product_ids), start_date, end_date),
+        lambda: crud.get_dashboard(db, product_ids, start_dt, end_dt),
+    )
 
 
 @app.get('/products/{product_id}', response_model=schemas.ProductRead)
 async def read_product(
     product_id: int,
-    db: AsyncSession = db_dep,
-) -> schemas.ProductRead:
+    request: Request,
+    response: Response,
+    db: AsyncSession = read_db_dep,
+) -> schemas.ProductRead | Response:
     """Get a single product and all its snapshots."""
-    prod = await crud.get_product(db, product_id)
+    version = await _product_version(db, product_id)
+    not_modified = _check_etag(request, response, _etag(product_id, version, 'product'))
+    if not_modified:
+        return not_modified
+    if FAST_JSON:
+        rows = await read_cache.get_or_load(
+            product_id, ('product', version, 'rows'), lambda: crud.get_product_rows(db, product_id)
+        )
+        if not rows:
+            raise HTTPException(status_code=404, detail='Product not found')
+        return _json_response(schemas.product_row_adapter.dump_json(rows[0]), response)
+    prod = await read_cache.get_or_load(
+        product_id, ('product', version), lambda: crud.get_product(db, product_id)
+    )
     if not prod:
         raise HTTPException(status_code=404, detail='Product not found')
     return prod
@@ -110,58 +479,211 @@ async def read_product(
 
 @app.post('/snapshot', response_model=schemas.SnapshotRead)
 async def create_snapshot(
-    snap_in: schemas.SnapshotCreate, db: AsyncSession = db_dep
+    snap_in: schemas.SnapshotCreate, response: Response, db: AsyncSession = db_dep
 ) -> schemas.SnapshotRead:
     # ensure the parent product exists
     product = await crud.get_product(db, snap_in.product_id)
     if not product:
         raise HTTPException(status_code=404, detail='Product not found')
-    return await crud.create_snapshot(db, snap_in)
+    snap = await crud.create_snapshot(db, snap_in)
+    read_cache.invalidate(snap.product_id)
+    _pin_primary(response, snap.product_id)
+    return snap
+
+
+@app.post('/snapshots/batch', response_model=List[schemas.SnapshotRead])
+async def create_snapshots_batch(
+    snaps_in: List[schemas.SnapshotCreate], response: Response, db: AsyncSession = db_dep
+) -> List[schemas.SnapshotRead]:
+    """
+    Create many snapshots in one round-trip and one commit.
+
+    Snapshots are returned in request order. The whole batch is rejected if any referenced
+    product does not exist.
+    """
+    if len(snaps_in) > _MAX_SNAPSHOT_BATCH:
+        raise HTTPException(
+            status_code=413, detail=f'At most {_MAX_SNAPSHOT_BATCH} snapshots per batch'
+        )
+    wanted = {s.product_id for s in snaps_in}
+    missing = wanted - await crud.get_existing_product_ids(db, list(wanted))
+    if missing:
+        raise HTTPException(
+            status_code=404,
+            detail=f'Product not found: {", ".join(str(pid) for pid in sorted(missing))}',
+        )
+    snaps = await crud.create_snapshots_bulk(db, snaps_in)
+    for product_id in wanted:
+        read_cache.invalidate(product_id)
+    _pin_primary(response, *wanted)
+    return snaps
 
 
 @app.get('/products/{product_id}/latest', response_model=List[schemas.SnapshotRead])
 async def latest_snapshots(
     product_id: int,
-    db: AsyncSession = db_dep,
-) -> List[schemas.SnapshotRead]:
+    request: Request,
+    response: Response,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.SnapshotRead] | Response:
     """
-    Get all snapshots for a product at the most recent capture time.
+    Get all snapshots observed by the product's most recent scrape run.
     """
-    snaps = await crud.get_latest_snapshots(db, product_id)
+    version = await _product_version(db, product_id)
+    not_modified = _check_etag(request, response, _etag(product_id, version, 'latest'))
+    if not_modified:
+        return not_modified
+    snaps = await read_cache.get_or_load(
+        product_id, ('latest', version), lambda: crud.get_latest_snapshots(db, product_id)
+    )
     if not snaps:
         raise HTTPException(status_code=404, detail='Snapshot not found')
     return snaps
 
 
+@app.get('/products/{product_id}/runs', response_model=List[schemas.ScrapeRunRead])
+async def scrape_runs(
+    product_id: int,
+    limit: int = _RUNS_LIMIT_QUERY,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.ScrapeRunRead]:
+    """
+    List the product's most recent scrape runs with their item count and model call duration.
+    """
+    return await crud.get_scrape_runs(db, product_id, limit)
+
+
+@app.put('/products/{product_id}/refresh_interval', response_model=schemas.RefreshInterval)
+async def update_refresh_interval(
+    product_id: int, body: schemas.RefreshInterval, db: AsyncSession = db_dep
+) -> schemas.RefreshInterval:
+    """
+    Set how often the refresh scheduler re-scrapes the product.
+
+    ``null`` uses the scheduler's default interval and ``0`` disables automatic refreshes. The
+    scheduler picks the change up on its next reload.
+    """
+    product = await crud.set_refresh_interval(db, product_id, body.refresh_interval_minutes)
+    if product is None:
+        raise HTTPException(status_code=404, detail='Product not found')
+    return schemas.RefreshInterval.model_validate(product)
+
+
 @app.get('/products/{product_id}/history', response_model=List[schemas.SnapshotRead])
 async def snapshot_history(
-    product_id: int, days: int = 7, db: AsyncSession = db_dep
-) -> List[schemas.SnapshotRead]:
-    return await crud.get_snapshot_history(db, product_id, days)
+    product_id: int,
+    request: Request,
+    response: Response,
+    days: int = 7,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.SnapshotRead] | Response:
+    version = await _product_version(db, product_id)
+    # The window slides with time, so its oldest row is part of the validator too.
+    window_start = await read_cache.get_or_load(
+        product_id,
+        ('history_window', days),
+        lambda: crud.get_history_window_start(db, product_id, days),
+    )
+    etag = _etag(product_id, version, 'history', days, window_start)
+    not_modified = _check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+    if FAST_JSON:
+        body = await read_cache.get_or_load(
+            product_id,
+            ('history', days, version, window_start, 'json'),
+            lambda: _encode(
+                schemas.snapshot_rows_adapter,
+                crud.get_snapshot_history_rows(db, product_id, days),
+            ),
+        )
+        return _json_response(body, response)
+    return await read_cache.get_or_load(
+        product_id,
+        ('history', days, version, window_start),
+        lambda: crud.get_snapshot_history(db, product_id, days),
+    )
+
+
+@app.get('/products/{product_id}/history/stream')
+async def snapshot_history_stream(
+    product_id: int, request: Request, days: int = 7
+) -> StreamingResponse:
+    """
+    Stream a product's snapshot history as NDJSON, one SnapshotRead object per line.
+
+    Rows are read from a server-side cursor and flushed in chunks, so memory stays flat for any
+    range and clients can start rendering as soon as the first chunk arrives.
+    """
+    use_primary = _use_primary(request)
+
+    async def _ndjson() -> AsyncGenerator[bytes, None]:
+        # The request-scoped session is closed before the body is sent, so the stream opens its
+        # own session for the lifetime of the cursor.
+        maker = app_db.AsyncSessionLocal if use_primary else app_db.AsyncReadSessionLocal
+        async with maker() as session:
+            lines: List[str] = []
+            async for snap in crud.stream_snapshot_history(session, product_id, days):
+                lines.append(snap.model_dump_json())
+                if len(lines) >= _NDJSON_CHUNK_ROWS:
+                    yield ('\n'.join(lines) + '\n').encode()
+                    lines.clear()
+            if lines:
+                yield ('\n'.join(lines) + '\n').encode()
+
+    return StreamingResponse(_ndjson(), media_type='application/x-ndjson')
+
+
+@app.get('/products/{product_id}/history/ohlc', response_model=List[schemas.PriceBucket])
+async def snapshot_history_ohlc(
+    product_id: int,
+    days: int = 7,
+    bucket: schemas.BucketSize = 'day',
+    max_points: Optional[int] = _MAX_POINTS_QUERY,
+    db: AsyncSession = read_db_dep,
+) -> List[schemas.PriceBucket]:
+    """
+    Get open/high/low/close prices per hour, day or week over the past N days.
+
+    With ``max_points`` the series is downsampled (LTTB) so chart payloads stay a fixed size
+    for any date range.
+    """
+    return await read_cache.get_or_load(
+        product_id,
+        ('ohlc', days, bucket, max_points),
+        lambda: crud.get_price_buckets(db, product_id, days, bucket, max_points),
+    )
 
 
 @app.get('/products/{product_id}/best_price', response_model=schemas.SnapshotRead)
 async def best_price(
     product_id: int,
-    start_date: Optional[date] = _DEFAULT_DATE_QUERY,
-    end_date: Optional[date] = _DEFAULT_DATE_QUERY,
-    db: AsyncSession = db_dep,
-) -> schemas.SnapshotRead:
+    start_date: Optional[date] = _START_DATE_QUERY,
+    end_date: Optional[date] = _END_DATE_QUERY,
+    *,
+    request: Request,
+    response: Response,
+    db: AsyncSession = read_db_dep,
+) -> schemas.SnapshotRead | Response:
     """
     Get the snapshot with the lowest price for a product between start_date and end_date inclusive.
     If start_date is missing, includes all snapshots from the earliest capture timestamp.
     If end_date is missing, uses the current UTC timestamp as the upper bound.
     """
+    version = await _product_version(db, product_id)
+    etag = _etag(product_id, version, 'best_price', start_date, end_date)
+    not_modified = _check_etag(request, response, etag)
+    if not_modified:
+        return not_modified
+
     # Convert query dates to UTC datetimes or leave lower bound unbounded
-    start_dt = (
-        datetime.combine(start_date, time.min).replace(tzinfo=timezone.utc) if start_date else None
-    )
-    end_dt = (
-        datetime.combine(end_date, time.max).replace(tzinfo=timezone.utc)
-        if end_date
-        else datetime.now(timezone.utc)
+    start_dt, end_dt = _date_range(start_date, end_date)
+    end_dt = end_dt or datetime.now(timezone.utc)
+    snap = await read_cache.get_or_load(
+        product_id,
+        ('best_price', start_date, end_date, version),
+        lambda: crud.get_lowest_price_period(db, product_id, start_dt, end_dt),
     )
-    snap = await crud.get_lowest_price_period(db, product_id, start_dt, end_dt)
     if not snap:
         raise HTTPException(status_code=404, detail='No snapshots found in the given date range')
     return snap
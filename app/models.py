@@ -5,14 +5,16 @@ Defines Product and Snapshot entities and their relationships.
 """
 
 from datetime import datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from sqlalchemy import (
     JSON,
     TIMESTAMP,
     ForeignKey,
+    Index,
     Integer,
     Numeric,
+    String,
     Text,
     func,
 )
@@ -28,6 +30,7 @@ class Product(Base):
     """
     Represents a tracked product, identified by name and optional user prompt.
     A Product can have multiple associated Snapshots capturing price and URL data over time.
+    refresh_interval_minutes drives scraper.scheduler: NULL uses its default, 0 disables it.
     """
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(Text, nullable=False)
@@ -37,8 +40,9 @@ class Product(Base):
         nullable=False,
         server_default=func.now(),
     )
+    refresh_interval_minutes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     snapshots: Mapped[List['Snapshot']] = relationship(
-        'Snapshot', back_populates='product', cascade='all, delete-orphan'
+        'Snapshot', back_populates='product', cascade='all, delete-orphan', order_by='Snapshot.id'
     )
 
 
@@ -46,7 +50,10 @@ class Snapshot(Base):
     __tablename__ = 'snapshots'
     """
     Represents a captured snapshot for a product at a specific timestamp.
-    Stores the title, optional price, and list of URLs where the product was found.
+    Stores the title, optional price, and list of URLs where the product was found; URLs are
+    interned in the urls table and linked in order through snapshot_urls.
+    On Postgres the table is range-partitioned by month on captured_at with primary key
+    (id, captured_at) (alembic revision 0006); ids stay unique, so the ORM keys on id alone.
     """
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
@@ -55,10 +62,173 @@ class Snapshot(Base):
     )
     title: Mapped[str] = mapped_column(Text, nullable=False)
     price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
-    urls: Mapped[list[str]] = mapped_column(JSON, nullable=True)
     captured_at: Mapped[datetime] = mapped_column(
         TIMESTAMP(timezone=True),
         nullable=False,
         server_default=func.now(),
     )
+    # Run-length dedupe: identical consecutive captures of an item extend last_seen_at instead
+    # of inserting a row. content_hash covers (product_id, title, price, urls); NULL for rows
+    # written before dedupe existed. last_seen_at is NULL until the row is first extended.
+    content_hash: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    last_seen_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    # Most recent scrape run that observed this row (moves forward when a run extends it).
+    run_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey('scrape_runs.id', ondelete='SET NULL'), nullable=True
+    )
     product: Mapped['Product'] = relationship('Product', back_populates='snapshots')
+    # snapshot_urls has no FK to snapshots: Postgres cannot reference the partitioned table by
+    # id alone, so the join is declared here and links are written by app.crud.
+    url_links: Mapped[List['SnapshotUrl']] = relationship(
+        'SnapshotUrl',
+        primaryjoin='Snapshot.id == foreign(SnapshotUrl.snapshot_id)',
+        order_by='SnapshotUrl.position',
+        lazy='selectin',
+        viewonly=True,
+    )
+
+    @property
+    def urls(self) -> List[str]:
+        """URLs where the product was found, in the order they were captured."""
+        return [link.url.url for link in self.url_links]
+
+
+class ScrapeRun(Base):
+    __tablename__ = 'scrape_runs'
+    """
+    One scrape of a product: when it started, how many items it returned, how long the model
+    call took and which model answered. Snapshots point at the latest run that observed them,
+    so a product's newest run resolves its full result set with two indexed lookups.
+    """
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('products.id', ondelete='CASCADE'), nullable=False
+    )
+    started_at: Mapped[datetime] = mapped_column(
+        TIMESTAMP(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+    )
+    item_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    duration_ms: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    model: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+
+class Url(Base):
+    __tablename__ = 'urls'
+    """
+    A distinct URL, stored once and referenced by id from every snapshot that lists it.
+    url_hash (SHA-256 hex of the URL) carries the uniqueness constraint so long URLs are not
+    indexed in full.
+    """
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    url_hash: Mapped[str] = mapped_column(String(64), nullable=False, unique=True)
+    url: Mapped[str] = mapped_column(Text, nullable=False)
+
+
+class SnapshotUrl(Base):
+    __tablename__ = 'snapshot_urls'
+    """
+    Ordered link between a snapshot and one of its interned URLs.
+    There is no foreign key to snapshots (Postgres cannot reference the partitioned table by id
+    alone), so every path that deletes snapshots deletes their links too:
+    crud.delete_products for products, partitions.expire_partitions for expired months, and
+    crud.delete_orphan_snapshot_urls as a sweep for anything deleted by hand.
+    """
+
+    snapshot_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    position: Mapped[int] = mapped_column(Integer, primary_key=True)
+    url_id: Mapped[int] = mapped_column(ForeignKey('urls.id'), nullable=False)
+    url: Mapped['Url'] = relationship('Url', lazy='joined', innerjoin=True)
+
+
+class LlmResponse(Base):
+    __tablename__ = 'llm_responses'
+    """
+    Parsed model output cached per (model, system prompt, normalized user prompt).
+    cache_key is the SHA-256 hex of that triple; rows expire after a TTL and the least recently
+    used rows are evicted beyond a size bound (see scraper.llm_cache).
+    """
+
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+    model: Mapped[str] = mapped_column(Text, nullable=False)
+    prompt: Mapped[str] = mapped_column(Text, nullable=False)
+    items: Mapped[List[Dict[str, Any]]] = mapped_column(JSON, nullable=False)
+    total_tokens: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    last_used_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=True), nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default='0')
+
+
+class ProductPriceStats(Base):
+    __tablename__ = 'product_price_stats'
+    """
+    Per-product price summary maintained incrementally on every snapshot insert.
+    Answers latest-price, all-time best/worst price and snapshot-count lookups with a single
+    primary-key read instead of scanning snapshots. Snapshot ids are plain integers (no FK)
+    so the table stays valid if snapshots is repartitioned.
+    """
+
+    product_id: Mapped[int] = mapped_column(
+        ForeignKey('products.id', ondelete='CASCADE'), primary_key=True
+    )
+    snapshot_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    # Bumped on every write touching the product; used as the ETag version for its reads.
+    generation: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default='1')
+    latest_snapshot_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    latest_price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    last_captured_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    min_snapshot_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    min_price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    min_captured_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+    max_snapshot_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    max_price: Mapped[Optional[float]] = mapped_column(Numeric(10, 2), nullable=True)
+    max_captured_at: Mapped[Optional[datetime]] = mapped_column(
+        TIMESTAMP(timezone=True), nullable=True
+    )
+
+
+# Composite indexes backing the per-product read paths in app.crud: latest/history
+# lookups walk (product_id, captured_at DESC), best-price lookups walk the partial
+# (product_id, price, captured_at DESC) index. Kept in sync with alembic revisions 0003
+# and 0006 (which recreates them on the partitioned table).
+Index(
+    'ix_snapshots_product_id_captured_at',
+    Snapshot.product_id,
+    Snapshot.captured_at.desc(),
+)
+Index(
+    'ix_snapshots_product_id_price_captured_at',
+    Snapshot.product_id,
+    Snapshot.price,
+    Snapshot.captured_at.desc(),
+    postgresql_where=Snapshot.price.is_not(None),
+    sqlite_where=Snapshot.price.is_not(None),
+)
+# History and lowest-price reads find runs captured before their range but seen inside it
+# through the partial (product_id, last_seen_at) index (alembic 0012).
+Index(
+    'ix_snapshots_product_id_last_seen_at',
+    Snapshot.product_id,
+    Snapshot.last_seen_at,
+    postgresql_where=Snapshot.last_seen_at.is_not(None),
+    sqlite_where=Snapshot.last_seen_at.is_not(None),
+)
+# /latest resolves the product's newest run, then fetches that run's rows (alembic 0009).
+Index(
+    'ix_scrape_runs_product_id_started_at',
+    ScrapeRun.product_id,
+    ScrapeRun.started_at.desc(),
+    ScrapeRun.id.desc(),
+)
+Index('ix_snapshots_run_id', Snapshot.run_id)
+# LRU eviction of cached model responses deletes the least recently used rows (alembic 0011).
+Index('ix_llm_responses_last_used_at', LlmResponse.last_used_at)
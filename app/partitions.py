@@ -0,0 +1,182 @@
+"""
+Monthly range partitioning helpers for the snapshots table.
+
+The snapshots table is partitioned by captured_at (see alembic revision 0006), with one
+partition per calendar month named ``snapshots_pYYYY_MM`` plus a DEFAULT partition that
+catches rows outside every defined range. These helpers compute partition names and bounds
+and run the create/detach/drop maintenance on an async connection.
+
+snapshot_urls has no foreign key to the partitioned table, so expiring a partition deletes its
+snapshots' URL links in the same transaction (copying them to ``<partition>_urls`` first when
+the partition is only detached, so the archive stays complete).
+"""
+
+import re
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+PARENT_TABLE = 'snapshots'
+DEFAULT_PARTITION = 'snapshots_default'
+_NAME_RE = re.compile(r'^snapshots_p(\d{4})_(\d{2})$')
+
+
+def month_start(day: date) -> date:
+    """Return the first day of the month containing day."""
+    return day.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """Shift a first-of-month date by a (possibly negative) number of months."""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """Name of the partition holding the given month."""
+    return f'{PARENT_TABLE}_p{month.year:04d}_{month.month:02d}'
+
+
+def parse_partition_name(name: str) -> Optional[date]:
+    """Return the month covered by a monthly partition name, or None for other tables."""
+    m = _NAME_RE.match(name)
+    return date(int(m.group(1)), int(m.group(2)), 1) if m else None
+
+
+def create_partition_sql(month: date) -> str:
+    """DDL creating the monthly partition for month if it does not exist yet."""
+    start, end = month_start(month), add_months(month_start(month), 1)
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(start)} PARTITION OF {PARENT_TABLE} '
+        f"FOR VALUES FROM ('{start.isoformat()} 00:00:00+00') TO ('{end.isoformat()} 00:00:00+00')"
+    )
+
+
+def _in_month_sql(month: date) -> str:
+    start, end = month_start(month), add_months(month_start(month), 1)
+    return (
+        f"captured_at >= '{start.isoformat()} 00:00:00+00' "
+        f"AND captured_at < '{end.isoformat()} 00:00:00+00'"
+    )
+
+
+def default_rows_exist_sql(month: date) -> str:
+    """Query whether the DEFAULT partition holds rows captured in month."""
+    return f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE {_in_month_sql(month)})'
+
+
+def adopt_default_rows_sql(month: date) -> List[str]:
+    """
+    Statements moving the DEFAULT partition's rows for month into that month's new partition.
+
+    Postgres refuses to create a partition whose range matches rows already in the DEFAULT
+    partition, so the rows are parked in a temporary table, the partition is created, and the
+    rows are re-inserted through the parent (keeping their ids).
+    """
+    staging = f'{partition_name(month)}_staging'
+    return [
+        f'CREATE TEMP TABLE {staging} (LIKE {PARENT_TABLE})',
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {_in_month_sql(month)} '
+        f'RETURNING *) INSERT INTO {staging} SELECT * FROM moved',
+        create_partition_sql(month),
+        f'INSERT INTO {PARENT_TABLE} SELECT * FROM {staging}',
+        f'DROP TABLE {staging}',
+    ]
+
+
+def expire_links_sql(name: str, archive: bool) -> List[str]:
+    """
+    Statements removing the URL links of partition name's snapshots before it is detached.
+
+    :param name: Partition being expired
+    :param archive: Copy the links to ``<name>_urls`` first (for a detached, kept partition)
+    """
+    statements = []
+    if archive:
+        statements.append(
+            f'CREATE TABLE IF NOT EXISTS {name}_urls AS SELECT su.* FROM snapshot_urls su '
+            f'JOIN {name} s ON s.id = su.snapshot_id'
+        )
+    statements.append(f'DELETE FROM snapshot_urls su USING {name} s WHERE s.id = su.snapshot_id')
+    return statements
+
+
+def months_between(first: date, last: date) -> List[date]:
+    """All first-of-month dates from first's month through last's month, inclusive."""
+    months, current = [], month_start(first)
+    while current <= month_start(last):
+        months.append(current)
+        current = add_months(current, 1)
+    return months
+
+
+async def list_partitions(conn: AsyncConnection) -> List[str]:
+    """Names of the partitions currently attached to the snapshots table."""
+    result = await conn.execute(
+        text(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = :parent ORDER BY c.relname'
+        ),
+        {'parent': PARENT_TABLE},
+    )
+    return list(result.scalars().all())
+
+
+async def ensure_partitions(conn: AsyncConnection, today: date, ahead: int) -> List[str]:
+    """
+    Create the partitions for the current month and the next ``ahead`` months.
+
+    :param conn: Async connection inside a transaction
+    :param today: Reference date (normally the current UTC date)
+    :param ahead: Number of future months to pre-create
+    :return: Names of the partitions that did not exist before
+    """
+    existing = set(await list_partitions(conn))
+    created = []
+    for month in months_between(today, add_months(month_start(today), ahead)):
+        if partition_name(month) in existing:
+            continue
+        strays = await conn.execute(text(default_rows_exist_sql(month)))
+        if strays.scalar():
+            # rows captured before the partition existed landed in DEFAULT; move them over
+            for statement in adopt_default_rows_sql(month):
+                await conn.execute(text(statement))
+        else:
+            await conn.execute(text(create_partition_sql(month)))
+        created.append(partition_name(month))
+    return created
+
+
+async def expire_partitions(
+    conn: AsyncConnection, today: date, retain_months: int, drop: bool = False
+) -> List[str]:
+    """
+    Detach (and optionally drop) monthly partitions older than the retention window.
+
+    A partition expires once its whole month lies before the first retained month, i.e.
+    ``retain_months`` months back from today's month. Its snapshots' URL links are deleted
+    either way (archived to ``<name>_urls`` when the table is kept); the caller must rebuild
+    product_price_stats afterwards, since its counts and min/max may cover removed rows.
+
+    :param conn: Async connection inside a transaction
+    :param today: Reference date (normally the current UTC date)
+    :param retain_months: Number of months of history to keep, including the current one
+    :param drop: Drop the detached tables instead of leaving them for archiving
+    :return: Names of the partitions that were detached
+    """
+    cutoff = add_months(month_start(today), -(retain_months - 1))
+    expired = []
+    for name in await list_partitions(conn):
+        month = parse_partition_name(name)
+        if month is not None and month < cutoff:
+            for statement in expire_links_sql(name, archive=not drop):
+                await conn.execute(text(statement))
+            await conn.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION {name}'))
+            if drop:
+                await conn.execute(text(f'DROP TABLE {name}'))
+            expired.append(name)
+    return expired
@@ -8,9 +8,12 @@ from __future__ import annotations
 
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
+from typing import List, Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, Field
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter
+
+# pydantic only accepts typing_extensions.TypedDict before Python 3.12
+from typing_extensions import TypedDict
 
 
 # ─── Snapshot Schemas ──────────────────────────────────────────────────────
@@ -33,10 +36,49 @@ class SnapshotRead(SnapshotBase):
 
     id: int
     captured_at: datetime
+    # Last time an identical capture was seen (None when it was only seen once)
+    last_seen_at: Optional[datetime] = None
+    # True on the extra history point at a run's last sighting, which repeats the run's id
+    repeat: bool = False
 
     model_config = ConfigDict(from_attributes=True)
 
 
+# ─── Scrape Run Schemas ────────────────────────────────────────────────────
+class ScrapeRunCreate(BaseModel):
+    """Metadata of one scrape of a product."""
+
+    product_id: int
+    started_at: datetime
+    # Wall-clock time of the model call in milliseconds
+    duration_ms: Optional[int] = None
+    model: Optional[str] = None
+
+
+class ScrapeRunRead(ScrapeRunCreate):
+    """Fields returned in API responses."""
+
+    id: int
+    item_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Bucket widths supported by the aggregated price history
+BucketSize = Literal['hour', 'day', 'week']
+
+
+class PriceBucket(BaseModel):
+    """Open/high/low/close price aggregate over one time bucket of snapshots."""
+
+    bucket_start: datetime
+    open: Optional[Decimal] = None
+    high: Optional[Decimal] = None
+    low: Optional[Decimal] = None
+    close: Optional[Decimal] = None
+    count: int
+
+
 # ─── Product Schemas ───────────────────────────────────────────────────────
 class ProductBase(BaseModel):
     name: str
@@ -57,3 +99,95 @@ class ProductRead(ProductBase):
     snapshots: List[SnapshotRead] = Field(default_factory=list)
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class ProductListItem(BaseModel):
+    """
+    Lightweight product row returned by the paginated listing.
+
+    Only ``id`` is always present; the remaining fields are populated according to the
+    caller's field selection and summary flag.
+    """
+
+    id: int
+    name: Optional[str] = None
+    prompt: Optional[str] = None
+    created_at: Optional[datetime] = None
+    latest_price: Optional[Decimal] = None
+    snapshot_count: Optional[int] = None
+
+
+class ProductPage(BaseModel):
+    """A page of products plus the keyset cursor for the next page (None on the last page)."""
+
+    items: List[ProductListItem] = Field(default_factory=list)
+    next_cursor: Optional[int] = None
+
+
+class DashboardItem(BaseModel):
+    """Latest snapshot and lowest-price snapshot (within the requested range) of one product."""
+
+    product_id: int
+    latest: Optional[SnapshotRead] = None
+    best: Optional[SnapshotRead] = None
+
+
+class RefreshInterval(BaseModel):
+    """A product's scheduler refresh interval; None uses the default and 0 disables refreshes."""
+
+    refresh_interval_minutes: Optional[int] = Field(default=None, ge=0)
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProductAccepted(ProductRead):
+    """Product created by POST /products; its initial scrape runs as background job job_id."""
+
+    job_id: str
+
+
+# ─── Job Schemas ───────────────────────────────────────────────────────────
+class JobRead(BaseModel):
+    """Status of a background job as reported by GET /jobs/{id}."""
+
+    id: str
+    kind: str
+    product_id: Optional[int] = None
+    status: Literal['queued', 'running', 'succeeded', 'failed']
+    stage: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    run_id: Optional[int] = None
+    item_count: Optional[int] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ─── Fast Serialization Rows ───────────────────────────────────────────────
+# Plain-dict twins of SnapshotRead/ProductRead (same fields, same order) for the opt-in fast
+# JSON path: crud builds them from column tuples and the adapters below encode them in
+# pydantic-core without constructing or validating a model per row.
+class SnapshotRow(TypedDict):
+    product_id: int
+    title: str
+    price: Optional[Decimal]
+    urls: List[str]
+    id: int
+    captured_at: datetime
+    last_seen_at: Optional[datetime]
+    repeat: bool
+
+
+class ProductRow(TypedDict):
+    name: str
+    prompt: Optional[str]
+    id: int
+    created_at: datetime
+    snapshots: List[SnapshotRow]
+
+
+snapshot_rows_adapter = TypeAdapter(List[SnapshotRow])
+product_row_adapter = TypeAdapter(ProductRow)
+product_rows_adapter = TypeAdapter(List[ProductRow])
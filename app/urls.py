@@ -0,0 +1,79 @@
+"""
+URL interning for snapshot ingest.
+
+Snapshots reference their URLs by id (see app.models.Url), so each distinct URL is stored
+once. UrlInternCache keeps a bounded in-process map of URL to id so that bulk ingest only
+queries the urls table for URLs this process has not seen before. Ids are added only after
+the transaction that wrote them commits, so a rollback never leaves a dangling id cached.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable, Mapping
+
+
+def url_hash(url: str) -> str:
+    """Return the SHA-256 hex digest used as the url's unique key."""
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class UrlInternCache:
+    """
+    Bounded LRU map of URL to urls.id.
+
+    :param max_entries: Maximum number of URLs remembered before LRU eviction
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._ids: OrderedDict[str, int] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> 'UrlInternCache':
+        """Build a cache sized by URL_INTERN_CACHE_SIZE."""
+        return cls(max_entries=int(os.getenv('URL_INTERN_CACHE_SIZE', '10000')))
+
+    def lookup(self, urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Return the cached ids for whichever of urls are known.
+
+        :param urls: URLs to resolve
+        :return: Mapping of known URL to id (unknown URLs are omitted)
+        """
+        found = {}
+        for url in urls:
+            url_id = self._ids.get(url)
+            if url_id is None:
+                self.misses += 1
+                continue
+            self._ids.move_to_end(url)
+            found[url] = url_id
+            self.hits += 1
+        return found
+
+    def add(self, ids: Mapping[str, int]) -> None:
+        """Remember committed URL ids, evicting the least recently used beyond max_entries."""
+        for url, url_id in ids.items():
+            self._ids[url] = url_id
+            self._ids.move_to_end(url)
+        while len(self._ids) > self.max_entries:
+            self._ids.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every cached id (e.g. after the urls table was rewritten)."""
+        self._ids.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Return counters for monitoring the hit rate."""
+        return {
+            'size': len(self._ids),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+url_cache = UrlInternCache.from_env()
@@ -2,7 +2,8 @@
 /**
  * Form component to create a new product with an optional custom prompt.
  *
- * On submit, calls the createProduct hook and navigates to the product page.
+ * On submit, calls the createProduct hook and navigates to the product page, passing the
+ * initial scrape's job id so the page can show its progress.
  */
 import React, { useState } from 'react'
 import { useRouter } from 'next/router'
@@ -20,7 +21,7 @@ export default function NewProductForm() {
     setSubmitError(null)
     try {
       const result = await createProduct({ name: nameText, prompt: promptText })
-      router.push(`/products/${result.id}`)
+      router.push(`/products/${result.id}?job=${result.job_id}`)
     } catch (error: any) {
       setSubmitError(error.message || 'An error occurred')
     }
@@ -1,11 +1,13 @@
 
 /**
- * Displays a product card with name and creation date, linking to its detail page.
+ * Displays a product card with name, creation date and prices, linking to its detail page.
  *
  * @param product Object containing id, name, and created_at timestamp.
+ * @param summary Optional dashboard entry with the latest and lowest-price snapshots.
  */
 import Link from 'next/link'
 import React from 'react'
+import { DashboardItem } from '@/utils/api'
 
 interface Product {
   id: number
@@ -13,13 +15,27 @@ interface Product {
   created_at: string
 }
 
-export default function ProductCard({ product }: { product: Product }) {
+const formatPrice = (price?: number | null) =>
+  price === null || price === undefined ? '—' : `$${Number(price).toFixed(2)}`
+
+export default function ProductCard({
+  product,
+  summary,
+}: {
+  product: Product
+  summary?: DashboardItem
+}) {
   return (
     <div className="bg-gray-800 p-4 rounded-lg shadow hover:bg-gray-700 transition">
       <h3 className="text-lg font-semibold">{product.name}</h3>
       <p className="text-sm text-gray-400 mb-2">
         Created at: {new Date(product.created_at).toLocaleString()}
       </p>
+      {summary && (
+        <p className="text-sm text-gray-300 mb-2">
+          Latest: {formatPrice(summary.latest?.price)} · Best: {formatPrice(summary.best?.price)}
+        </p>
+      )}
       <Link href={`/products/${product.id}`} className="text-blue-400 hover:underline">
         View
       </Link>
@@ -1,10 +1,10 @@
 /**
- * Line chart visualizing price history for snapshots over time.
+ * Line chart visualizing price history over time.
  *
- * @param data Array of SnapshotRead objects to chart.
+ * @param data Array of server-aggregated PriceBucket objects to chart (close price per bucket).
  */
 import React from 'react'
-import { SnapshotRead } from '@/utils/api'
+import { PriceBucket } from '@/utils/api'
 import {
   LineChart,
   Line,
@@ -14,14 +14,12 @@ import {
   ResponsiveContainer,
 } from 'recharts'
 
-export default function SnapshotChart({ data }: { data: SnapshotRead[] }) {
-  // Prepare chart data in chronological order (oldest → newest)
-  const chartData = data
-    .slice()
-    .map((s) => ({
-      date: new Date(s.captured_at).toISOString().slice(0, 10),
-      price: s.price ?? 0,
-    }))
+export default function SnapshotChart({ data }: { data: PriceBucket[] }) {
+  // Buckets arrive in chronological order (oldest → newest), already capped in size
+  const chartData = data.map((b) => ({
+    date: new Date(b.bucket_start).toISOString().slice(0, 10),
+    price: Number(b.close ?? 0),
+  }))
 
   const prices = chartData.map((d) => d.price)
   const dataMin = prices.length > 0 ? Math.min(...prices) : 0
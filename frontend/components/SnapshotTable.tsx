@@ -12,7 +12,7 @@ export default function SnapshotTable({ data }: { data: SnapshotRead[] }) {
   return (
     <div className="grid grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 gap-4">
       {data.map((s) => (
-        <SnapshotCard key={s.id} snapshot={s} />
+        <SnapshotCard key={s.repeat ? `${s.id}-last` : s.id} snapshot={s} />
       ))}
     </div>
   )
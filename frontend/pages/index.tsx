@@ -2,9 +2,9 @@
  * Home page showing list of products and a form to add new products.
  */
 import Head from 'next/head'
-import useSWR from 'swr'
 import ProductCard from '@/components/ProductCard'
 import NewProductForm from '@/components/NewProductForm'
+import { DashboardItem, useDashboard, useProductPages } from '@/utils/api'
 
 interface Product {
   id: number
@@ -12,16 +12,33 @@ interface Product {
   created_at: string
 }
 
-const fetcher = (url: string) => fetch(url).then((res) => res.json())
+/**
+ * Cards of one listing page, priced with one dashboard request for that page's products.
+ *
+ * Fetching per page keeps each request well under the server's id limit, and loading another
+ * page never refetches the prices of the pages already shown.
+ */
+function PageCards({ products }: { products: Product[] }) {
+  const { data: dashboard } = useDashboard(products.map((product) => product.id))
+  const summaries = new Map<number, DashboardItem>(
+    (dashboard ?? []).map((item) => [item.product_id, item])
+  )
+  return (
+    <>
+      {products.map((product) => (
+        <ProductCard key={product.id} product={product} summary={summaries.get(product.id)} />
+      ))}
+    </>
+  )
+}
 
 export default function Home() {
-  const { data, error } = useSWR<Product[]>(
-    `${process.env.NEXT_PUBLIC_API_URL}/products`,
-    fetcher
-  )
+  const { data: pages, error, size, setSize, isValidating } = useProductPages()
 
   if (error) return <div className="p-6">Error loading products.</div>
-  if (!data) return <div className="p-6">Loading...</div>
+  if (!pages) return <div className="p-6">Loading...</div>
+
+  const hasMore = pages[pages.length - 1]?.next_cursor !== null
 
   return (
     <>
@@ -33,10 +50,19 @@ export default function Home() {
           <NewProductForm />
         </div>
         <div className="grid gap-4 grid-cols-1 sm:grid-cols-2 lg:grid-cols-3 mt-6">
-          {data.map((product) => (
-            <ProductCard key={product.id} product={product} />
+          {pages.map((page, index) => (
+            <PageCards key={index} products={page.items as Product[]} />
           ))}
         </div>
+        {hasMore && (
+          <button
+            onClick={() => setSize(size + 1)}
+            disabled={isValidating}
+            className="mt-6 px-4 py-2 rounded bg-gray-700 text-gray-200 hover:bg-gray-600"
+          >
+            {isValidating ? 'Loading…' : 'Load more'}
+          </button>
+        )}
       </main>
     </>
   )
@@ -10,7 +10,14 @@ import useSWR from 'swr'
 import SnapshotChart from '@/components/SnapshotChart'
 import SnapshotTable from '@/components/SnapshotTable'
 import BestPriceForm from '@/components/BestPriceForm'
-import { getBestPrice, SnapshotRead, UrlPrice } from '@/utils/api'
+import {
+  getBestPrice,
+  SnapshotRead,
+  streamHistory,
+  UrlPrice,
+  useJob,
+  usePriceBuckets,
+} from '@/utils/api'
 
 interface ProductDetail {
   id: number
@@ -23,7 +30,12 @@ const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
 
 export default function ProductPage() {
   const router = useRouter()
-  const { id } = router.query
+  const { id, job: jobId } = router.query
+  // Set when arriving from product creation: the initial scrape may still be running
+  const { data: job } = useJob(typeof jobId === 'string' ? jobId : undefined)
+  const jobStatus = job?.status
+  // Streamed scrapes store items as they arrive; refetch the latest view as the count grows
+  const jobItems = job?.item_count
 
   // Snapshot view mode: 'realtime' shows latest only; 'history' shows full history
   const [viewMode, setViewMode] = useState<'realtime' | 'history'>('realtime')
@@ -40,26 +52,45 @@ export default function ProductPage() {
   useEffect(() => {
     if (!id) return
     setSnapshotError(null)
-    setLoadingSnapshots(true)
-    const url =
-      viewMode === 'realtime'
-        ? `${API_BASE}/products/${id}/latest`
-        : `${API_BASE}/products/${id}/history?days=30`
-    fetch(url)
+    // Keep showing the items already streamed in while the next batch loads
+    if (viewMode === 'history' || !jobItems) setLoadingSnapshots(true)
+    const controller = new AbortController()
+    if (viewMode === 'history') {
+      // Stream history so the chart can render before the whole range has arrived
+      setHistorySnapshots([])
+      streamHistory(
+        String(id),
+        30,
+        (rows) => {
+          setHistorySnapshots((prev) => prev.concat(rows))
+          setLoadingSnapshots(false)
+        },
+        controller.signal
+      )
+        .catch((err: any) => {
+          if (err.name !== 'AbortError') setSnapshotError(err.message || 'Error loading snapshots')
+        })
+        .finally(() => setLoadingSnapshots(false))
+      return () => controller.abort()
+    }
+    fetch(`${API_BASE}/products/${id}/latest`, { signal: controller.signal })
       .then((res) => {
         if (!res.ok) throw new Error(`Error ${res.status}: ${res.statusText}`)
         return res.json()
       })
-      .then((data) => {
-        if (viewMode === 'realtime') {
-          setLatestSnapshots(data)
-        } else {
-          setHistorySnapshots(data)
-        }
+      .then((data) => setLatestSnapshots(data))
+      .catch((err: any) => {
+        if (err.name !== 'AbortError') setSnapshotError(err.message || 'Error loading snapshots')
       })
-      .catch((err: any) => setSnapshotError(err.message || 'Error loading snapshots'))
       .finally(() => setLoadingSnapshots(false))
-  }, [id, viewMode]);
+    return () => controller.abort()
+  }, [id, viewMode, jobStatus, jobItems]);
+
+  const { data: priceBuckets } = usePriceBuckets(
+    viewMode === 'history' ? (id as string | undefined) : undefined,
+    30,
+    'day'
+  )
 
   const { data, error } = useSWR<ProductDetail>(
     id ? `${API_BASE}/products/${id}` : null,
@@ -100,6 +131,16 @@ export default function ProductPage() {
           </button>
         </div>
 
+        {job && (job.status === 'queued' || job.status === 'running') && (
+          <div className="mb-4 text-gray-400">
+            Scraping prices ({job.stage ?? job.status}
+            {job.item_count ? `, ${job.item_count} items so far` : ''})…
+          </div>
+        )}
+        {job?.status === 'failed' && (
+          <div className="mb-4 text-red-400">Initial scrape failed: {job.error}</div>
+        )}
+
         {/* Loading & error states */}
         {loadingSnapshots && <div>Loading {viewMode}...</div>}
         {snapshotError && <div className="text-red-400">{snapshotError}</div>}
@@ -189,7 +230,7 @@ export default function ProductPage() {
           <>
             <div className="mb-6">
               <h2 className="text-xl mb-2">Price History (last 30 days)</h2>
-              <SnapshotChart data={historySnapshots} />
+              <SnapshotChart data={priceBuckets ?? []} />
             </div>
 
             <div>
@@ -6,6 +6,7 @@
  * and fetching best price snapshots.
  */
 import useSWR from 'swr'
+import useSWRInfinite from 'swr/infinite'
 import { useState } from 'react'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'
@@ -31,6 +32,8 @@ export interface SnapshotRead {
    */
   urls: Array<string | UrlPrice>
   captured_at: string
+  /** Set on the history point at a deduplicated run's last sighting (same id as its first). */
+  repeat?: boolean
 }
 
 export interface ProductRead {
@@ -41,6 +44,53 @@ export interface ProductRead {
   snapshots: SnapshotRead[]
 }
 
+export interface ProductAccepted extends ProductRead {
+  job_id: string
+}
+
+export interface JobRead {
+  id: string
+  kind: string
+  product_id: number | null
+  status: 'queued' | 'running' | 'succeeded' | 'failed'
+  stage: string | null
+  created_at: string
+  started_at: string | null
+  finished_at: string | null
+  run_id: number | null
+  item_count: number | null
+  error: string | null
+}
+
+export interface PriceBucket {
+  bucket_start: string
+  open: number | null
+  high: number | null
+  low: number | null
+  close: number | null
+  count: number
+}
+
+export interface ProductListItem {
+  id: number
+  name?: string
+  prompt?: string | null
+  created_at?: string
+  latest_price?: number | null
+  snapshot_count?: number
+}
+
+export interface ProductPage {
+  items: ProductListItem[]
+  next_cursor: number | null
+}
+
+export interface DashboardItem {
+  product_id: number
+  latest: SnapshotRead | null
+  best: SnapshotRead | null
+}
+
 /**
  * Generic fetcher function for SWR that throws on HTTP errors.
  *
@@ -63,6 +113,60 @@ export function useProducts() {
   return useSWR<ProductRead[]>(`${API_BASE}/products`, fetcher)
 }
 
+/**
+ * SWR infinite hook over the keyset-paginated product listing.
+ *
+ * Each page is fetched without snapshots; call `setSize(size + 1)` to load the next page
+ * until the last page reports `next_cursor === null`.
+ *
+ * @param pageSize Number of products per page.
+ * @param fields Product fields to request (id is always returned).
+ * @returns SWR infinite response containing ProductPage[].
+ */
+export function useProductPages(pageSize = 50, fields = ['name', 'created_at']) {
+  return useSWRInfinite<ProductPage>((index, previous: ProductPage | null) => {
+    if (previous && previous.next_cursor === null) return null
+    const params = new URLSearchParams({ limit: String(pageSize), fields: fields.join(',') })
+    if (previous) params.append('after', String(previous.next_cursor))
+    return `${API_BASE}/products/page?${params.toString()}`
+  }, fetcher)
+}
+
+/**
+ * SWR hook to fetch the latest and lowest-price snapshot of many products in one request.
+ *
+ * Replaces per-card `/latest` and `/best_price` calls on listing pages. The server accepts at
+ * most 500 ids per request, so paginated lists should call this once per page.
+ *
+ * @param ids Product IDs to summarize. Hook is disabled while the list is empty.
+ * @param start_date Optional ISO date (YYYY-MM-DD) bounding the lowest-price search.
+ * @param end_date Optional ISO date (YYYY-MM-DD) bounding the lowest-price search.
+ * @returns SWR response containing DashboardItem[] in the order of `ids`.
+ */
+export function useDashboard(ids: number[], start_date?: string, end_date?: string) {
+  const params = new URLSearchParams({ ids: ids.join(',') })
+  if (start_date) params.append('start_date', start_date)
+  if (end_date) params.append('end_date', end_date)
+  return useSWR<DashboardItem[]>(
+    ids.length ? `${API_BASE}/products/dashboard?${params.toString()}` : null,
+    fetcher
+  )
+}
+
+/**
+ * SWR hook polling a background job (e.g. a new product's initial scrape) until it finishes.
+ *
+ * @param id Job ID or undefined. Hook is disabled if id is not set.
+ * @param intervalMs Poll interval while the job is queued or running.
+ * @returns SWR response containing JobRead or error/loading state.
+ */
+export function useJob(id?: string, intervalMs = 1000) {
+  return useSWR<JobRead>(id ? `${API_BASE}/jobs/${id}` : null, fetcher, {
+    refreshInterval: (job) =>
+      job && (job.status === 'succeeded' || job.status === 'failed') ? 0 : intervalMs,
+  })
+}
+
 /**
  * SWR hook to fetch a single product by its ID.
  *
@@ -76,6 +180,69 @@ export function useProduct(id?: number | string) {
   )
 }
 
+/**
+ * SWR hook to fetch server-side OHLC price buckets for charting.
+ *
+ * @param id Product ID or undefined. Hook is disabled if id is not set.
+ * @param days Number of days to look back.
+ * @param bucket Bucket width: 'hour', 'day' or 'week'.
+ * @param maxPoints Maximum number of buckets returned (server downsamples with LTTB).
+ * @returns SWR response containing PriceBucket[] or error/loading state.
+ */
+export function usePriceBuckets(
+  id?: number | string,
+  days = 30,
+  bucket: 'hour' | 'day' | 'week' = 'day',
+  maxPoints = 120
+) {
+  const params = new URLSearchParams({
+    days: String(days),
+    bucket,
+    max_points: String(maxPoints),
+  })
+  return useSWR<PriceBucket[]>(
+    id ? `${API_BASE}/products/${id}/history/ohlc?${params.toString()}` : null,
+    fetcher
+  )
+}
+
+/**
+ * Stream a product's snapshot history from the NDJSON endpoint.
+ *
+ * Rows are handed to `onRows` chunk by chunk as they arrive, so callers can render
+ * long ranges progressively instead of waiting for the whole payload.
+ *
+ * @param productId Product ID to fetch history for.
+ * @param days Number of days to look back.
+ * @param onRows Callback receiving each batch of parsed snapshots.
+ * @param signal Optional AbortSignal to cancel the stream.
+ */
+export async function streamHistory(
+  productId: number | string,
+  days: number,
+  onRows: (rows: SnapshotRead[]) => void,
+  signal?: AbortSignal
+): Promise<void> {
+  const res = await fetch(`${API_BASE}/products/${productId}/history/stream?days=${days}`, {
+    signal,
+  })
+  if (!res.ok || !res.body) throw new Error(`Error ${res.status}: ${res.statusText}`)
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffered = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffered += decoder.decode(value, { stream: true })
+    const lines = buffered.split('\n')
+    buffered = lines.pop() ?? ''
+    const rows = lines.filter((line) => line.trim()).map((line) => JSON.parse(line))
+    if (rows.length) onRows(rows)
+  }
+  if (buffered.trim()) onRows([JSON.parse(buffered)])
+}
+
 /**
  * Hook to create a new product via the API.
  *
@@ -85,12 +252,13 @@ export function useCreateProduct() {
   const [isLoading, setIsLoading] = useState(false)
 
   /**
-   * Sends a POST request to create a product and returns the created ProductRead.
+   * Sends a POST request to create a product. The API answers 202 as soon as the product row
+   * exists; its initial scrape runs as the background job `job_id` (see useJob).
    *
    * @param data ProductCreate payload containing name and prompt.
-   * @returns The created ProductRead object.
+   * @returns The created product plus the id of its scrape job.
    */
-  async function mutateAsync(data: ProductCreate): Promise<ProductRead> {
+  async function mutateAsync(data: ProductCreate): Promise<ProductAccepted> {
     setIsLoading(true)
     const res = await fetch(`${API_BASE}/products`, {
       method: 'POST',
@@ -102,7 +270,7 @@ export function useCreateProduct() {
       setIsLoading(false)
       throw new Error(message || `Error creating product (${res.status})`)
     }
-    const json = (await res.json()) as ProductRead
+    const json = (await res.json()) as ProductAccepted
     setIsLoading(false)
     return json
   }
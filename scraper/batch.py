@@ -0,0 +1,375 @@
+"""
+Offline bulk re-scrape through the OpenAI Batch API.
+
+A nightly full refresh does not need answers within seconds. So instead of one synchronous call
+per product, this module:
+
+1. builds a JSONL file with one Responses request per product
+2. uploads it and submits a batch (24h completion window, billed at the batch discount and
+   outside the synchronous rate limits)
+3. polls until the batch finishes
+4. streams the output file back line by line through the same JSON parsing as
+   fetch_shopping_items
+5. stores the results as scrape runs, many products per transaction
+
+Progress is kept in a JSON state file, written atomically after every step. It records the
+uploaded file, the submitted batch, and the products already stored. Running again after a
+crash resumes where it stopped instead of submitting (and paying for) a second batch. The state
+file is removed once the output has been ingested. If the process dies between committing a
+chunk and saving the state, that chunk is stored again on resume. Dedupe folds its snapshots
+into the rows just written, so only an extra scrape run row remains.
+
+    python -m scraper.batch            # submit a batch for every product, wait, ingest
+    python -m scraper.batch --no-wait  # submit or check the batch, ingest only if it is done
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Sequence, Tuple
+
+from openai import AsyncOpenAI
+from openai.types import Batch
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, schemas
+from scraper.openai_client import MODEL, backend, parse_items, request_body
+from scraper.pipeline import items_to_snapshots
+from scraper.resilience import is_retryable
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT: Literal['/v1/responses'] = '/v1/responses'
+# Batch API limit on requests per input file
+MAX_BATCH_REQUESTS = 50000
+TERMINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+def custom_id(product_id: int) -> str:
+    """Return the request id that ties a batch line to its product."""
+    return f'product-{product_id}'
+
+
+def product_id_of(request_id: str) -> int:
+    """Inverse of custom_id."""
+    return int(request_id.removeprefix('product-'))
+
+
+def build_requests(targets: Sequence[Tuple[int, str]]) -> bytes:
+    """
+    Build the batch input file: one Responses API request per product, as JSONL.
+
+    :param targets: (product_id, prompt) pairs
+    :return: UTF-8 encoded JSONL
+    """
+    lines = [
+        json.dumps(
+            {
+                'custom_id': custom_id(product_id),
+                'method': 'POST',
+                'url': BATCH_ENDPOINT,
+                'body': request_body(prompt),
+            }
+        )
+        for product_id, prompt in targets
+    ]
+    return ''.join(line + '\n' for line in lines).encode()
+
+
+def output_text(body: Dict[str, Any]) -> str:
+    """Concatenate the output_text parts of a Responses API response body."""
+    return ''.join(
+        part.get('text', '')
+        for item in body.get('output') or []
+        if item.get('type') == 'message'
+        for part in item.get('content') or []
+        if part.get('type') == 'output_text'
+    )
+
+
+def parse_result_line(line: str) -> Tuple[int, List[Dict[str, Any]], Optional[str]]:
+    """
+    Parse one line of a batch output or error file.
+
+    :param line: JSONL line
+    :return: (product_id, items, error); items is empty when error is set
+    """
+    record = json.loads(line)
+    product_id = product_id_of(record['custom_id'])
+    if record.get('error'):
+        error = record['error']
+        return product_id, [], f'{error.get("code")}: {error.get("message")}'
+    response = record.get('response') or {}
+    body = response.get('body') or {}
+    if response.get('status_code') != 200:
+        message = (body.get('error') or {}).get('message')
+        return product_id, [], f'HTTP {response.get("status_code")}: {message}'
+    try:
+        return product_id, parse_items(output_text(body)), None
+    except RuntimeError as e:
+        return product_id, [], str(e)
+
+
+class BatchState:
+    """Resumable progress of one batch refresh, persisted as JSON."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.input_file_id: Optional[str] = None
+        self.batch_id: Optional[str] = None
+        self.status: Optional[str] = None
+        self.created_at: Optional[int] = None
+        self.request_count = 0
+        self.ingested: List[int] = []
+        self.failed: Dict[int, str] = {}
+
+    @classmethod
+    def load(cls, path: str) -> 'BatchState':
+        """Read the state at path, or return a fresh state if there is none."""
+        state = cls(path)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            state.input_file_id = data.get('input_file_id')
+            state.batch_id = data.get('batch_id')
+            state.status = data.get('status')
+            state.created_at = data.get('created_at')
+            state.request_count = data.get('request_count', 0)
+            state.ingested = data.get('ingested', [])
+            state.failed = {int(k): v for k, v in data.get('failed', {}).items()}
+        return state
+
+    def save(self) -> None:
+        """Write the state atomically, so a crash never leaves a truncated file."""
+        data = {
+            'input_file_id': self.input_file_id,
+            'batch_id': self.batch_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'request_count': self.request_count,
+            'ingested': self.ingested,
+            'failed': self.failed,
+        }
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        """Remove the state file once the batch has been fully ingested."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BatchRefresh:
+    """
+    Submit, poll and ingest a batch re-scrape of every product.
+
+    :param client: OpenAI client used for the files and batches endpoints
+    :param session_maker: Session factory for reading products and storing runs
+    :param state_path: JSON file holding progress between invocations
+    :param poll_seconds: Wait between batch status checks
+    :param chunk_size: Products stored per transaction while ingesting
+    :param sleep: Coroutine used to wait between polls
+    """
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        session_maker: async_sessionmaker[AsyncSession],
+        state_path: str,
+        poll_seconds: float = 60.0,
+        chunk_size: int = 200,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.client = client
+        self.session_maker = session_maker
+        self.state = BatchState.load(state_path)
+        self.poll_seconds = poll_seconds
+        self.chunk_size = chunk_size
+        self.sleep = sleep
+        self.skipped = 0
+
+    async def submit(self) -> None:
+        """Upload the request file and create the batch, unless a previous run already did."""
+        state = self.state
+        if state.batch_id is not None:
+            logger.info('Resuming batch %s (%s)', state.batch_id, state.status)
+            return
+        if state.input_file_id is None:
+            async with self.session_maker() as db:
+                targets = await crud.get_product_prompts(db)
+            if len(targets) > MAX_BATCH_REQUESTS:
+                raise RuntimeError(
+                    f'{len(targets)} products exceed the {MAX_BATCH_REQUESTS} requests per batch'
+                )
+            uploaded = await self.client.files.create(
+                file=('batch_requests.jsonl', build_requests(targets)), purpose='batch'
+            )
+            state.input_file_id, state.request_count = uploaded.id, len(targets)
+            state.save()
+            logger.info('Uploaded %d requests as %s', len(targets), uploaded.id)
+        batch = await self.client.batches.create(
+            input_file_id=state.input_file_id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window='24h',
+            metadata={'job': 'gpt-shop-viz refresh'},
+        )
+        state.batch_id, state.status, state.created_at = batch.id, batch.status, batch.created_at
+        state.save()
+        logger.info('Submitted batch %s', batch.id)
+
+    async def poll(self, wait: bool = True) -> Batch:
+        """
+        Refresh the batch status, waiting for it to finish when wait is set.
+
+        Transient errors while polling are logged and retried on the next poll.
+        """
+        batch_id = self.state.batch_id
+        if batch_id is None:
+            raise RuntimeError('No batch has been submitted')
+        while True:
+            try:
+                batch = await self.client.batches.retrieve(batch_id)
+            except Exception as e:
+                if not (wait and is_retryable(e)):
+                    raise
+                logger.warning('Polling batch %s failed: %s', batch_id, e)
+            else:
+                if batch.status != self.state.status:
+                    self.state.status = batch.status
+                    self.state.save()
+                    logger.info('Batch %s is %s', batch.id, batch.status)
+                if batch.status in TERMINAL_STATUSES or not wait:
+                    return batch
+            await self.sleep(self.poll_seconds)
+
+    async def ingest(self, file_id: str) -> None:
+        """Stream a result file and store its products' items, skipping those already stored."""
+        done = set(self.state.ingested)
+        pending: List[Tuple[int, List[Dict[str, Any]]]] = []
+        async with self.client.files.with_streaming_response.content(file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                product_id, items, error = parse_result_line(line)
+                if product_id in done or product_id in self.state.failed:
+                    continue
+                if error is not None:
+                    self.state.failed[product_id] = error
+                    continue
+                pending.append((product_id, items))
+                if len(pending) >= self.chunk_size:
+                    await self._store(pending)
+                    pending = []
+        if pending:
+            await self._store(pending)
+        self.state.save()
+
+    async def _store(self, results: List[Tuple[int, List[Dict[str, Any]]]]) -> None:
+        started_at = datetime.fromtimestamp(self.state.created_at or 0, timezone.utc)
+        runs = []
+        async with self.session_maker() as db:
+            # Products deleted since the batch was submitted are dropped
+            existing = await crud.get_existing_product_ids(db, [pid for pid, _ in results])
+            for product_id, items in results:
+                if product_id not in existing:
+                    self.skipped += 1
+                    continue
+                try:
+                    snapshots = items_to_snapshots(product_id, items)
+                except Exception as e:
+                    self.state.failed[product_id] = f'{type(e).__name__}: {e}'
+                    continue
+                run_in = schemas.ScrapeRunCreate(
+                    product_id=product_id, started_at=started_at, model=MODEL
+                )
+                runs.append((run_in, snapshots))
+            await crud.record_scrape_runs(db, runs)
+        self.state.ingested.extend(pid for pid, _ in results if pid not in self.state.failed)
+        self.state.save()
+
+    async def run(self, wait: bool = True) -> Optional[Batch]:
+        """
+        Submit (or resume) the batch, wait for it and ingest its output.
+
+        :param wait: Poll until the batch finishes; otherwise return after one status check
+        :return: The final batch, or None if it is still running (state is kept for next time)
+        :raises RuntimeError: If the batch failed validation
+        """
+        await self.submit()
+        batch = await self.poll(wait=wait)
+        if batch.status not in TERMINAL_STATUSES:
+            return None
+        if batch.status == 'failed':
+            errors = [e.message for e in (batch.errors.data or [])] if batch.errors else []
+            self.state.clear()
+            raise RuntimeError(f'Batch {batch.id} failed: {"; ".join(map(str, errors))}')
+        # expired and cancelled batches still return the requests that finished
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                await self.ingest(file_id)
+        self.state.clear()
+        return batch
+
+
+async def main(state_path: str, wait: bool, poll_seconds: float) -> int:
+    """Run a batch refresh of every product; return the number of failed products."""
+    from app.db import AsyncSessionLocal, init_models
+
+    if backend.name == 'fake':
+        raise SystemExit('The fake LLM backend does not implement the Batch API')
+    await init_models()
+    refresh = BatchRefresh(
+        backend.client,
+        AsyncSessionLocal,
+        state_path,
+        poll_seconds=poll_seconds,
+    )
+    batch = await refresh.run(wait=wait)
+    state = refresh.state
+    if batch is None:
+        print(f'Batch {state.batch_id} is {state.status}; run again to ingest it when done')
+        return 0
+    print(
+        f'Batch {batch.id} {batch.status}: stored {len(state.ingested)} of '
+        f'{state.request_count} products, {len(state.failed)} failed, {refresh.skipped} deleted'
+    )
+    for product_id, error in sorted(state.failed.items()):
+        print(f'  failed: product {product_id}: {error}')
+    return len(state.failed)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the batch refresh."""
+    parser = argparse.ArgumentParser(description='Re-scrape every product via the Batch API')
+    parser.add_argument(
+        '--state',
+        default=os.getenv('BATCH_STATE_FILE', 'batch_state.json'),
+        help='Progress file used to resume after a crash (default BATCH_STATE_FILE)',
+    )
+    parser.add_argument(
+        '--poll-seconds',
+        type=float,
+        default=float(os.getenv('BATCH_POLL_SECONDS', '60')),
+        help='Seconds between batch status checks',
+    )
+    parser.add_argument(
+        '--no-wait',
+        action='store_true',
+        help='Submit or check the batch and exit instead of waiting for it to finish',
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    failures = asyncio.run(main(args.state, not args.no_wait, args.poll_seconds))
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,129 @@
+"""
+Incremental parser for the model's JSON array of products.
+
+The model streams its answer a few characters at a time. JsonArrayParser is fed those deltas
+and returns each top-level object of the array as soon as its closing brace arrives, so callers
+can store or show the first product long before the last one is generated. Text before the
+opening bracket (such as a ```json fence) and after the closing bracket is ignored.
+"""
+
+import json
+import re
+from typing import Any, AsyncIterable, AsyncIterator, Dict, List
+
+# Characters that change nesting or string state inside an object
+_STRUCTURAL = re.compile(r'["{}\[\]]')
+# Characters that end a string or escape the next character
+_STRING_SPECIAL = re.compile(r'["\\]')
+
+
+class JsonArrayParser:
+    """Push parser yielding the objects of a streamed top-level JSON array."""
+
+    def __init__(self) -> None:
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._buf: List[str] = []
+        self.count = 0
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Consume the next chunk of model output.
+
+        :param text: Output text delta
+        :return: Objects completed by this chunk, in order
+        :raises RuntimeError: If the array holds something other than objects
+        """
+        items: List[Dict[str, Any]] = []
+        i, n = 0, len(text)
+        while i < n and not self._finished:
+            if not self._started:
+                i = text.find('[', i)
+                if i < 0:
+                    break
+                self._started = True
+                i += 1
+            elif self._depth == 0:
+                # between elements: skip separators until the next object or the closing bracket
+                c = text[i]
+                if c == '{':
+                    self._depth = 1
+                    self._buf.append(c)
+                elif c == ']':
+                    self._finished = True
+                elif not (c == ',' or c.isspace()):
+                    raise RuntimeError(f'Expected a JSON object in the model output, got {c!r}')
+                i += 1
+            elif self._in_string:
+                if self._escape:
+                    self._buf.append(text[i])
+                    self._escape = False
+                    i += 1
+                    continue
+                m = _STRING_SPECIAL.search(text, i)
+                end = m.start() if m else n
+                self._buf.append(text[i:end])
+                if m is None:
+                    break
+                self._buf.append(m.group())
+                if m.group() == '\\':
+                    self._escape = True
+                else:
+                    self._in_string = False
+                i = end + 1
+            else:
+                m = _STRUCTURAL.search(text, i)
+                end = m.start() if m else n
+                self._buf.append(text[i:end])
+                if m is None:
+                    break
+                c = m.group()
+                self._buf.append(c)
+                i = end + 1
+                if c == '"':
+                    self._in_string = True
+                elif c in '{[':
+                    self._depth += 1
+                else:
+                    self._depth -= 1
+                    if self._depth == 0:
+                        items.append(self._emit())
+        return items
+
+    def _emit(self) -> Dict[str, Any]:
+        raw = ''.join(self._buf)
+        self._buf = []
+        try:
+            item: Dict[str, Any] = json.loads(raw)
+        except json.JSONDecodeError as e:
+            raise RuntimeError(f'Failed to parse JSON object from model output:\n{raw}') from e
+        self.count += 1
+        return item
+
+    def close(self) -> None:
+        """
+        Check that the whole array was received.
+
+        :raises RuntimeError: If no array started, or the output stopped inside it
+        """
+        if not self._started:
+            raise RuntimeError('Expected a JSON list in the model output but none was found')
+        if not self._finished:
+            raise RuntimeError(f'Model output ended inside the JSON list after {self.count} items')
+
+
+async def parse_json_array(chunks: AsyncIterable[str]) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield each object of the JSON array spread over chunks as soon as it is complete.
+
+    :param chunks: Output text deltas, in order
+    :raises RuntimeError: If the output is not a complete JSON array of objects
+    """
+    parser = JsonArrayParser()
+    async for chunk in chunks:
+        for item in parser.feed(chunk):
+            yield item
+    parser.close()
@@ -0,0 +1,270 @@
+"""
+LLM backends for the shopping client, resolved from configuration.
+
+Every backend is reached through the OpenAI SDK and the Responses API. So retries, the circuit
+breaker, streaming and request coalescing in scraper.openai_client behave the same for each:
+
+- openai (default): api.openai.com with OPENAI_API_KEY
+- compatible: any server that implements the Responses API at LLM_BASE_URL (a proxy, vLLM,
+  a gateway), authenticated with LLM_API_KEY or OPENAI_API_KEY
+- fake: FakeLLMTransport, an in-process stand-in for the API that answers with synthetic
+  product lists. Nothing leaves the process, so load tests and throughput benchmarks run
+  offline and give repeatable numbers.
+
+LLM_MODEL overrides the model name (default gpt-4.1-nano, or fake-shopping for the fake, so
+its answers never share response-cache entries with a real model's).
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+BACKENDS = ('openai', 'compatible', 'fake')
+
+DEFAULT_MODEL = 'gpt-4.1-nano'
+FAKE_MODEL = 'fake-shopping'
+FAKE_BASE_URL = 'http://fake-llm/v1'
+
+
+class FakeLLMTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport answering POST /responses like the OpenAI API, with synthetic products.
+
+    Answers are derived from the seed and the user prompt, and whether an attempt fails from the
+    seed, the prompt and the attempt number. A run therefore sees the same items, the same
+    errors and the same retries regardless of how concurrent requests interleave.
+
+    :param latency_ms: Time before the first byte of every answer
+    :param item_ms: Additional time to generate each item (streamed answers send items as
+        they are generated, so this is what streaming saves before the first item)
+    :param error_rate: Fraction of attempts answered with HTTP 503 (retried by the client)
+    :param items: Products per answer
+    :param urls_per_item: URLs per product, the main knob for payload size
+    :param seed: Seed for answers and failures
+    """
+
+    def __init__(
+        self,
+        latency_ms: float = 0.0,
+        item_ms: float = 0.0,
+        error_rate: float = 0.0,
+        items: int = 10,
+        urls_per_item: int = 3,
+        seed: int = 0,
+    ) -> None:
+        if not 0.0 <= error_rate <= 1.0:
+            raise ValueError(f'error_rate must be between 0 and 1, got {error_rate}')
+        self.latency = latency_ms / 1000.0
+        self.item_delay = item_ms / 1000.0
+        self.error_rate = error_rate
+        self.items = items
+        self.urls_per_item = urls_per_item
+        self.seed = seed
+        self._attempts: Dict[str, int] = defaultdict(int)
+        self.requests = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls, env: Mapping[str, str] = os.environ) -> 'FakeLLMTransport':
+        """Build the transport from the LLM_FAKE_* settings."""
+        return cls(
+            latency_ms=float(env.get('LLM_FAKE_LATENCY_MS', '200')),
+            item_ms=float(env.get('LLM_FAKE_ITEM_MS', '0')),
+            error_rate=float(env.get('LLM_FAKE_ERROR_RATE', '0')),
+            items=int(env.get('LLM_FAKE_ITEMS', '10')),
+            urls_per_item=int(env.get('LLM_FAKE_URLS_PER_ITEM', '3')),
+            seed=int(env.get('LLM_FAKE_SEED', '0')),
+        )
+
+    def answer(self, prompt: str) -> List[Dict[str, Any]]:
+        """Return the synthetic products the fake answers prompt with."""
+        rng = random.Random(f'{self.seed}:{prompt}')
+        slug = '-'.join(prompt.lower().split())[:40] or 'item'
+        return [
+            {
+                'title': f'{prompt} #{n + 1}',
+                'price': round(rng.uniform(5, 500), 2),
+                'urls': [
+                    f'https://shop{u}.example.com/{slug}/{n + 1}' for u in range(self.urls_per_item)
+                ],
+            }
+            for n in range(self.items)
+        ]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method != 'POST' or not request.url.path.endswith('/responses'):
+            return _error(404, f'The fake backend only serves POST /responses, not {request.url}')
+        body = json.loads(await request.aread())
+        prompt = next(
+            (m['content'] for m in reversed(body.get('input', [])) if m.get('role') == 'user'), ''
+        )
+        self.requests += 1
+        self._attempts[prompt] += 1
+        attempt = random.Random(f'{self.seed}:{prompt}:{self._attempts[prompt]}')
+
+        await asyncio.sleep(self.latency)
+        if attempt.random() < self.error_rate:
+            self.errors += 1
+            return _error(503, 'The fake backend is overloaded (simulated)')
+
+        items = self.answer(prompt)
+        model = body.get('model', FAKE_MODEL)
+        input_tokens = len(json.dumps(body.get('input', []))) // 4
+        if body.get('stream'):
+            return httpx.Response(
+                200,
+                content=self._events(items, model, input_tokens),
+                headers={'content-type': 'text/event-stream'},
+            )
+        await asyncio.sleep(self.item_delay * len(items))
+        text = json.dumps(items)
+        return httpx.Response(200, json=_response(model, text, input_tokens))
+
+    async def _events(
+        self, items: List[Dict[str, Any]], model: str, input_tokens: int
+    ) -> AsyncIterator[bytes]:
+        deltas = (
+            ['[']
+            + [('' if n == 0 else ', ') + json.dumps(item) for n, item in enumerate(items)]
+            + [']']
+        )
+        for n, delta in enumerate(deltas):
+            if 0 < n <= len(items):
+                await asyncio.sleep(self.item_delay)
+            event = {
+                'type': 'response.output_text.delta',
+                'item_id': 'msg_fake',
+                'output_index': 0,
+                'content_index': 0,
+                'delta': delta,
+                'logprobs': [],
+                'sequence_number': n,
+            }
+            yield _sse(event)
+        done = {
+            'type': 'response.completed',
+            'response': _response(model, ''.join(deltas), input_tokens),
+            'sequence_number': len(deltas),
+        }
+        yield _sse(done)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request and simulated-error counters."""
+        return {'requests': self.requests, 'errors': self.errors}
+
+
+def _sse(event: Dict[str, Any]) -> bytes:
+    return f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'.encode()
+
+
+def _error(status: int, message: str) -> httpx.Response:
+    return httpx.Response(status, json={'error': {'message': message, 'type': 'fake_error'}})
+
+
+def _response(model: str, text: str, input_tokens: int) -> Dict[str, Any]:
+    output_tokens = len(text) // 4
+    return {
+        'id': 'resp_fake',
+        'object': 'response',
+        'created_at': int(time.time()),
+        'model': model,
+        'status': 'completed',
+        'output': [
+            {
+                'id': 'msg_fake',
+                'type': 'message',
+                'role': 'assistant',
+                'status': 'completed',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+            }
+        ],
+        'parallel_tool_calls': False,
+        'tool_choice': 'auto',
+        'tools': [],
+        'usage': {
+            'input_tokens': input_tokens,
+            'input_tokens_details': {'cached_tokens': 0},
+            'output_tokens': output_tokens,
+            'output_tokens_details': {'reasoning_tokens': 0},
+            'total_tokens': input_tokens + output_tokens,
+        },
+    }
+
+
+class LLMBackend:
+    """A configured backend: its name, the SDK client to call it with, and the model name."""
+
+    def __init__(
+        self,
+        name: str,
+        client: AsyncOpenAI,
+        model: str,
+        fake: Optional[FakeLLMTransport] = None,
+    ) -> None:
+        self.name = name
+        self.client = client
+        self.model = model
+        # Set for the fake backend, to read its counters or change its behaviour in a benchmark
+        self.fake = fake
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the backend's name, model and, for the fake, its request counters."""
+        stats: Dict[str, Any] = {'name': self.name, 'model': self.model}
+        if self.fake is not None:
+            stats['fake'] = self.fake.stats()
+        return stats
+
+
+def fake_backend(
+    transport: Optional[FakeLLMTransport] = None, model: str = FAKE_MODEL
+) -> LLMBackend:
+    """
+    Return a backend answered in-process by a FakeLLMTransport.
+
+    :param transport: The fake to use (defaults to one configured from LLM_FAKE_*)
+    :param model: Model name sent with requests and recorded on scrape runs
+    """
+    transport = transport or FakeLLMTransport.from_env()
+    client = AsyncOpenAI(
+        api_key='fake',
+        base_url=FAKE_BASE_URL,
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=transport),
+    )
+    return LLMBackend('fake', client, model, fake=transport)
+
+
+def resolve_backend(env: Mapping[str, str] = os.environ) -> LLMBackend:
+    """
+    Build the backend selected by LLM_BACKEND (openai, compatible or fake).
+
+    The SDK's own retries are disabled; scraper.openai_client retries through its
+    ResilientCaller instead.
+
+    :param env: Settings to read (defaults to the process environment)
+    :return: The configured backend
+    :raises ValueError: If LLM_BACKEND is unknown, or compatible is selected without LLM_BASE_URL
+    """
+    name = env.get('LLM_BACKEND', 'openai').strip().lower() or 'openai'
+    model = env.get('LLM_MODEL', '').strip()
+    if name == 'fake':
+        return fake_backend(FakeLLMTransport.from_env(env), model or FAKE_MODEL)
+    if name == 'openai':
+        client = AsyncOpenAI(api_key=env.get('OPENAI_API_KEY'), max_retries=0)
+    elif name == 'compatible':
+        base_url = env.get('LLM_BASE_URL', '').strip()
+        if not base_url:
+            raise ValueError('LLM_BACKEND=compatible requires LLM_BASE_URL')
+        # local servers usually ignore the key, but the SDK insists on one
+        api_key = env.get('LLM_API_KEY') or env.get('OPENAI_API_KEY') or 'unused'
+        client = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    else:
+        raise ValueError(f'Unknown LLM_BACKEND {name!r}; expected one of {", ".join(BACKENDS)}')
+    return LLMBackend(name, client, model or DEFAULT_MODEL)
@@ -0,0 +1,170 @@
+"""
+Persistent cache of parsed model responses.
+
+Answers are stored in the llm_responses table keyed by (model, system prompt hash, normalized
+prompt), so repeating a prompt within the TTL (a re-created product, a retried scrape, a batch
+listing the same prompt twice) skips the model call. Rows expire after LLM_CACHE_TTL_SECONDS
+and the least recently used are evicted beyond LLM_CACHE_MAX_ENTRIES. LLM_CACHE_ENABLED=0
+turns the cache off; callers can also bypass the lookup for one call while still storing the
+fresh answer.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from scraper.openai_client import (
+    MODEL,
+    SYSTEM_PROMPT_SHA256,
+    clear_total_tokens,
+    last_total_tokens,
+    normalize_prompt,
+)
+
+logger = logging.getLogger(__name__)
+
+Items = List[Dict[str, Any]]
+
+
+def cache_key(
+    prompt: str, model: str = MODEL, system_prompt_hash: str = SYSTEM_PROMPT_SHA256
+) -> str:
+    """Return the SHA-256 hex key for prompt under model and system prompt."""
+    payload = json.dumps([model, system_prompt_hash, normalize_prompt(prompt)])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Read-through cache of fetch results backed by the llm_responses table.
+
+    Database errors are logged and treated as misses so a cache outage never fails a scrape.
+
+    :param session_factory: Zero-argument callable returning a new AsyncSession
+    :param ttl_seconds: Lifetime of a cached response
+    :param max_entries: Rows kept before least-recently-used eviction
+    :param enabled: When False every call goes straight to the model and nothing is stored
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        ttl_seconds: float = 3600.0,
+        max_entries: int = 10000,
+        enabled: bool = True,
+    ) -> None:
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self.errors = 0
+        self.tokens_saved = 0
+
+    @classmethod
+    def from_env(cls, session_factory: Callable[[], AsyncSession]) -> 'LLMResponseCache':
+        """Build a cache configured by LLM_CACHE_ENABLED/TTL_SECONDS/MAX_ENTRIES."""
+        return cls(
+            session_factory,
+            ttl_seconds=float(os.getenv('LLM_CACHE_TTL_SECONDS', '3600')),
+            max_entries=int(os.getenv('LLM_CACHE_MAX_ENTRIES', '10000')),
+            enabled=os.getenv('LLM_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no'),
+        )
+
+    def _fresh_after(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)
+
+    async def get(self, prompt: str) -> Optional[Items]:
+        """Return the cached items for prompt, or None on a miss."""
+        try:
+            async with self.session_factory() as db:
+                hit = await crud.get_llm_response(db, cache_key(prompt), self._fresh_after())
+        except Exception:
+            self.errors += 1
+            logger.warning('LLM response cache lookup failed', exc_info=True)
+            return None
+        if hit is None:
+            self.misses += 1
+            return None
+        items, total_tokens = hit
+        self.hits += 1
+        self.tokens_saved += total_tokens or 0
+        return items
+
+    async def put(self, prompt: str, items: Items, total_tokens: Optional[int] = None) -> None:
+        """Store items as the answer to prompt, evicting expired and least recently used rows."""
+        try:
+            async with self.session_factory() as db:
+                self.evictions += await crud.store_llm_response(
+                    db,
+                    cache_key(prompt),
+                    MODEL,
+                    normalize_prompt(prompt),
+                    items,
+                    total_tokens,
+                    self._fresh_after(),
+                    self.max_entries,
+                )
+        except Exception:
+            self.errors += 1
+            logger.warning('LLM response cache store failed', exc_info=True)
+
+    async def lookup(self, prompt: str, bypass: bool = False) -> Optional[Items]:
+        """
+        Return the cached answer to prompt, or None when disabled, bypassed or missing.
+
+        :param prompt: User prompt
+        :param bypass: Skip the lookup, counting it as a bypass
+        """
+        if not self.enabled:
+            return None
+        if bypass:
+            self.bypasses += 1
+            return None
+        return await self.get(prompt)
+
+    async def fetch(
+        self, prompt: str, fetch: Callable[[str], Awaitable[Items]], bypass: bool = False
+    ) -> Tuple[Items, bool]:
+        """
+        Return the answer to prompt from the cache, or from fetch on a miss.
+
+        :param prompt: User prompt
+        :param fetch: Coroutine function calling the model
+        :param bypass: Skip the lookup (the fresh answer is still stored)
+        :return: (items, True if served from the cache)
+        """
+        items = await self.lookup(prompt, bypass)
+        if items is not None:
+            return items, True
+        if not self.enabled:
+            return await fetch(prompt), False
+        clear_total_tokens()
+        items = await fetch(prompt)
+        await self.put(prompt, items, last_total_tokens())
+        return items, False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, tokens saved and configuration."""
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl_seconds,
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'evictions': self.evictions,
+            'errors': self.errors,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'tokens_saved': self.tokens_saved,
+        }
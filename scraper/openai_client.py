@@ -3,19 +3,64 @@ OpenAI client for fetching shopping items.
 
 Builds prompts and invokes ChatCompletion, then parses the JSON output
 into a list of product entries with title, price, and URLs.
+
+The model is reached through the backend selected by LLM_BACKEND: OpenAI, any
+OpenAI-compatible base URL, or an in-process fake for offline load tests (see
+scraper.llm_backend).
+
+Every request goes through one process-wide ResilientCaller (see scraper.resilience): a token
+bucket of OPENAI_RPM requests per minute, a circuit breaker (OPENAI_BREAKER_THRESHOLD failures,
+OPENAI_BREAKER_RESET_SECONDS cool-down) and up to OPENAI_MAX_ATTEMPTS attempts with jittered
+exponential backoff. The SDK's own retries are disabled so that policy is the only one.
+
+stream_shopping_items streams the answer instead and yields each product as soon as its JSON
+object is complete. Concurrent calls for the same normalized prompt, buffered or streamed, share
+one upstream request (see scraper.single_flight); counters are in coalescer.stats().
 """
 
+import hashlib
 import json
 import os
 import re
-from typing import Any, Dict, List, cast
+import unicodedata
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, List, Optional, cast
 
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
+from openai.types.responses import (
+    ResponseCompletedEvent,
+    ResponseErrorEvent,
+    ResponseFailedEvent,
+    ResponseInputParam,
+    ResponseTextDeltaEvent,
+)
+
+from scraper.json_stream import JsonArrayParser
+from scraper.llm_backend import resolve_backend
+from scraper.resilience import CircuitBreaker, ResilientCaller, RetryPolicy, TokenBucket
+from scraper.single_flight import SingleFlight
 
 load_dotenv()
 
-_client = AsyncOpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+backend = resolve_backend()
+_client = backend.client
+
+# Shared by every coroutine in the process, so concurrent scrapes respect one quota
+upstream = ResilientCaller(
+    TokenBucket(float(os.getenv('OPENAI_RPM', '0'))),
+    CircuitBreaker(
+        failure_threshold=int(os.getenv('OPENAI_BREAKER_THRESHOLD', '5')),
+        reset_seconds=float(os.getenv('OPENAI_BREAKER_RESET_SECONDS', '30')),
+    ),
+    RetryPolicy(
+        max_attempts=int(os.getenv('OPENAI_MAX_ATTEMPTS', '4')),
+        base_delay=float(os.getenv('OPENAI_BACKOFF_BASE_SECONDS', '0.5')),
+        max_delay=float(os.getenv('OPENAI_BACKOFF_MAX_SECONDS', '30')),
+    ),
+)
+
+# Model queried for shopping results (also recorded on each scrape run)
+MODEL = backend.model
 
 _SYSTEM_PROMPT = """
 You are a 'ChatGPT Shopping' shopping assistant.  Given a user request, return *only* valid JSON (no markdown fences, no extra text)—
@@ -27,6 +72,22 @@ an array of objects, each with these keys:
   Do not include any other fields or commentary.
     """
 
+# Identifies the system prompt in response-cache keys, so editing it invalidates cached answers
+SYSTEM_PROMPT_SHA256 = hashlib.sha256(_SYSTEM_PROMPT.encode()).hexdigest()
+
+# Total tokens reported for the last fetch_shopping_items call made in the current task
+_last_total_tokens: ContextVar[Optional[int]] = ContextVar('last_total_tokens', default=None)
+
+
+def last_total_tokens() -> Optional[int]:
+    """Return the token usage of the current task's last model call (None if not reported)."""
+    return _last_total_tokens.get()
+
+
+def clear_total_tokens() -> None:
+    """Forget the current task's recorded usage before calling a fetcher that may not set it."""
+    _last_total_tokens.set(None)
+
 
 def build_prompt(user_input: str) -> str:
     """
@@ -40,30 +101,48 @@ def build_prompt(user_input: str) -> str:
     return user_input
 
 
-async def fetch_shopping_items(raw_prompt: str) -> List[Dict[str, Any]]:
-    """
-    Sends the user’s prompt to OpenAI’s ChatCompletion endpoint,
-    then parses and returns the resulting JSON array.
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt for matching requests: Unicode NFKC, case-folded, whitespace collapsed."""
+    return ' '.join(unicodedata.normalize('NFKC', prompt).casefold().split())
 
-    :param raw_prompt: The shopping prompt entered by the user.
-    :return: A list of dictionaries, each with keys "title", "price", and "urls".
-    :raises RuntimeError: If the API response is not valid JSON.
-    """
+
+def _input(user_prompt: str) -> ResponseInputParam:
+    return [
+        {'role': 'system', 'content': _SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_prompt},
+    ]
+
+
+def request_body(raw_prompt: str) -> Dict[str, Any]:
+    """Return the Responses API request body fetch_shopping_items sends for raw_prompt."""
+    return {'model': MODEL, 'input': _input(build_prompt(raw_prompt))}
+
+
+async def _request_items(raw_prompt: str) -> List[Dict[str, Any]]:
+    """Make one non-streaming request and parse the whole answer."""
     user_prompt = build_prompt(raw_prompt)
-    resp = await _client.responses.create(
-        model='gpt-4.1-nano',
-        input=[
-            {'role': 'system', 'content': _SYSTEM_PROMPT},
-            {'role': 'user', 'content': user_prompt},
-        ],
+    _last_total_tokens.set(None)
+    resp = await upstream.call(
+        lambda: _client.responses.create(model=MODEL, input=_input(user_prompt))
     )
+    _last_total_tokens.set(getattr(getattr(resp, 'usage', None), 'total_tokens', None))
 
     # 1) grab the assistant’s text block (ensure structure exists)
     try:
         raw: str = resp.output_text
     except (IndexError, AttributeError) as e:
         raise RuntimeError(f'Invalid response structure from OpenAI: {resp}') from e
+    return parse_items(raw)
+
+
+def parse_items(raw: str) -> List[Dict[str, Any]]:
+    """
+    Parse the model's complete output text into product entries.
 
+    :param raw: Output text, optionally wrapped in a ```json fence
+    :return: A list of dictionaries, each with keys "title", "price", and "urls".
+    :raises RuntimeError: If the text is not a JSON list.
+    """
     # 2) strip any ```json … ``` fence, pulling out the [...] block
     m = re.search(r'```json\s*([\s\S]+?)\s*```', raw, re.IGNORECASE)
     json_str = m.group(1) if m else raw
@@ -80,6 +159,80 @@ async def fetch_shopping_items(raw_prompt: str) -> List[Dict[str, Any]]:
     return cast(List[Dict[str, Any]], parsed)
 
 
+async def _stream_items(raw_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+    """Make one streaming request, yielding each product as the parser completes it."""
+    user_prompt = build_prompt(raw_prompt)
+    _last_total_tokens.set(None)
+    stream = await upstream.call(
+        lambda: _client.responses.create(model=MODEL, input=_input(user_prompt), stream=True)
+    )
+    parser = JsonArrayParser()
+    async with stream:
+        async for event in stream:
+            if isinstance(event, ResponseTextDeltaEvent):
+                for item in parser.feed(event.delta):
+                    yield item
+            elif isinstance(event, ResponseCompletedEvent):
+                usage = event.response.usage
+                _last_total_tokens.set(usage.total_tokens if usage else None)
+            elif isinstance(event, ResponseFailedEvent):
+                raise RuntimeError(f'OpenAI response failed: {event.response.error}')
+            elif isinstance(event, ResponseErrorEvent):
+                raise RuntimeError(f'OpenAI stream error: {event.message}')
+    parser.close()
+
+
+async def _buffered(raw_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+    for item in await _request_items(raw_prompt):
+        yield item
+
+
+# Identical requests in flight at the same time share one upstream call
+coalescer: SingleFlight[Dict[str, Any]] = SingleFlight(capture=last_total_tokens)
+
+
+async def fetch_shopping_items(raw_prompt: str) -> List[Dict[str, Any]]:
+    """
+    Sends the user’s prompt to OpenAI’s ChatCompletion endpoint,
+    then parses and returns the resulting JSON array.
+
+    A call made while the same normalized prompt is already in flight waits for that request
+    instead of sending another one.
+
+    :param raw_prompt: The shopping prompt entered by the user.
+    :return: A list of dictionaries, each with keys "title", "price", and "urls".
+    :raises RuntimeError: If the API response is not valid JSON.
+    :raises CircuitOpenError: If recent upstream failures opened the circuit breaker.
+    :raises openai.APIError: If the request still fails after retries.
+    """
+    _last_total_tokens.set(None)
+    flight = coalescer.join(normalize_prompt(raw_prompt), lambda: _buffered(raw_prompt))
+    items = await flight.result()
+    _last_total_tokens.set(flight.meta)
+    return items
+
+
+async def stream_shopping_items(raw_prompt: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream the model's answer to the user's prompt, yielding each product as it completes.
+
+    Only opening the stream is retried; an error after items were yielded propagates, since
+    the caller may already have stored them. A call made while the same normalized prompt is
+    already in flight replays that request's items so far and then follows it.
+
+    :param raw_prompt: The shopping prompt entered by the user.
+    :return: Async iterator of dictionaries with keys "title", "price", and "urls".
+    :raises RuntimeError: If the model fails or its output is not a complete JSON list.
+    :raises CircuitOpenError: If recent upstream failures opened the circuit breaker.
+    :raises openai.APIError: If the request still fails after retries.
+    """
+    _last_total_tokens.set(None)
+    flight = coalescer.join(normalize_prompt(raw_prompt), lambda: _stream_items(raw_prompt))
+    async for item in flight.follow():
+        yield item
+    _last_total_tokens.set(flight.meta)
+
+
 if __name__ == '__main__':
     import asyncio
     import pprint
@@ -0,0 +1,294 @@
+"""
+Shared scrape pipeline: fetch items for a prompt and store them as one scrape run.
+
+Used by the one-off scraper and the API's product bootstrap, so every scrape records the
+same run metadata (start time, model call duration, model) and item conversion.
+stream_run stores each item as soon as the streamed answer completes it instead of waiting for
+the whole response. scrape_many runs many prompts in one process under a concurrency limit.
+"""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, schemas
+from scraper.llm_cache import LLMResponseCache
+from scraper.openai_client import (
+    MODEL,
+    clear_total_tokens,
+    fetch_shopping_items,
+    last_total_tokens,
+    stream_shopping_items,
+)
+
+Fetcher = Callable[[str], Awaitable[List[Dict[str, Any]]]]
+Streamer = Callable[[str], AsyncIterator[Dict[str, Any]]]
+
+# Store items as the model streams them (run_once and POST /products) unless SCRAPE_STREAMING=0
+STREAM_SCRAPES = os.getenv('SCRAPE_STREAMING', '1').lower() not in ('0', 'false', 'no')
+
+
+class FetchedRun:
+    """Items returned by one model call plus the timing recorded for its scrape run."""
+
+    def __init__(
+        self,
+        items: List[Dict[str, Any]],
+        started_at: datetime,
+        duration_ms: int,
+        model: str,
+        cache_hit: bool = False,
+        first_item_ms: Optional[int] = None,
+    ) -> None:
+        self.items = items
+        self.started_at = started_at
+        self.duration_ms = duration_ms
+        self.model = model
+        self.cache_hit = cache_hit
+        # Time until the first item was stored, for streamed runs
+        self.first_item_ms = first_item_ms
+
+
+def _elapsed_ms(start: float) -> int:
+    return round((perf_counter() - start) * 1000)
+
+
+async def fetch_run(
+    prompt: str,
+    fetch: Fetcher = fetch_shopping_items,
+    cache: Optional[LLMResponseCache] = None,
+    bypass_cache: bool = False,
+) -> FetchedRun:
+    """
+    Call the model for prompt, timing the request.
+
+    :param prompt: Shopping prompt to send
+    :param fetch: Coroutine returning the parsed items (defaults to the OpenAI client)
+    :param cache: Response cache to answer from and store into, if any
+    :param bypass_cache: Call the model even on a cache hit (the answer is still stored)
+    :return: FetchedRun with the items and timing
+    """
+    started_at = datetime.now(timezone.utc)
+    start = perf_counter()
+    if cache is None:
+        items, cache_hit = await fetch(prompt), False
+    else:
+        items, cache_hit = await cache.fetch(prompt, fetch, bypass=bypass_cache)
+    return FetchedRun(items, started_at, _elapsed_ms(start), MODEL, cache_hit=cache_hit)
+
+
+def items_to_snapshots(
+    product_id: int, items: List[Dict[str, Any]]
+) -> List[schemas.SnapshotCreate]:
+    """Convert parsed model items into snapshot create schemas, preserving rank order."""
+    return [
+        schemas.SnapshotCreate(
+            product_id=product_id,
+            title=item['title'],
+            price=item.get('price'),
+            urls=item.get('urls', []),
+        )
+        for item in items
+    ]
+
+
+async def save_run(
+    db: AsyncSession, product_id: int, fetched: FetchedRun, dedupe: bool = True
+) -> Tuple[schemas.ScrapeRunRead, List[schemas.SnapshotRead]]:
+    """
+    Store a fetched run and its items for product_id in one transaction.
+
+    :param db: Async database session
+    :param product_id: Product the run belongs to
+    :param fetched: Result of fetch_run
+    :param dedupe: Extend unchanged items' previous snapshot instead of inserting a duplicate
+    :return: The stored run and its snapshots, in rank order
+    """
+    run_in = schemas.ScrapeRunCreate(
+        product_id=product_id,
+        started_at=fetched.started_at,
+        duration_ms=fetched.duration_ms,
+        model=fetched.model,
+    )
+    return await crud.record_scrape_run(
+        db, run_in, items_to_snapshots(product_id, fetched.items), dedupe=dedupe
+    )
+
+
+async def stream_run(
+    db: AsyncSession,
+    product_id: int,
+    prompt: str,
+    stream: Streamer = stream_shopping_items,
+    cache: Optional[LLMResponseCache] = None,
+    bypass_cache: bool = False,
+    on_items: Optional[Callable[[int], None]] = None,
+) -> Tuple[schemas.ScrapeRunRead, FetchedRun]:
+    """
+    Stream the model's answer for prompt into a new scrape run, storing each item on arrival.
+
+    The run row is created before the model call and every item is committed as soon as the
+    parser completes it, so readers see the first products while the rest are being generated.
+    A cached answer is stored in one transaction as by save_run. If the stream fails part-way,
+    the items already stored stay on the run and the error propagates.
+
+    :param db: Async database session
+    :param product_id: Product the run belongs to
+    :param prompt: Shopping prompt to send
+    :param stream: Async generator yielding parsed items (defaults to the OpenAI client)
+    :param cache: Response cache to answer from and store the complete answer into, if any
+    :param bypass_cache: Call the model even on a cache hit (the answer is still stored)
+    :param on_items: Called with the number of items stored so far after each write
+    :return: The finished run, and a FetchedRun with every item and the run's timing
+    """
+    started_at = datetime.now(timezone.utc)
+    start = perf_counter()
+    cached = await cache.lookup(prompt, bypass_cache) if cache is not None else None
+    if cached is not None:
+        fetched = FetchedRun(cached, started_at, _elapsed_ms(start), MODEL, cache_hit=True)
+        run, _ = await save_run(db, product_id, fetched)
+        if on_items is not None:
+            on_items(run.item_count)
+        return run, fetched
+
+    run = await crud.start_scrape_run(
+        db, schemas.ScrapeRunCreate(product_id=product_id, started_at=started_at, model=MODEL)
+    )
+    items: List[Dict[str, Any]] = []
+    first_item_ms: Optional[int] = None
+    clear_total_tokens()
+    try:
+        async for item in stream(prompt):
+            if first_item_ms is None:
+                first_item_ms = _elapsed_ms(start)
+            await crud.add_scrape_run_items(db, run.id, items_to_snapshots(product_id, [item]))
+            items.append(item)
+            if on_items is not None:
+                on_items(len(items))
+    except Exception:
+        await db.rollback()
+        await crud.finish_scrape_run(db, run.id, _elapsed_ms(start))
+        raise
+    duration_ms = _elapsed_ms(start)
+    run = await crud.finish_scrape_run(db, run.id, duration_ms)
+    if cache is not None and cache.enabled:
+        await cache.put(prompt, items, last_total_tokens())
+    return run, FetchedRun(items, started_at, duration_ms, MODEL, first_item_ms=first_item_ms)
+
+
+# A prompt to scrape, with the product it belongs to (None: look up or create by prompt)
+ScrapeTarget = Tuple[Optional[int], str]
+
+
+class PromptResult:
+    """Outcome and timing of one prompt in a scrape_many batch."""
+
+    def __init__(self, prompt: str, product_id: Optional[int] = None) -> None:
+        self.prompt = prompt
+        self.product_id = product_id
+        self.run_id: Optional[int] = None
+        self.item_count = 0
+        self.cache_hit = False
+        self.fetch_ms: Optional[int] = None
+        self.first_item_ms: Optional[int] = None
+        self.total_ms = 0
+        self.error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def scrape_many(
+    targets: Sequence[ScrapeTarget],
+    session_maker: Optional[async_sessionmaker[AsyncSession]],
+    concurrency: int = 8,
+    fetch: Fetcher = fetch_shopping_items,
+    on_result: Optional[Callable[[PromptResult], None]] = None,
+    cache: Optional[LLMResponseCache] = None,
+    bypass_cache: bool = False,
+    stream: Optional[Streamer] = None,
+) -> List[PromptResult]:
+    """
+    Fetch and store many prompts concurrently, saving each run as soon as its fetch completes.
+
+    A failure (model error, unparsable output, database error) is recorded on that prompt's
+    result and does not stop the others. Prompts of stored products are refreshes and skip the
+    response-cache lookup, as scheduled refreshes do: a cached answer would be saved as a new
+    sighting and extend its runs' last_seen_at.
+
+    :param targets: (product_id, prompt) pairs; a None product_id uses get_or_create_product
+    :param session_maker: Session factory for the writes, or None to only fetch
+    :param concurrency: Maximum prompts in flight at once
+    :param fetch: Coroutine returning the parsed items (defaults to the OpenAI client)
+    :param on_result: Called with each result as it finishes, in completion order
+    :param cache: Response cache to answer from and store into, if any
+    :param bypass_cache: Call the model for new prompts too (answers are still stored)
+    :param stream: Streaming fetcher; when set (and saving), items are stored as they arrive
+    :return: One PromptResult per target, in input order
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def _product_id(db: AsyncSession, result: PromptResult) -> int:
+        if result.product_id is None:
+            product = await crud.get_or_create_product(db, result.prompt, result.prompt)
+            result.product_id = product.id
+        return result.product_id
+
+    async def _one(product_id: Optional[int], prompt: str) -> PromptResult:
+        result = PromptResult(prompt, product_id)
+        async with slots:
+            start = perf_counter()
+            try:
+                if result.product_id is None and session_maker is not None:
+                    async with session_maker() as db:
+                        existing = await crud.get_product_by_prompt(db, prompt)
+                    if existing is not None:
+                        result.product_id = existing.id
+                refresh = bypass_cache or result.product_id is not None
+                if stream is not None and session_maker is not None:
+                    # the run is stored while the answer streams, so the product must exist first
+                    async with session_maker() as db:
+                        run, fetched = await stream_run(
+                            db,
+                            await _product_id(db, result),
+                            prompt,
+                            stream=stream,
+                            cache=cache,
+                            bypass_cache=refresh,
+                        )
+                        result.run_id = run.id
+                else:
+                    fetched = await fetch_run(
+                        prompt, fetch=fetch, cache=cache, bypass_cache=refresh
+                    )
+                result.fetch_ms = fetched.duration_ms
+                result.first_item_ms = fetched.first_item_ms
+                result.cache_hit = fetched.cache_hit
+                result.item_count = len(fetched.items)
+                if session_maker is not None and result.run_id is None:
+                    async with session_maker() as db:
+                        run, _ = await save_run(db, await _product_id(db, result), fetched)
+                        result.run_id = run.id
+            except Exception as e:
+                result.error = f'{type(e).__name__}: {e}'
+            result.total_ms = round((perf_counter() - start) * 1000)
+        if on_result is not None:
+            on_result(result)
+        return result
+
+    return list(await asyncio.gather(*(_one(pid, prompt) for pid, prompt in targets)))
@@ -0,0 +1,326 @@
+"""
+Admission control and failure handling for upstream model calls.
+
+- TokenBucket: process-wide request limiter shared by every coroutine; a 429 that says the
+  quota is exhausted pauses the bucket for everyone instead of letting each caller retry.
+- CircuitBreaker: after consecutive upstream failures, calls fail fast for a cool-down period,
+  then a single trial call decides whether to close the circuit again.
+- RetryPolicy: exponential backoff with jitter for 429s, 5xx, timeouts and connection errors,
+  using Retry-After / retry-after-ms / x-ratelimit-reset-* hints when the server sends them.
+"""
+
+import asyncio
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, TypeVar
+
+import httpx
+from openai import APIConnectionError, APIStatusError
+
+T = TypeVar('T')
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|s|m|h)')
+_DURATION_SECONDS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """
+    Parse an OpenAI rate-limit reset duration such as ``'20ms'``, ``'1s'`` or ``'6m0s'``.
+
+    :param value: Header value
+    :return: Seconds, or None if the value is not a duration
+    """
+    parts = _DURATION_PART.findall(value.strip())
+    if not parts or ''.join(n + u for n, u in parts) != value.strip():
+        return None
+    return sum(float(n) * _DURATION_SECONDS[u] for n, u in parts)
+
+
+def retry_after(headers: Mapping[str, str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Return how long the server asked clients to wait, from response headers.
+
+    Checks ``retry-after-ms``, ``retry-after`` (seconds or an HTTP date) and, failing those, the
+    later of ``x-ratelimit-reset-requests``/``-tokens`` for whichever budget is exhausted.
+
+    :param headers: Response headers (case-insensitive mapping)
+    :param now: Current Unix time, for HTTP-date values
+    :return: Seconds to wait, or None without a usable hint
+    """
+    if 'retry-after-ms' in headers:
+        try:
+            return max(float(headers['retry-after-ms']) / 1000, 0.0)
+        except ValueError:
+            pass
+    if 'retry-after' in headers:
+        value = headers['retry-after']
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(value).timestamp()
+            except (TypeError, ValueError):
+                when = None
+            if when is not None:
+                return max(when - (time.time() if now is None else now), 0.0)
+    waits = []
+    for budget in ('requests', 'tokens'):
+        if headers.get(f'x-ratelimit-remaining-{budget}') == '0':
+            wait = parse_duration(headers.get(f'x-ratelimit-reset-{budget}', ''))
+            if wait is not None:
+                waits.append(wait)
+    return max(waits) if waits else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """True for upstream errors worth retrying: 408/409/429, 5xx, timeouts, connection errors."""
+    if isinstance(exc, APIStatusError):
+        return exc.status_code in (408, 409, 429) or exc.status_code >= 500
+    return isinstance(exc, (APIConnectionError, httpx.TransportError))
+
+
+class TokenBucket:
+    """
+    Token-bucket limiter: refills rate_per_minute tokens per minute up to capacity.
+
+    :param rate_per_minute: Sustained request rate (0 disables limiting)
+    :param capacity: Burst size (defaults to one second's worth, at least 1)
+    :param clock: Monotonic clock in seconds
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(self.rate, 1.0)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, cost: float = 1.0) -> float:
+        """
+        Take cost tokens, going into debt if needed.
+
+        :param cost: Tokens to take
+        :return: Seconds the caller must wait before proceeding
+        """
+        now = self._clock()
+        pause = max(self._paused_until - now, 0.0)
+        if self.rate <= 0:
+            return pause
+        self._refill(now)
+        self._tokens -= cost
+        debt = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        return max(debt, pause)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every caller for seconds (e.g. when upstream reports the quota exhausted)."""
+        self._paused_until = max(self._paused_until, self._clock() + seconds)
+
+    async def acquire(self, cost: float = 1.0) -> None:
+        """Wait until cost tokens are available and take them."""
+        async with self._lock:
+            delay = self.reserve(cost)
+        if delay > 0:
+            self.waited_seconds += delay
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after failure_threshold consecutive failures; open -> half-open after
+    reset_seconds; a successful half-open trial closes it, a failed one re-opens it.
+
+    :param failure_threshold: Consecutive failures that open the circuit (0 disables it)
+    :param reset_seconds: Cool-down before a trial call is allowed
+    :param clock: Monotonic clock in seconds
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if self._clock() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or fail fast.
+
+        :return: True if the call is the half-open trial; it must end in record_success,
+            record_failure or release_trial
+        :raises CircuitOpenError: While open, or while a half-open trial is already running
+        """
+        state = self.state
+        if state == 'closed':
+            return False
+        if state == 'half_open' and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        raise CircuitOpenError('Upstream circuit is open; failing fast')
+
+    def release_trial(self) -> None:
+        """Give up the half-open trial slot without an outcome (e.g. the trial was cancelled)."""
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        trial = self._trial_in_flight
+        self._trial_in_flight = False
+        if self.failure_threshold and (trial or self.failures >= self.failure_threshold):
+            if self.opened_at is None or trial:
+                self.opened += 1
+            self.opened_at = self._clock()
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with jitter, honoring server wait hints.
+
+    :param max_attempts: Total attempts including the first
+    :param base_delay: Backoff before the second attempt, doubled per attempt
+    :param max_delay: Cap on any single wait
+    :param rng: Random source for jitter
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        rng: Optional[random.Random] = None,
+    ) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rng = rng or random.Random()
+
+    def delay(self, attempt: int, hint: Optional[float] = None) -> float:
+        """
+        Seconds to wait after failed attempt number attempt (1-based).
+
+        A server hint is used as the floor, with up to 10% jitter added so callers released at
+        the same moment do not retry in lockstep; otherwise the wait is drawn uniformly from the
+        upper half of the exponential backoff.
+        """
+        if hint is not None:
+            return min(hint * (1 + self.rng.uniform(0, 0.1)), self.max_delay)
+        backoff = min(self.base_delay * 2 ** (attempt - 1), self.max_delay)
+        return self.rng.uniform(backoff / 2, backoff)
+
+
+class ResilientCaller:
+    """
+    Runs upstream calls through a shared limiter, circuit breaker and retry policy.
+
+    :param limiter: Process-wide request limiter
+    :param breaker: Circuit breaker for the upstream
+    :param policy: Retry policy for transient failures
+    :param sleep: Coroutine used to wait between attempts
+    """
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        policy: RetryPolicy,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.limiter = limiter
+        self.breaker = breaker
+        self.policy = policy
+        self.sleep = sleep
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Call fn, retrying transient upstream failures.
+
+        :param fn: Zero-argument coroutine function making one upstream request
+        :return: fn's result
+        :raises CircuitOpenError: If the breaker is open
+        :raises Exception: The last error once retries are exhausted, or any non-retryable error
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            trial = self.breaker.before_call()
+            try:
+                await self.limiter.acquire()
+                self.calls += 1
+                result = await fn()
+            except BaseException as e:
+                if not isinstance(e, Exception):
+                    # cancelled (or exiting) before an outcome: free the trial for the next call
+                    if trial:
+                        self.breaker.release_trial()
+                    raise
+                if not is_retryable(e):
+                    # the upstream answered; a bad request is not a sign of an outage
+                    self.breaker.record_success()
+                    raise
+                self.breaker.record_failure()
+                response = getattr(e, 'response', None)
+                hint = retry_after(response.headers) if response is not None else None
+                if isinstance(e, APIStatusError) and e.status_code == 429 and hint:
+                    self.limiter.pause(hint)
+                if attempt >= self.policy.max_attempts or self.breaker.state == 'open':
+                    self.failures += 1
+                    raise
+                self.retries += 1
+                await self.sleep(self.policy.delay(attempt, hint))
+                continue
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call/retry counters, breaker state and limiter wait time."""
+        return {
+            'calls': self.calls,
+            'retries': self.retries,
+            'failures': self.failures,
+            'breaker_state': self.breaker.state,
+            'breaker_opened': self.breaker.opened,
+            'breaker_rejected': self.breaker.rejected,
+            'limiter_wait_seconds': self.limiter.waited_seconds,
+        }
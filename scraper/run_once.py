@@ -1,18 +1,35 @@
 """
 Entry point for the scraping job.
 Fetches shopping items from OpenAI and persists snapshots to the database.
+
+Pass one ``--prompt``, or batch many prompts through one process (sharing the engine and the
+OpenAI client) with ``--prompts-file`` (``-`` reads stdin) or ``--all-products``. Items are
+stored as the model streams them unless ``--no-stream`` (or SCRAPE_STREAMING=0) is given.
 """
 
 import argparse
 import asyncio
 import logging
 import pprint
+import sys
+from time import perf_counter
+from typing import List, Optional, TextIO
 
 from dotenv import load_dotenv
 
-from app import crud, schemas
+from app import crud
 from app.db import AsyncSessionLocal, init_models
-from scraper.openai_client import fetch_shopping_items
+from scraper.llm_cache import LLMResponseCache
+from scraper.openai_client import coalescer, stream_shopping_items
+from scraper.pipeline import (
+    STREAM_SCRAPES,
+    PromptResult,
+    ScrapeTarget,
+    fetch_run,
+    save_run,
+    scrape_many,
+    stream_run,
+)
 
 load_dotenv()
 
@@ -20,21 +37,59 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-async def main(prompt: str, no_db: bool) -> None:
-    """Fetch items for the given prompt and optionally save to the database."""
-    # 1) pull data from OpenAI
-    items = await fetch_shopping_items(prompt)
+def _response_cache(no_db: bool) -> Optional[LLMResponseCache]:
+    """The database-backed response cache, unless the run does not touch the database."""
+    return None if no_db else LLMResponseCache.from_env(AsyncSessionLocal)
 
-    # 2) print out the raw result
-    print('\n✅ Parsed JSON:')
-    pprint.pp(items)
 
-    # 3) bail out early if user passed --no-db
+async def main_stream(prompt: str, no_db: bool, no_cache: bool = False) -> None:
+    """Stream items for the given prompt, printing (and saving) each one as it arrives."""
     if no_db:
+        async for item in stream_shopping_items(prompt):
+            pprint.pp(item)
         return
 
-    # 4) ensure tables exist (only if you're not running migrations)
     await init_models()
+    async with AsyncSessionLocal() as db:
+        existing = await crud.get_product_by_prompt(db, prompt)
+        product = existing or await crud.get_or_create_product(db, name=prompt, prompt=prompt)
+        run, fetched = await stream_run(
+            db,
+            product.id,
+            prompt,
+            cache=_response_cache(no_db),
+            # refreshing a stored product never reuses a cached answer as a new sighting
+            bypass_cache=no_cache or existing is not None,
+            on_items=lambda count: print(f'✅ Saved item {count}'),
+        )
+    if fetched.cache_hit:
+        print('✅ Answered from the response cache')
+    first = f', first item after {fetched.first_item_ms} ms' if fetched.first_item_ms else ''
+    print(f'✅ Recorded run {run.id}: {run.item_count} items in {run.duration_ms} ms{first}')
+
+
+async def main(prompt: str, no_db: bool, no_cache: bool = False) -> None:
+    """Fetch items for the given prompt and optionally save to the database."""
+    # 1) ensure tables exist (only if you're not running migrations)
+    if not no_db:
+        await init_models()
+
+    # 2) pull data from OpenAI (or, for a new prompt, the response cache), timing the call for
+    #    the run record; refreshing a stored product never reuses a cached answer
+    refresh = False
+    if not no_db:
+        async with AsyncSessionLocal() as db:
+            refresh = await crud.get_product_by_prompt(db, prompt) is not None
+    cache = _response_cache(no_db)
+    fetched = await fetch_run(prompt, cache=cache, bypass_cache=no_cache or refresh)
+
+    # 3) print out the raw result
+    print('\n✅ Parsed JSON' + (' (from response cache):' if fetched.cache_hit else ':'))
+    pprint.pp(fetched.items)
+
+    # 4) bail out early if user passed --no-db
+    if no_db:
+        return
 
     # 5) open a single transactional session
     async with AsyncSessionLocal() as db:
@@ -45,30 +100,154 @@ async def main(prompt: str, no_db: bool) -> None:
             prompt=prompt,
         )
 
-        # 6) write each Snapshot in turn
-        for idx, item in enumerate(items, start=1):
-            snap_in = schemas.SnapshotCreate(
-                product_id=product.id,
-                title=item['title'],
-                price=item.get('price'),
-                urls=item.get('urls', []),
-            )
-            snap = await crud.create_snapshot(db, snap_in)
+        # 6) store the run and all its snapshots in one transaction; items unchanged since the
+        #    last run only extend their previous snapshot's last_seen_at
+        run, snaps = await save_run(db, product.id, fetched)
+        for idx, snap in enumerate(snaps, start=1):
             print(f'✅ Saved snapshot {snap.id} (rank {idx})')
+        print(f'✅ Recorded run {run.id}: {run.item_count} items in {run.duration_ms} ms')
+
+
+def read_prompts(stream: TextIO) -> List[str]:
+    """Read one prompt per line, skipping blank lines, ``#`` comments and repeated prompts."""
+    prompts = (line.strip() for line in stream)
+    return list(dict.fromkeys(p for p in prompts if p and not p.startswith('#')))
+
+
+def _print_result(result: PromptResult) -> None:
+    fetch_ms = '-' if result.fetch_ms is None else f'{result.fetch_ms} ms'
+    if result.cache_hit:
+        fetch_ms += ' (cached)'
+    elif result.first_item_ms is not None:
+        fetch_ms += f' (first item {result.first_item_ms} ms)'
+    if result.ok:
+        run = f'run {result.run_id}' if result.run_id is not None else 'not saved'
+        print(
+            f'✅ {result.prompt!r}: {result.item_count} items, {run}, fetch {fetch_ms}, '
+            f'total {result.total_ms} ms'
+        )
+    else:
+        print(
+            f'❌ {result.prompt!r}: {result.error} (fetch {fetch_ms}, total {result.total_ms} ms)'
+        )
+
 
-        await db.commit()
+async def main_batch(
+    prompts_file: Optional[str],
+    all_products: bool,
+    concurrency: int,
+    no_db: bool,
+    no_cache: bool = False,
+    stream: bool = False,
+) -> int:
+    """
+    Scrape many prompts concurrently, storing each run as it completes.
+
+    :param prompts_file: File with one prompt per line (``-`` for stdin), or None
+    :param all_products: Refresh every stored product instead of reading prompts
+    :param concurrency: Maximum model calls in flight
+    :param no_db: Only fetch and report, do not persist
+    :param no_cache: Call the model even for new prompts with a cached answer
+    :param stream: Store each prompt's items as the model streams them
+    :return: Number of prompts that failed
+    """
+    if all_products:
+        async with AsyncSessionLocal() as db:
+            targets: List[ScrapeTarget] = list(await crud.get_product_prompts(db))
+    elif prompts_file == '-':
+        targets = [(None, prompt) for prompt in read_prompts(sys.stdin)]
+    else:
+        with open(prompts_file or '', encoding='utf-8') as f:
+            targets = [(None, prompt) for prompt in read_prompts(f)]
+
+    if not no_db:
+        await init_models()
+    cache = _response_cache(no_db)
+    start = perf_counter()
+    results = await scrape_many(
+        targets,
+        None if no_db else AsyncSessionLocal,
+        concurrency=concurrency,
+        on_result=_print_result,
+        cache=cache,
+        bypass_cache=no_cache,
+        stream=stream_shopping_items if stream else None,
+    )
+    elapsed_ms = round((perf_counter() - start) * 1000)
+
+    failed = [r for r in results if not r.ok]
+    fetch_times = sorted(r.fetch_ms for r in results if r.fetch_ms is not None)
+    print(
+        f'\n{len(results) - len(failed)}/{len(results)} prompts succeeded in {elapsed_ms} ms '
+        f'(concurrency {concurrency})'
+    )
+    if fetch_times:
+        p50 = fetch_times[len(fetch_times) // 2]
+        print(f'fetch p50 {p50} ms, max {fetch_times[-1]} ms')
+    if cache is not None and cache.enabled:
+        stats = cache.stats()
+        print(
+            f'response cache: {stats["hits"]} hits, {stats["misses"]} misses '
+            f'({stats["hit_rate"]:.0%}), {stats["tokens_saved"]} tokens saved'
+        )
+    coalesced = coalescer.stats()['coalesced']
+    if coalesced:
+        print(f'{coalesced} duplicate prompts shared an in-flight model call')
+    for r in failed:
+        print(f'  failed: {r.prompt!r}: {r.error}')
+    return len(failed)
 
 
 def parse_args() -> argparse.Namespace:
     """Parse command-line arguments for scraper."""
     parser = argparse.ArgumentParser(description='Fetch shopping items and optionally save to DB')
-    parser.add_argument('-p', '--prompt', required=True, help='Shopping prompt for OpenAI')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-p', '--prompt', help='Shopping prompt for OpenAI')
+    source.add_argument(
+        '-f', '--prompts-file', help='Batch mode: file with one prompt per line (- for stdin)'
+    )
+    source.add_argument(
+        '--all-products', action='store_true', help='Batch mode: refresh every stored product'
+    )
+    parser.add_argument(
+        '-c', '--concurrency', type=int, default=8, help='Batch mode: prompts in flight at once'
+    )
     parser.add_argument(
         '--no-db', action='store_true', help='Only print results, do not persist to DB'
     )
-    return parser.parse_args()
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Call the model for new prompts too (stored products always are; answers are cached)',
+    )
+    parser.add_argument(
+        '--stream',
+        action=argparse.BooleanOptionalAction,
+        default=STREAM_SCRAPES,
+        help='Store items as the model streams them (default from SCRAPE_STREAMING, on)',
+    )
+    args = parser.parse_args()
+    if args.all_products and args.no_db:
+        parser.error('--all-products reads prompts from the database and cannot use --no-db')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+    return args
 
 
 if __name__ == '__main__':
     args = parse_args()
-    asyncio.run(main(args.prompt, args.no_db))
+    if args.prompt:
+        single = main_stream if args.stream else main
+        asyncio.run(single(args.prompt, args.no_db, args.no_cache))
+    else:
+        failures = asyncio.run(
+            main_batch(
+                args.prompts_file,
+                args.all_products,
+                args.concurrency,
+                args.no_db,
+                args.no_cache,
+                args.stream,
+            )
+        )
+        sys.exit(1 if failures else 0)
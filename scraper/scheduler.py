@@ -0,0 +1,348 @@
+"""
+Long-running refresh scheduler.
+
+Every product with refreshes enabled sits on a min-heap keyed by its next due time. Due times
+are derived from the product's last refresh in the database, so a restarted scheduler resumes
+where the previous one stopped instead of re-scraping everything. Each interval is jittered
+so products created together drift apart, and due products are dispatched through a pacer that
+spaces requests evenly within the requests-per-minute and tokens-per-minute budgets: a backlog
+drains at the full quota rate without bursting, and nothing waits once its slot comes up.
+
+Run with ``python -m scraper.scheduler``. Settings (all optional):
+    SCHEDULER_DEFAULT_INTERVAL_MINUTES, SCHEDULER_JITTER, SCHEDULER_RPM, SCHEDULER_TPM,
+    SCHEDULER_TOKENS_PER_REQUEST, SCHEDULER_MAX_CONCURRENCY, SCHEDULER_RELOAD_SECONDS.
+"""
+
+import argparse
+import asyncio
+import heapq
+import logging
+import os
+import random
+import signal
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud
+from scraper.llm_cache import LLMResponseCache
+from scraper.openai_client import fetch_shopping_items
+from scraper.pipeline import Fetcher, fetch_run, save_run
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Retry delay after the first failed refresh; doubles per consecutive failure up to the interval
+FAILURE_BACKOFF = timedelta(minutes=1)
+
+
+class RatePacer:
+    """
+    Evenly spaced admission under per-minute budgets of requests and tokens.
+
+    Each reservation starts no earlier than the previous one's slot and pushes every budget's
+    next slot forward by cost * 60 / per_minute seconds, so admissions are spread out rather
+    than allowed in bursts at the start of each minute.
+
+    :param requests_per_minute: Request budget (0 means unlimited)
+    :param tokens_per_minute: Token budget (0 means unlimited)
+    :param clock: Monotonic clock in seconds
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._request_spacing = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._token_spacing = 60.0 / tokens_per_minute if tokens_per_minute > 0 else 0.0
+        self._clock = clock
+        self._next_request = 0.0
+        self._next_token = 0.0
+
+    def reserve(self, tokens: float = 0) -> float:
+        """
+        Claim the next admission slot for one request using tokens tokens.
+
+        :param tokens: Estimated tokens the request will consume
+        :return: Seconds to wait before sending the request
+        """
+        now = self._clock()
+        start = max(now, self._next_request, self._next_token)
+        self._next_request = start + self._request_spacing
+        self._next_token = start + tokens * self._token_spacing
+        return start - now
+
+    async def acquire(self, tokens: float = 0) -> None:
+        """Wait for the next admission slot for one request using tokens tokens."""
+        delay = self.reserve(tokens)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def next_due(
+    last_refreshed_at: Optional[datetime],
+    interval: timedelta,
+    jitter: float,
+    now: datetime,
+    rng: random.Random,
+) -> datetime:
+    """
+    Return when a product should next be refreshed.
+
+    :param last_refreshed_at: Last refresh time, or None if it was never scraped
+    :param interval: Product refresh interval
+    :param jitter: Fraction of the interval by which the due time is randomly moved either way
+    :param now: Current time; never-scraped products are due now
+    :param rng: Random source for the jitter
+    :return: Next due time (may be in the past for overdue products)
+    """
+    if last_refreshed_at is None:
+        return now
+    return last_refreshed_at + interval * (1 + rng.uniform(-jitter, jitter))
+
+
+def failure_delay(failures: int, interval: timedelta) -> timedelta:
+    """
+    Return how long to wait before retrying a product after consecutive failed refreshes.
+
+    :param failures: Consecutive failures so far (at least 1)
+    :param interval: Product refresh interval, which caps the delay
+    :return: FAILURE_BACKOFF doubled per earlier failure, at most interval
+    """
+    # clamp the exponent: timedelta overflows long before a failure streak ends
+    return min(FAILURE_BACKOFF * (1 << min(failures - 1, 20)), interval)
+
+
+class ScheduledProduct:
+    """Scheduling state of one product."""
+
+    def __init__(self, product_id: int, prompt: str, interval: timedelta) -> None:
+        self.product_id = product_id
+        self.prompt = prompt
+        self.interval = interval
+        self.due_at = datetime.min.replace(tzinfo=timezone.utc)
+        self.failures = 0
+        self.running = False
+
+
+class RefreshScheduler:
+    """
+    Re-scrape products as they fall due, within the configured request and token budgets.
+
+    :param session_maker: Session factory used to read schedules and store runs
+    :param default_interval: Interval for products without their own refresh_interval_minutes
+    :param pacer: Admission pacer enforcing the request and token budgets
+    :param tokens_per_request: Tokens charged to the pacer per model call
+    :param max_concurrency: Model calls allowed in flight at once
+    :param jitter: Fraction of each interval to randomize due times by
+    :param reload_seconds: How often to re-read products and intervals from the database
+    :param fetch: Coroutine returning the parsed items (defaults to the OpenAI client)
+    :param rng: Random source for jitter
+    :param cache: Response cache that refreshed answers are written to; scheduled refreshes
+        always call the model, but other callers can then reuse the fresh answer
+    """
+
+    def __init__(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        default_interval: timedelta = timedelta(hours=6),
+        pacer: Optional[RatePacer] = None,
+        tokens_per_request: float = 0,
+        max_concurrency: int = 8,
+        jitter: float = 0.1,
+        reload_seconds: float = 60.0,
+        fetch: Fetcher = fetch_shopping_items,
+        rng: Optional[random.Random] = None,
+        cache: Optional[LLMResponseCache] = None,
+    ) -> None:
+        self.session_maker = session_maker
+        self.default_interval = default_interval
+        self.pacer = pacer or RatePacer(0)
+        self.tokens_per_request = tokens_per_request
+        self.jitter = jitter
+        self.reload_seconds = reload_seconds
+        self.fetch = fetch
+        self.rng = rng or random.Random()
+        self.cache = cache
+        self.products: Dict[int, ScheduledProduct] = {}
+        self.refreshed = 0
+        self.failed = 0
+        self._heap: List[Tuple[datetime, int]] = []
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._wakeup = asyncio.Event()
+
+    @classmethod
+    def from_env(cls, session_maker: async_sessionmaker[AsyncSession]) -> 'RefreshScheduler':
+        """Build a scheduler configured by the SCHEDULER_* environment variables."""
+        return cls(
+            session_maker,
+            default_interval=timedelta(
+                minutes=float(os.getenv('SCHEDULER_DEFAULT_INTERVAL_MINUTES', '360'))
+            ),
+            pacer=RatePacer(
+                float(os.getenv('SCHEDULER_RPM', '60')), float(os.getenv('SCHEDULER_TPM', '0'))
+            ),
+            tokens_per_request=float(os.getenv('SCHEDULER_TOKENS_PER_REQUEST', '1500')),
+            max_concurrency=int(os.getenv('SCHEDULER_MAX_CONCURRENCY', '8')),
+            jitter=float(os.getenv('SCHEDULER_JITTER', '0.1')),
+            reload_seconds=float(os.getenv('SCHEDULER_RELOAD_SECONDS', '60')),
+            cache=LLMResponseCache.from_env(session_maker),
+        )
+
+    def _push(self, entry: ScheduledProduct, due_at: datetime) -> None:
+        entry.due_at = due_at
+        heapq.heappush(self._heap, (due_at, entry.product_id))
+        self._wakeup.set()
+
+    async def reload(self, now: Optional[datetime] = None) -> None:
+        """
+        Sync the heap with the products table.
+
+        New products are scheduled from their last refresh, products whose interval changed are
+        rescheduled, and products that were deleted or disabled are dropped. Heap entries that no
+        longer match a product's due time are skipped lazily when popped.
+        """
+        now = now or datetime.now(timezone.utc)
+        async with self.session_maker() as db:
+            rows = await crud.get_refresh_schedule(db)
+        seen = set()
+        for pid, prompt, minutes, last_refreshed_at in rows:
+            seen.add(pid)
+            interval = timedelta(minutes=minutes) if minutes else self.default_interval
+            entry = self.products.get(pid)
+            if entry is None:
+                entry = self.products[pid] = ScheduledProduct(pid, prompt, interval)
+            elif entry.interval == interval:
+                entry.prompt = prompt
+                continue
+            entry.prompt, entry.interval = prompt, interval
+            if not entry.running:
+                self._push(entry, next_due(last_refreshed_at, interval, self.jitter, now, self.rng))
+        for pid in set(self.products) - seen:
+            del self.products[pid]
+
+    def pop_due(self, now: datetime) -> Tuple[Optional[ScheduledProduct], Optional[datetime]]:
+        """
+        Pop the next product whose due time has passed.
+
+        :param now: Current time
+        :return: (product, None) if one is due, else (None, earliest future due time or None)
+        """
+        while self._heap:
+            due_at, pid = self._heap[0]
+            entry = self.products.get(pid)
+            if entry is None or entry.running or entry.due_at != due_at:
+                heapq.heappop(self._heap)  # stale: deleted, rescheduled or already running
+                continue
+            if due_at > now:
+                return None, due_at
+            heapq.heappop(self._heap)
+            return entry, None
+        return None, None
+
+    async def _refresh(self, entry: ScheduledProduct) -> None:
+        try:
+            fetched = await fetch_run(
+                entry.prompt, fetch=self.fetch, cache=self.cache, bypass_cache=True
+            )
+            async with self.session_maker() as db:
+                run, snapshots = await save_run(db, entry.product_id, fetched)
+        except Exception as e:
+            entry.failures += 1
+            self.failed += 1
+            delay = failure_delay(entry.failures, entry.interval)
+            logger.warning(
+                'Refresh of product %s failed (%s); retrying in %s', entry.product_id, e, delay
+            )
+        else:
+            entry.failures = 0
+            self.refreshed += 1
+            delay = entry.interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+            logger.info(
+                'Refreshed product %s: run %s, %s items in %s ms',
+                entry.product_id,
+                run.id,
+                len(snapshots),
+                run.duration_ms,
+            )
+        finally:
+            entry.running = False
+            self._slots.release()
+        if entry.product_id in self.products:
+            self._push(entry, datetime.now(timezone.utc) + delay)
+
+    async def _dispatch(self, entry: ScheduledProduct) -> None:
+        """Start a refresh once a concurrency slot and a pacer slot are available."""
+        entry.running = True
+        await self._slots.acquire()
+        await self.pacer.acquire(self.tokens_per_request)
+        task = asyncio.create_task(self._refresh(entry))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def run(self, stop: asyncio.Event, once: bool = False) -> None:
+        """
+        Dispatch due refreshes until stop is set, then wait for in-flight refreshes.
+
+        :param stop: Event that ends the loop
+        :param once: Refresh every product due at startup once, then return
+        """
+        next_reload = 0.0
+        while not stop.is_set():
+            if time.monotonic() >= next_reload:
+                await self.reload()
+                next_reload = float('inf') if once else time.monotonic() + self.reload_seconds
+                loaded_at = datetime.now(timezone.utc)
+            entry, wake_at = self.pop_due(loaded_at if once else datetime.now(timezone.utc))
+            if entry is not None:
+                await self._dispatch(entry)
+                continue
+            if once:
+                break
+            timeout = next_reload - time.monotonic()
+            if wake_at is not None:
+                timeout = min(timeout, (wake_at - datetime.now(timezone.utc)).total_seconds())
+            self._wakeup.clear()
+            waiters = [asyncio.ensure_future(e.wait()) for e in (stop, self._wakeup)]
+            await asyncio.wait(
+                waiters, timeout=max(timeout, 0), return_when=asyncio.FIRST_COMPLETED
+            )
+            for waiter in waiters:
+                waiter.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+async def main(once: bool) -> None:
+    """Run the scheduler until SIGINT/SIGTERM (or, with once, until nothing is overdue)."""
+    from app.db import AsyncSessionLocal, init_models
+
+    await init_models()
+    scheduler = RefreshScheduler.from_env(AsyncSessionLocal)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await scheduler.run(stop, once=once)
+    print(f'Refreshed {scheduler.refreshed} products, {scheduler.failed} failures')
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the scheduler."""
+    parser = argparse.ArgumentParser(description='Re-scrape products as their refresh falls due')
+    parser.add_argument(
+        '--once', action='store_true', help='Refresh every overdue product once, then exit'
+    )
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    asyncio.run(main(args.once))
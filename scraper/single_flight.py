@@ -0,0 +1,123 @@
+"""
+Single-flight coalescing of identical in-flight model requests.
+
+When several callers ask for the same key at once (duplicate POST /products, the scheduler and
+a user refreshing the same product, a batch listing a prompt twice), only the first starts the
+upstream request. The others join its flight: streaming callers replay the items produced so
+far and then follow along, buffered callers wait for the complete list. Every caller gets the
+same items or the same error. A flight ends when its producer does; later callers start a new
+one, so results are never served after the fact (that is the response cache's job).
+
+The producer runs in its own task, so a caller that is cancelled or stops iterating early does
+not cancel the request for the others.
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, Generic, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class Flight(Generic[T]):
+    """One in-flight producer and the items it has yielded so far."""
+
+    def __init__(self) -> None:
+        self.items: List[T] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # Whatever the SingleFlight's capture hook returned in the producer's context
+        self.meta: Any = None
+        self._changed = asyncio.Event()
+        self.task: Optional['asyncio.Task[None]'] = None
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterator[T]:
+        """
+        Yield every item of the flight, from the first, as the producer yields them.
+
+        :raises BaseException: The producer's error, once the items before it were yielded
+        """
+        i = 0
+        while True:
+            while i < len(self.items):
+                yield self.items[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    async def result(self) -> List[T]:
+        """Wait for the producer to finish and return all its items."""
+        while not self.done:
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+        return list(self.items)
+
+
+class SingleFlight(Generic[T]):
+    """
+    Registry of in-flight producers keyed by request.
+
+    :param capture: Called in the producer's context after it finishes (e.g. to read token
+        usage recorded in a ContextVar); the value is stored as Flight.meta
+    """
+
+    def __init__(self, capture: Optional[Callable[[], Any]] = None) -> None:
+        self.capture = capture
+        self._flights: Dict[str, Flight[T]] = {}
+        self.calls = 0
+        self.flights = 0
+        self.coalesced = 0
+
+    def join(self, key: str, source: Callable[[], AsyncIterator[T]]) -> Flight[T]:
+        """
+        Return the in-flight request for key, starting source() if there is none.
+
+        :param key: Request identity (e.g. the normalized prompt)
+        :param source: Zero-argument callable returning the async iterator that makes the request
+        :return: The shared Flight; iterate Flight.follow() or await Flight.result()
+        """
+        self.calls += 1
+        flight = self._flights.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            return flight
+        self.flights += 1
+        flight = Flight()
+        self._flights[key] = flight
+        flight.task = asyncio.create_task(self._produce(key, flight, source))
+        return flight
+
+    async def _produce(
+        self, key: str, flight: Flight[T], source: Callable[[], AsyncIterator[T]]
+    ) -> None:
+        try:
+            async for item in source():
+                flight.items.append(item)
+                flight._notify()
+        except BaseException as e:
+            flight.error = e
+            if not isinstance(e, Exception):
+                raise
+        finally:
+            if self.capture is not None:
+                flight.meta = self.capture()
+            del self._flights[key]
+            flight.done = True
+            flight._notify()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request, upstream flight and coalesced-call counters."""
+        return {
+            'calls': self.calls,
+            'flights': self.flights,
+            'coalesced': self.coalesced,
+            'in_flight': len(self._flights),
+            'coalesced_rate': self.coalesced / self.calls if self.calls else 0.0,
+        }
@@ -0,0 +1,96 @@
+"""
+Benchmark the model-validating vs fast JSON path of the history endpoint.
+
+Seeds one product with N snapshots in a throwaway SQLite database, then requests
+GET /products/{id}/history through the ASGI app with FAST_JSON off and on. The read cache
+is disabled so every request pays the query and the serialization.
+
+Usage:
+    python -m scripts.bench_serialization --rows 5000 --runs 20
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import AsyncGenerator
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+import app.main as app_main
+from app import crud
+from app.models import Base
+from app.schemas import ProductCreate, SnapshotCreate
+
+
+async def run(rows: int, runs: int) -> None:
+    """Seed the database and time both serialization paths."""
+    engine = create_async_engine('sqlite+aiosqlite:///:memory:', poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with maker() as db:
+        product = await crud.create_product(db, ProductCreate(name='__bench__', prompt=None))
+        now = datetime.now(timezone.utc)
+        await crud.create_snapshots_bulk(
+            db,
+            [
+                SnapshotCreate(
+                    product_id=product.id,
+                    title=f'bench item {i % 50}',
+                    price=Decimal('19.99') + i % 7,
+                    urls=[f'https://example.com/item/{i % 50}', 'https://example.com/cart'],
+                    captured_at=now - timedelta(minutes=i),
+                )
+                for i in range(rows)
+            ],
+        )
+
+    async def _session() -> AsyncGenerator[AsyncSession, None]:
+        async with maker() as session:
+            yield session
+
+    app_main.app.dependency_overrides[app_main.get_read_db] = _session
+    app_main.read_cache.enabled = False
+    transport = httpx.ASGITransport(app=app_main.app)
+    url = f'/products/{product.id}/history'
+    print(f'{rows} snapshots per response, {runs} requests per path')
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        bodies = {}
+        for label, fast in (('response_model', False), ('fast JSON', True)):
+            app_main.FAST_JSON = fast
+            await client.get(url, params={'days': 365})  # warm up
+            start = time.perf_counter()
+            for _ in range(runs):
+                resp = await client.get(url, params={'days': 365})
+            elapsed = time.perf_counter() - start
+            bodies[label] = resp.json()
+            print(
+                f'{label:>16}: {elapsed / runs * 1000:8.1f} ms/request  '
+                f'{rows * runs / elapsed:10.0f} rows/s'
+            )
+        assert bodies['response_model'] == bodies['fast JSON'], 'paths returned different bodies'
+    app_main.app.dependency_overrides.clear()
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark history serialization paths')
+    parser.add_argument('--rows', type=int, default=5000, help='Snapshots in the history')
+    parser.add_argument('--runs', type=int, default=20, help='Requests per path')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Entry point for the script."""
+    args = parse_args()
+    asyncio.run(run(args.rows, args.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark per-row vs bulk snapshot ingestion.
+
+Stores the same batches of snapshots once through a create_snapshot loop and once
+through create_snapshots_bulk, and reports throughput plus the number of statements
+and commits each approach issued.
+
+Usage:
+    python -m scripts.bench_snapshot_insert --rows 20 --runs 50
+    python -m scripts.bench_snapshot_insert --url sqlite+aiosqlite:///bench.db
+"""
+
+import argparse
+import asyncio
+import time
+from decimal import Decimal
+from typing import Awaitable, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import crud
+from app.models import Base
+from app.schemas import ProductCreate, SnapshotCreate
+
+
+async def _per_row(db: AsyncSession, snapshots: List[SnapshotCreate]) -> None:
+    for snap in snapshots:
+        await crud.create_snapshot(db, snap)
+
+
+async def _bulk(db: AsyncSession, snapshots: List[SnapshotCreate]) -> None:
+    await crud.create_snapshots_bulk(db, snapshots)
+
+
+async def run(url: str | None, rows: int, runs: int) -> None:
+    """Time both ingestion strategies against the given database."""
+    if url:
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+    else:
+        from app.db import engine
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+
+    counters = {'statements': 0, 'commits': 0}
+
+    def _on_execute(*_: object) -> None:
+        counters['statements'] += 1
+
+    def _on_commit(*_: object) -> None:
+        counters['commits'] += 1
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', _on_execute)
+    event.listen(engine.sync_engine, 'commit', _on_commit)
+
+    async with maker() as db:
+        product = await crud.create_product(db, ProductCreate(name='__bench__', prompt=None))
+        batch = [
+            SnapshotCreate(
+                product_id=product.id,
+                title=f'bench item {i}',
+                price=Decimal('19.99'),
+                urls=[f'https://example.com/item/{i}'],
+            )
+            for i in range(rows)
+        ]
+
+        strategies: List[tuple[str, Callable[..., Awaitable[None]]]] = [
+            ('create_snapshot loop', _per_row),
+            ('create_snapshots_bulk', _bulk),
+        ]
+        print(f'{rows} snapshots per batch, {runs} batches')
+        for label, strategy in strategies:
+            counters.update(statements=0, commits=0)
+            start = time.perf_counter()
+            for _ in range(runs):
+                await strategy(db, batch)
+            elapsed = time.perf_counter() - start
+            print(
+                f'{label:>24}: {rows * runs / elapsed:10.0f} rows/s  '
+                f'{counters["statements"] / runs:5.1f} statements/batch  '
+                f'{counters["commits"] / runs:5.1f} commits/batch'
+            )
+
+        await crud.delete_products(db, [product.id])
+    await engine.dispose()
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for the benchmark."""
+    parser = argparse.ArgumentParser(description='Benchmark per-row vs bulk snapshot inserts')
+    parser.add_argument('--url', help='Database URL (defaults to the configured Postgres)')
+    parser.add_argument('--rows', type=int, default=20, help='Snapshots per batch')
+    parser.add_argument('--runs', type=int, default=50, help='Number of batches per strategy')
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Entry point for the script."""
+    args = parse_args()
+    asyncio.run(run(args.url, args.rows, args.runs))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,7 +14,7 @@ from faker import Faker
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from app.crud import create_snapshot
+from app.crud import create_snapshots_bulk
 from app.db import AsyncSessionLocal
 from app.models import Product
 from app.schemas import SnapshotCreate
@@ -43,6 +43,7 @@ async def seed_fake_history() -> None:
             base_price = float(latest.price or 0)
 
             # Generate a snapshot for each of the past 30 days
+            snapshots_in = []
             for days_ago in range(1, 31):
                 # Compute a random timestamp within the target day
                 target_day = datetime.now(timezone.utc) - timedelta(days=days_ago)
@@ -58,15 +59,19 @@ async def seed_fake_history() -> None:
                 price_float = round(base_price * random.uniform(0.9, 1.1), 2)
                 price = Decimal(price_float).quantize(Decimal('0.01'))
 
-                # Create and insert the fake snapshot
-                snapshot_in = SnapshotCreate(
-                    product_id=product.id,
-                    title=product.name,
-                    price=price,
-                    urls=latest.urls,
-                    captured_at=captured_at,
+                # Queue the fake snapshot for this product's batch insert
+                snapshots_in.append(
+                    SnapshotCreate(
+                        product_id=product.id,
+                        title=product.name,
+                        price=price,
+                        urls=latest.urls,
+                        captured_at=captured_at,
+                    )
                 )
-                await create_snapshot(db, snapshot_in)
+
+            # Insert the product's 30 snapshots in a single round-trip
+            await create_snapshots_bulk(db, snapshots_in)
 
     print('✅ Seeded 30 days of fake price history for each product.')
 
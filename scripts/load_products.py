@@ -11,7 +11,7 @@ import re
 from decimal import Decimal
 from pathlib import Path
 
-from app.crud import create_product, create_snapshot
+from app.crud import create_product, create_snapshots_bulk
 from app.db import AsyncSessionLocal
 from app.schemas import ProductCreate, SnapshotCreate
 
@@ -29,6 +29,7 @@ async def load_products() -> None:
     upsert each product, and create an initial price snapshot.
     """
     async with AsyncSessionLocal() as db:
+        snapshots_in = []
         # Open the CSV file and read row by row
         with open(CSV_FILE, newline='', encoding='utf-8') as csvfile:
             reader = csv.DictReader(csvfile)
@@ -61,13 +62,17 @@ async def load_products() -> None:
                 if link:
                     urls.append(link.strip())
 
-                snapshot_in = SnapshotCreate(
-                    product_id=product.id,
-                    title=name,
-                    price=price_usd,
-                    urls=urls,
+                snapshots_in.append(
+                    SnapshotCreate(
+                        product_id=product.id,
+                        title=name,
+                        price=price_usd,
+                        urls=urls,
+                    )
                 )
-                await create_snapshot(db, snapshot_in)
+
+        # Insert all initial snapshots in a single round-trip
+        await create_snapshots_bulk(db, snapshots_in)
 
     print('✅ Loaded products and created initial snapshots.')
 
@@ -0,0 +1,60 @@
+"""
+Maintain the monthly partitions of the snapshots table (Postgres only).
+
+Pre-creates partitions for the coming months so inserts never fall into the DEFAULT
+partition, and detaches partitions older than the retention window. Detached tables are
+left in place for archiving unless --drop is given. Either way the expired snapshots' URL
+links leave snapshot_urls (archived next to a kept table), and the price summary table is
+rebuilt because its counts and min/max may point at snapshots that no longer exist.
+Meant to run daily from cron or a scheduler; every step is idempotent.
+"""
+
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from app.crud import rebuild_price_stats
+from app.db import AsyncSessionLocal, engine
+from app.partitions import ensure_partitions, expire_partitions
+
+
+async def run(ahead: int, retain_months: int, drop: bool) -> None:
+    """Create upcoming partitions and expire old ones in a single transaction."""
+    today = datetime.now(timezone.utc).date()
+    async with engine.begin() as conn:
+        created = await ensure_partitions(conn, today, ahead)
+        expired = (
+            await expire_partitions(conn, today, retain_months, drop=drop) if retain_months else []
+        )
+    for name in created:
+        print(f'✅ Created partition {name}')
+    for name in expired:
+        print(f'🗑️ {"Dropped" if drop else "Detached"} partition {name}')
+    if expired:
+        async with AsyncSessionLocal() as db:
+            count = await rebuild_price_stats(db)
+        print(f'✅ Rebuilt price stats for {count} products.')
+    await engine.dispose()
+
+
+def main() -> None:
+    """Entry point for the script."""
+    parser = argparse.ArgumentParser(description='Maintain monthly snapshot partitions')
+    parser.add_argument(
+        '--ahead', type=int, default=3, help='Future months to pre-create (default: 3)'
+    )
+    parser.add_argument(
+        '--retain-months',
+        type=int,
+        default=0,
+        help='Months of history to keep, including the current one (default: 0 = keep all)',
+    )
+    parser.add_argument(
+        '--drop', action='store_true', help='Drop expired partitions after detaching'
+    )
+    args = parser.parse_args()
+    asyncio.run(run(args.ahead, args.retain_months, args.drop))
+
+
+if __name__ == '__main__':
+    main()
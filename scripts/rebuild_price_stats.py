@@ -0,0 +1,51 @@
+"""
+Rebuild or verify the product_price_stats summary table.
+
+Recomputes every product's latest/min/max price and snapshot count from the snapshots
+table. With --check, only reports products whose stored summary differs from the
+recomputed one and exits non-zero if any do.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from app.crud import compute_price_stats, get_price_stats, rebuild_price_stats
+from app.db import AsyncSessionLocal
+
+
+async def check() -> int:
+    """Compare stored summaries against a fresh recomputation; return the mismatch count."""
+    async with AsyncSessionLocal() as db:
+        expected = await compute_price_stats(db)
+        stored = await get_price_stats(db)
+
+    mismatches = 0
+    for product_id in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(product_id), stored.get(product_id)
+        if want != have:
+            mismatches += 1
+            print(f'❌ product {product_id}: stored={have} expected={want}')
+    print(f'Checked {len(expected)} products, {mismatches} mismatched.')
+    return mismatches
+
+
+async def rebuild() -> None:
+    """Recompute the whole table from scratch."""
+    async with AsyncSessionLocal() as db:
+        count = await rebuild_price_stats(db)
+    print(f'✅ Rebuilt price stats for {count} products.')
+
+
+def main() -> None:
+    """Entry point for the script."""
+    parser = argparse.ArgumentParser(description='Rebuild or verify product_price_stats')
+    parser.add_argument('--check', action='store_true', help='Only report mismatches, do not write')
+    args = parser.parse_args()
+    if args.check:
+        sys.exit(1 if asyncio.run(check()) else 0)
+    asyncio.run(rebuild())
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,7 @@ from sqlalchemy.pool import StaticPool
 import app.db as app_db
 from app.main import app as fastapi_app
 from app.models import Base
+from app.urls import url_cache
 
 
 @pytest.fixture
@@ -26,6 +27,8 @@ async def engine():
     )
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+    # URL ids are per database, so ids interned by a previous test must not be reused
+    url_cache.clear()
     yield engine
     await engine.dispose()
 
@@ -46,8 +49,9 @@ def override_db(monkeypatch, db_session):
     """
     Override the database dependency and session maker to use the test DB.
     """
-    # Patch AsyncSessionLocal to return our test session
+    # Patch the primary and read-replica session makers to return our test session
     monkeypatch.setattr(app_db, 'AsyncSessionLocal', lambda: db_session)
+    monkeypatch.setattr(app_db, 'AsyncReadSessionLocal', lambda: db_session)
     # Override FastAPI dependency
     import app.main as app_main
 
@@ -55,6 +59,9 @@ def override_db(monkeypatch, db_session):
         yield db_session
 
     app_main.app.dependency_overrides[app_main.get_db] = _get_test_db
+    app_main.app.dependency_overrides[app_main.get_read_db] = _get_test_db
+    # Product ids repeat across per-test databases, so never serve results cached by another test
+    app_main.read_cache.clear()
 
 
 @pytest.fixture
@@ -23,13 +23,21 @@ async def test_product_lifecycle(client, monkeypatch, override_db):
     import app.main as main_mod
 
     monkeypatch.setattr(main_mod, 'fetch_shopping_items', fake_fetch)
+    monkeypatch.setattr(main_mod, 'STREAM_SCRAPES', False)
 
-    # Create a product
+    # Create a product; the initial scrape runs as a background job
     payload = {'name': 'Prod', 'prompt': 'qry'}
     r1 = await client.post('/products', json=payload)
-    assert r1.status_code == 200
+    assert r1.status_code == 202
     created = r1.json()
     pid = created['id']
+    assert r1.headers['location'] == f'/jobs/{created["job_id"]}'
+
+    await main_mod.scrape_jobs.wait(created['job_id'], timeout=5)
+    job = (await client.get(f'/jobs/{created["job_id"]}')).json()
+    assert job['status'] == 'succeeded' and job['product_id'] == pid
+    assert job['item_count'] == 2 and job['run_id'] is not None
+    assert (await client.get('/jobs/unknown')).status_code == 404
 
     # List products
     r2 = await client.get('/products')
@@ -44,14 +52,317 @@ async def test_product_lifecycle(client, monkeypatch, override_db):
     r4 = await client.get(f'/products/{pid}/latest')
     assert r4.status_code == 200
     latest = r4.json()
-    assert isinstance(latest, list)
+    assert [snap['title'] for snap in latest] == ['A', 'B']
 
     # History (default 7 days)
     r5 = await client.get(f'/products/{pid}/history')
     assert r5.status_code == 200
 
     # Best price (should pick price=10)
-    r6 = await client.get(f'/products/{pid}/best')
+    r6 = await client.get(f'/products/{pid}/best_price')
     assert r6.status_code == 200
     # JSON serializes Decimal as string, so compare numerically
     assert float(r6.json()['price']) == 10.0
+
+
+@pytest.mark.asyncio
+async def test_products_page_keyset_pagination(client, db_session, override_db):
+    from app import crud, schemas
+
+    for i in range(5):
+        prod = await crud.create_product(
+            db_session, schemas.ProductCreate(name=f'Widget {i}', prompt=f'widget-{i}')
+        )
+    await crud.create_snapshot(
+        db_session, schemas.SnapshotCreate(product_id=prod.id, title='w', price=12.5)
+    )
+
+    r1 = await client.get('/products/page', params={'limit': 2, 'fields': 'name'})
+    assert r1.status_code == 200
+    page1 = r1.json()
+    assert [set(item) for item in page1['items']] == [{'id', 'name'}, {'id', 'name'}]
+    assert page1['next_cursor'] == page1['items'][-1]['id']
+
+    r2 = await client.get('/products/page', params={'limit': 3, 'after': page1['next_cursor']})
+    page2 = r2.json()
+    assert len(page2['items']) == 3
+    assert page2['next_cursor'] is None
+    assert 'snapshots' not in page2['items'][0]
+
+    r3 = await client.get('/products/page', params={'name': 'WIDGET 4', 'summary': True})
+    (item,) = r3.json()['items']
+    assert item['id'] == prod.id
+    assert item['snapshot_count'] == 1
+    assert float(item['latest_price']) == 12.5
+
+    r4 = await client.get('/products/page', params={'fields': 'name,snapshots'})
+    assert r4.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_create_snapshots_batch(client, db_session, override_db):
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='B', prompt='b'))
+    payload = [
+        {'product_id': prod.id, 'title': 'x', 'price': 5, 'urls': ['u']},
+        {'product_id': prod.id, 'title': 'y', 'price': None},
+    ]
+    r1 = await client.post('/snapshots/batch', json=payload)
+    assert r1.status_code == 200
+    assert [s['title'] for s in r1.json()] == ['x', 'y']
+
+    r2 = await client.post(
+        '/snapshots/batch', json=payload + [{'product_id': prod.id + 99, 'title': 'z'}]
+    )
+    assert r2.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_history_stream_ndjson(client, db_session, override_db):
+    import json
+    from datetime import datetime, timedelta, timezone
+
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='S', prompt='s'))
+    now = datetime.now(timezone.utc)
+    await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(
+                product_id=prod.id, title=f't{i}', price=i, captured_at=now - timedelta(hours=i)
+            )
+            for i in range(450)
+        ],
+    )
+
+    r = await client.get(f'/products/{prod.id}/history/stream', params={'days': 30})
+    assert r.status_code == 200
+    assert r.headers['content-type'].startswith('application/x-ndjson')
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert len(rows) == 450
+    assert rows[0]['title'] == 't449' and rows[-1]['title'] == 't0'
+
+
+@pytest.mark.asyncio
+async def test_create_product_streams_items_into_the_run(client, monkeypatch, override_db):
+    import app.main as main_mod
+
+    progress = []
+
+    async def fake_stream(prompt):
+        for title in ('A', 'B', 'C'):
+            yield {'title': title, 'price': 10, 'urls': []}
+            progress.append(title)
+
+    monkeypatch.setattr(main_mod, 'stream_shopping_items', fake_stream)
+    monkeypatch.setattr(main_mod, 'STREAM_SCRAPES', True)
+
+    created = (await client.post('/products', json={'name': 'S', 'prompt': 'streamed'})).json()
+    await main_mod.scrape_jobs.wait(created['job_id'], timeout=5)
+    job = (await client.get(f'/jobs/{created["job_id"]}')).json()
+    assert job['status'] == 'succeeded' and job['stage'] == 'streaming'
+    assert job['item_count'] == 3 and progress == ['A', 'B', 'C']
+
+    latest = (await client.get(f'/products/{created["id"]}/latest')).json()
+    assert [snap['title'] for snap in latest] == ['A', 'B', 'C']
+    runs = (await client.get(f'/products/{created["id"]}/runs')).json()
+    assert runs[0]['item_count'] == 3 and runs[0]['duration_ms'] is not None
+
+
+@pytest.mark.asyncio
+async def test_scrape_job_pins_the_product_as_items_are_stored(client, monkeypatch, override_db):
+    import app.db as app_db
+    import app.main as main_mod
+
+    async def fake_stream(prompt):
+        for title in ('A', 'B'):
+            yield {'title': title, 'price': 10, 'urls': []}
+
+    clock = iter(range(1000))
+    monkeypatch.setattr(main_mod, 'stream_shopping_items', fake_stream)
+    monkeypatch.setattr(main_mod, 'STREAM_SCRAPES', True)
+    monkeypatch.setattr(app_db, 'HAS_REPLICA', True)
+    monkeypatch.setattr(main_mod, '_primary_pins', {})
+    monkeypatch.setattr(main_mod, 'monotonic', lambda: float(next(clock)))
+
+    created = (await client.post('/products', json={'name': 'S', 'prompt': 'pinned'})).json()
+    await main_mod.scrape_jobs.wait(created['job_id'], timeout=5)
+    # pinned once by the 202, then again as each item landed
+    assert main_mod._primary_pins[created['id']] == 2 + app_db.REPLICA_PIN_SECONDS
+
+
+@pytest.mark.asyncio
+async def test_create_product_is_rolled_back_when_the_queue_fills(client, monkeypatch, override_db):
+    import app.main as main_mod
+    from app.jobs import JobQueueFull
+
+    def refuse(*args, **kwargs):
+        raise JobQueueFull('full')
+
+    monkeypatch.setattr(main_mod.scrape_jobs, 'submit', refuse)
+    res = await client.post('/products', json={'name': 'Late', 'prompt': 'late'})
+    assert res.status_code == 503
+    assert all(p['name'] != 'Late' for p in (await client.get('/products')).json())
+
+
+@pytest.mark.asyncio
+async def test_fast_json_matches_model_path(client, db_session, override_db, monkeypatch):
+    from datetime import datetime, timedelta, timezone
+
+    import app.main as main_mod
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='F', prompt='f'))
+    await crud.create_product(db_session, schemas.ProductCreate(name='Empty', prompt=None))
+    now = datetime.now(timezone.utc)
+    await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(
+                product_id=prod.id,
+                title=f't{i % 2}',
+                price=None if i == 3 else 9.5,
+                urls=[f'https://shop/{i % 2}', 'https://shared'],
+                captured_at=now - timedelta(hours=i),
+            )
+            for i in range(6, 0, -1)
+        ],
+        dedupe=True,
+    )
+
+    paths = ('/products', f'/products/{prod.id}', f'/products/{prod.id}/history')
+    slow = [(await client.get(path)).json() for path in paths]
+    monkeypatch.setattr(main_mod, 'FAST_JSON', True)
+    main_mod.read_cache.clear()
+    fast = [await client.get(path) for path in paths]
+    assert [r.json() for r in fast] == slow
+    assert fast[1].headers['etag'] and fast[2].headers['cache-control'] == 'no-cache'
+    assert (await client.get('/products/999999')).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_conditional_get_etag(client, db_session, override_db):
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='E', prompt='e'))
+    await crud.create_snapshot(
+        db_session, schemas.SnapshotCreate(product_id=prod.id, title='x', price=4)
+    )
+
+    for path in ('', '/latest', '/history', '/best_price'):
+        url = f'/products/{prod.id}{path}'
+        r1 = await client.get(url)
+        assert r1.status_code == 200
+        etag = r1.headers['etag']
+        r2 = await client.get(url, headers={'If-None-Match': etag})
+        assert r2.status_code == 304
+        assert r2.content == b''
+        assert r2.headers['etag'] == etag
+
+    old = (await client.get(f'/products/{prod.id}/latest')).headers['etag']
+    await client.post('/snapshot', json={'product_id': prod.id, 'title': 'y', 'price': 3})
+    r3 = await client.get(f'/products/{prod.id}/latest', headers={'If-None-Match': old})
+    assert r3.status_code == 200
+    assert r3.headers['etag'] != old
+
+    # a product that does not exist is never "not modified"
+    missing = prod.id + 1000
+    for path in ('', '/latest', '/best_price'):
+        for tag in ('*', f'"{missing}-0-000000000000"'):
+            r4 = await client.get(f'/products/{missing}{path}', headers={'If-None-Match': tag})
+            assert r4.status_code == 404 and 'etag' not in r4.headers
+
+
+def test_read_routing_pins_recent_writes(monkeypatch):
+    from fastapi import Response
+    from starlette.requests import Request
+
+    import app.db as app_db
+    import app.main as main_mod
+
+    def _request(product_id=None, cookie=None):
+        headers = [(b'cookie', cookie.encode())] if cookie else []
+        scope = {'type': 'http', 'headers': headers, 'path_params': {}}
+        if product_id is not None:
+            scope['path_params'] = {'product_id': product_id}
+        return Request(scope)
+
+    monkeypatch.setattr(app_db, 'HAS_REPLICA', False)
+    assert main_mod._use_primary(_request(1))
+
+    monkeypatch.setattr(app_db, 'HAS_REPLICA', True)
+    monkeypatch.setattr(main_mod, '_primary_pins', {})
+    assert not main_mod._use_primary(_request(1))
+
+    response = Response()
+    main_mod._pin_primary(response, 1)
+    assert 'db_pin=primary' in response.headers['set-cookie']
+    assert main_mod._use_primary(_request(1))
+    assert not main_mod._use_primary(_request(2))
+    assert main_mod._use_primary(_request(2, cookie='db_pin=primary'))
+    assert not main_mod._use_primary(_request('abc'))
+
+    monkeypatch.setattr(main_mod, 'monotonic', lambda: float('inf'))
+    assert not main_mod._use_primary(_request(1))
+
+
+@pytest.mark.asyncio
+async def test_products_dashboard(client, db_session, override_db):
+    from datetime import datetime, timedelta, timezone
+
+    from app import crud, schemas
+
+    now = datetime.now(timezone.utc)
+    a = await crud.create_product(db_session, schemas.ProductCreate(name='A', prompt='a'))
+    b = await crud.create_product(db_session, schemas.ProductCreate(name='B', prompt='b'))
+    snaps = await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(
+                product_id=a.id, title='old-cheap', price=1, captured_at=now - timedelta(days=10)
+            ),
+            schemas.SnapshotCreate(
+                product_id=a.id, title='recent', price=5, captured_at=now - timedelta(days=1)
+            ),
+            schemas.SnapshotCreate(product_id=a.id, title='now', price=7),
+            schemas.SnapshotCreate(product_id=b.id, title='only', price=None),
+        ],
+    )
+
+    r1 = await client.get('/products/dashboard', params={'ids': f'{b.id},{a.id},999'})
+    assert r1.status_code == 200
+    by_id = {item['product_id']: item for item in r1.json()}
+    assert [item['product_id'] for item in r1.json()] == [b.id, a.id, 999]
+    assert by_id[a.id]['latest']['id'] == snaps[2].id
+    assert by_id[a.id]['best']['id'] == snaps[0].id
+    assert by_id[b.id]['latest']['id'] == snaps[3].id and by_id[b.id]['best'] is None
+    assert by_id[999] == {'product_id': 999, 'latest': None, 'best': None}
+
+    start = (now - timedelta(days=3)).date().isoformat()
+    r2 = await client.get('/products/dashboard', params={'ids': str(a.id), 'start_date': start})
+    (item,) = r2.json()
+    assert item['best']['id'] == snaps[1].id
+    assert item['latest']['id'] == snaps[2].id
+
+    assert (await client.get('/products/dashboard', params={'ids': 'x'})).status_code == 422
+    too_many = ','.join(str(i) for i in range(501))
+    assert (await client.get('/products/dashboard', params={'ids': too_many})).status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_update_refresh_interval(client, db_session, override_db):
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='R', prompt='r'))
+    url = f'/products/{prod.id}/refresh_interval'
+    r = await client.put(url, json={'refresh_interval_minutes': 90})
+    assert r.status_code == 200 and r.json() == {'refresh_interval_minutes': 90}
+    assert (await crud.get_refresh_schedule(db_session))[0][2] == 90
+
+    assert (await client.put(url, json={'refresh_interval_minutes': 0})).status_code == 200
+    assert await crud.get_refresh_schedule(db_session) == []
+    assert (await client.put(url, json={'refresh_interval_minutes': -1})).status_code == 422
+    missing = await client.put('/products/999/refresh_interval', json={})
+    assert missing.status_code == 404
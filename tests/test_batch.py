@@ -0,0 +1,211 @@
+import json
+import os
+from email import policy
+from email.parser import BytesParser
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, schemas
+from scraper.batch import BatchRefresh, output_text, parse_result_line
+
+
+class FakeBatchServer:
+    """Stand-in for the OpenAI files and batches endpoints, answering prompts with answer()."""
+
+    def __init__(self, answer, polls_until_done=2):
+        self.answer = answer
+        self.polls_until_done = polls_until_done
+        self.files = {}
+        self.batches = {}
+        self.uploads = 0
+
+    def client(self):
+        return AsyncOpenAI(
+            api_key='sk-test',
+            base_url='http://fake-openai/v1',
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(self.handler)),
+        )
+
+    def _file(self, content, purpose):
+        file_id = f'file-{len(self.files) + 1}'
+        self.files[file_id] = content
+        return {
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': 1700000000,
+            'filename': f'{file_id}.jsonl',
+            'purpose': purpose,
+            'status': 'processed',
+        }
+
+    def _finish(self, batch):
+        outputs, errors = [], []
+        for i, line in enumerate(self.files[batch['input_file_id']].decode().splitlines()):
+            request = json.loads(line)
+            status, text = self.answer(request['body']['input'][1]['content'])
+            if status == 200:
+                message = {'type': 'output_text', 'text': text, 'annotations': []}
+                body = {'output': [{'type': 'message', 'content': [message]}]}
+            else:
+                body = {'error': {'message': text}}
+            record = {
+                'id': f'req-{i}',
+                'custom_id': request['custom_id'],
+                'response': {'status_code': status, 'request_id': f'r{i}', 'body': body},
+                'error': None,
+            }
+            (outputs if status == 200 else errors).append(json.dumps(record) + '\n')
+        batch['status'] = 'completed'
+        if outputs:
+            batch['output_file_id'] = self._file(''.join(outputs).encode(), 'batch_output')['id']
+        if errors:
+            batch['error_file_id'] = self._file(''.join(errors).encode(), 'batch_output')['id']
+
+    def handler(self, request):
+        path = request.url.path.removeprefix('/v1')
+        if request.method == 'POST' and path == '/files':
+            self.uploads += 1
+            header = f'Content-Type: {request.headers["content-type"]}\r\n\r\n'.encode()
+            form = BytesParser(policy=policy.default).parsebytes(header + request.read())
+            upload = next(p for p in form.iter_parts() if p.get_filename())
+            return httpx.Response(200, json=self._file(upload.get_content(), 'batch'))
+        if request.method == 'POST' and path == '/batches':
+            body = json.loads(request.content)
+            batch_id = f'batch-{len(self.batches) + 1}'
+            self.batches[batch_id] = {
+                'id': batch_id,
+                'object': 'batch',
+                'endpoint': body['endpoint'],
+                'input_file_id': body['input_file_id'],
+                'completion_window': body['completion_window'],
+                'status': 'validating',
+                'created_at': 1700000000,
+                'polls': 0,
+            }
+            return httpx.Response(200, json=self.batches[batch_id])
+        if path.startswith('/batches/'):
+            batch = self.batches[path.rsplit('/', 1)[1]]
+            batch['polls'] += 1
+            if batch['status'] != 'completed':
+                batch['status'] = 'in_progress'
+                if batch['polls'] >= self.polls_until_done:
+                    self._finish(batch)
+            return httpx.Response(200, json=batch)
+        if path.startswith('/files/') and path.endswith('/content'):
+            return httpx.Response(200, content=self.files[path.split('/')[2]])
+        return httpx.Response(404, json={'error': {'message': f'no route {path}'}})
+
+
+def _answer(prompt):
+    if prompt == 'broken':
+        return 200, 'Sorry, I cannot help with that.'
+    if prompt == 'overloaded':
+        return 500, 'server error'
+    items = [
+        {'title': f'{prompt} {n}', 'price': 10 * n, 'urls': [f'https://x/{prompt}/{n}']}
+        for n in (1, 2)
+    ]
+    return 200, '```json\n' + json.dumps(items) + '\n```'
+
+
+async def _products(maker, *prompts):
+    async with maker() as db:
+        return [
+            (await crud.create_product(db, schemas.ProductCreate(name=p, prompt=p))).id
+            for p in prompts
+        ]
+
+
+async def _no_sleep(seconds):
+    pass
+
+
+def test_parse_result_line_reports_errors_per_product():
+    ok = {
+        'custom_id': 'product-7',
+        'response': {
+            'status_code': 200,
+            'body': {
+                'output': [{'type': 'message', 'content': [{'type': 'output_text', 'text': '[]'}]}]
+            },
+        },
+    }
+    assert parse_result_line(json.dumps(ok)) == (7, [], None)
+    expired = {'custom_id': 'product-8', 'error': {'code': 'batch_expired', 'message': 'late'}}
+    assert parse_result_line(json.dumps(expired)) == (8, [], 'batch_expired: late')
+    assert output_text({'output': [{'type': 'reasoning'}]}) == ''
+
+
+@pytest.mark.asyncio
+async def test_batch_refresh_submits_polls_and_ingests(engine, tmp_path):
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    ok, broken, overloaded = await _products(maker, 'laptops', 'broken', 'overloaded')
+    server = FakeBatchServer(_answer, polls_until_done=3)
+    state_path = str(tmp_path / 'state.json')
+
+    refresh = BatchRefresh(server.client(), maker, state_path, sleep=_no_sleep)
+    batch = await refresh.run()
+
+    assert batch.status == 'completed' and server.batches[batch.id]['polls'] == 3
+    request_lines = server.files['file-1'].decode().splitlines()
+    assert [json.loads(line)['custom_id'] for line in request_lines] == [
+        f'product-{pid}' for pid in (ok, broken, overloaded)
+    ]
+    assert json.loads(request_lines[0])['url'] == '/v1/responses'
+    assert refresh.state.ingested == [ok]
+    assert set(refresh.state.failed) == {broken, overloaded}
+    assert refresh.state.failed[overloaded] == 'HTTP 500: server error'
+    assert not os.path.exists(state_path)
+
+    async with maker() as db:
+        latest = await crud.get_latest_snapshots(db, ok)
+        assert [s.title for s in latest] == ['laptops 1', 'laptops 2']
+        assert latest[0].urls == ['https://x/laptops/1']
+        runs = await crud.get_scrape_runs(db, ok, limit=5)
+        assert len(runs) == 1 and runs[0].item_count == 2 and runs[0].duration_ms is None
+        assert await crud.get_scrape_runs(db, broken, limit=5) == []
+
+
+@pytest.mark.asyncio
+async def test_batch_refresh_resumes_after_a_crash(engine, tmp_path, monkeypatch):
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    ids = await _products(maker, 'a', 'b', 'c')
+    server = FakeBatchServer(_answer)
+    state_path = str(tmp_path / 'state.json')
+
+    # first invocation: submit without waiting, as a cron job would
+    first = BatchRefresh(server.client(), maker, state_path, sleep=_no_sleep)
+    assert await first.run(wait=False) is None
+    with open(state_path) as f:
+        assert json.load(f)['batch_id'] == 'batch-1'
+
+    # second invocation dies after storing the first chunk
+    store = crud.record_scrape_runs
+    calls = []
+
+    async def crash_on_second_chunk(db, runs, dedupe=True):
+        calls.append(len(runs))
+        if len(calls) == 2:
+            raise ConnectionError('database went away')
+        return await store(db, runs, dedupe=dedupe)
+
+    monkeypatch.setattr(crud, 'record_scrape_runs', crash_on_second_chunk)
+    crashed = BatchRefresh(server.client(), maker, state_path, chunk_size=1, sleep=_no_sleep)
+    with pytest.raises(ConnectionError):
+        await crashed.run()
+    monkeypatch.setattr(crud, 'record_scrape_runs', store)
+
+    # third invocation resumes the same batch and stores only what is missing
+    resumed = BatchRefresh(server.client(), maker, state_path, chunk_size=1, sleep=_no_sleep)
+    assert resumed.state.ingested == [ids[0]]
+    await resumed.run()
+    assert server.uploads == 1 and len(server.batches) == 1
+    assert sorted(resumed.state.ingested) == ids and not os.path.exists(state_path)
+    async with maker() as db:
+        for pid in ids:
+            assert len(await crud.get_scrape_runs(db, pid, limit=5)) == 1
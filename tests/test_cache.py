@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from app.cache import GLOBAL_SCOPE, ReadCache
+
+
+@pytest.mark.asyncio
+async def test_read_cache_hits_and_invalidation():
+    cache = ReadCache(max_entries=10, ttl_seconds=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        return len(calls)
+
+    assert await cache.get_or_load(1, ('latest',), load) == 1
+    assert await cache.get_or_load(1, ('latest',), load) == 1
+    assert await cache.get_or_load(GLOBAL_SCOPE, ('products',), load) == 2
+    assert await cache.get_or_load(2, ('latest',), load) == 3
+
+    cache.invalidate(1)
+    # product 1 and cross-product entries are dropped, product 2 survives
+    assert await cache.get_or_load(1, ('latest',), load) == 4
+    assert await cache.get_or_load(GLOBAL_SCOPE, ('products',), load) == 5
+    assert await cache.get_or_load(2, ('latest',), load) == 3
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['invalidations']) == (2, 5, 1)
+
+
+@pytest.mark.asyncio
+async def test_read_cache_lru_eviction_and_ttl(monkeypatch):
+    cache = ReadCache(max_entries=2, ttl_seconds=5)
+    now = [100.0]
+    monkeypatch.setattr('app.cache.time.monotonic', lambda: now[0])
+
+    async def load_a():
+        return 'a'
+
+    await cache.get_or_load(1, ('a',), load_a)
+    await cache.get_or_load(1, ('b',), load_a)
+    await cache.get_or_load(1, ('a',), load_a)  # refresh 'a' so 'b' is least recent
+    await cache.get_or_load(1, ('c',), load_a)
+    assert cache.stats()['evictions'] == 1
+    assert (1, 'b') not in cache._entries
+
+    now[0] += 6
+    await cache.get_or_load(1, ('a',), load_a)
+    assert cache.stats()['misses'] == 4
+
+
+@pytest.mark.asyncio
+async def test_repeated_polls_skip_db_until_write(client, db_session, override_db, engine):
+    from sqlalchemy import event
+
+    from app import crud, schemas
+
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='C', prompt='c'))
+    await crud.create_snapshot(db_session, schemas.SnapshotCreate(product_id=prod.id, title='x'))
+
+    statements = []
+    event.listen(engine.sync_engine, 'before_cursor_execute', lambda *a: statements.append(a[2]))
+
+    await client.get(f'/products/{prod.id}/latest')
+    first_poll = len(statements)
+    assert first_poll > 0
+    await client.get(f'/products/{prod.id}/latest')
+    assert len(statements) == first_poll
+
+    r = await client.post('/snapshot', json={'product_id': prod.id, 'title': 'y'})
+    assert r.status_code == 200
+    r = await client.get(f'/products/{prod.id}/latest')
+    assert r.json()[0]['title'] == 'y'
+
+
+@pytest.mark.asyncio
+async def test_load_overlapping_an_invalidation_is_not_stored():
+    cache = ReadCache(max_entries=10, ttl_seconds=60)
+    started, release = asyncio.Event(), asyncio.Event()
+    versions = iter(['stale', 'fresh'])
+
+    async def slow_load():
+        value = next(versions)
+        started.set()
+        await release.wait()
+        return value
+
+    async def other():
+        return 'other'
+
+    # the read starts before a write to product 1 and finishes after its invalidation
+    reading = asyncio.create_task(cache.get_or_load(1, ('latest',), slow_load))
+    await started.wait()
+    cache.invalidate(1)
+    release.set()
+    assert await reading == 'stale'  # the caller still gets what it read
+    assert await cache.get_or_load(1, ('latest',), slow_load) == 'fresh'
+    assert await cache.get_or_load(1, ('latest',), slow_load) == 'fresh'
+
+    # a load for another product overlapping the write is still cached
+    release.clear()
+    started.clear()
+    versions = iter(['two'])
+    reading = asyncio.create_task(cache.get_or_load(2, ('latest',), slow_load))
+    await started.wait()
+    cache.invalidate(1)
+    release.set()
+    assert await reading == 'two'
+    assert await cache.get_or_load(2, ('latest',), other) == 'two'
+
+    # clear() also discards loads that were in flight
+    started.clear()
+    release.clear()
+    versions = iter(['before clear'])
+    reading = asyncio.create_task(cache.get_or_load(3, ('latest',), slow_load))
+    await started.wait()
+    cache.clear()
+    release.set()
+    await reading
+    assert await cache.get_or_load(3, ('latest',), other) == 'other'
@@ -1,8 +1,11 @@
 from datetime import datetime, timedelta, timezone
 
 import pytest
+from sqlalchemy import delete, func, select
 
 from app import crud, schemas
+from app.models import Snapshot, SnapshotUrl, Url
+from app.urls import url_cache
 
 
 @pytest.mark.asyncio
@@ -62,3 +65,270 @@ async def test_crud_product_and_snapshot(db_session, override_db):
     # Best price (lowest) should pick the older, lower-priced snapshot
     best = await crud.get_lowest_price_period(db_session, prod.id)
     assert best.id == res2.id
+
+
+@pytest.mark.asyncio
+async def test_create_snapshots_bulk_preserves_order(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='Bulk', prompt='bulk'))
+    old_time = datetime.now(timezone.utc) - timedelta(days=3)
+    snaps_in = [
+        schemas.SnapshotCreate(product_id=prod.id, title='a', price=3, urls=['u1', 'u2']),
+        schemas.SnapshotCreate(product_id=prod.id, title='b', captured_at=old_time),
+        schemas.SnapshotCreate(product_id=prod.id, title='c', price=1.5),
+    ]
+    created = await crud.create_snapshots_bulk(db_session, snaps_in)
+    assert [s.title for s in created] == ['a', 'b', 'c']
+    assert created[0].urls == ['u1', 'u2']
+    assert created[1].price is None
+    assert created[1].captured_at.replace(tzinfo=timezone.utc) == old_time
+    assert len({s.id for s in created}) == 3
+
+    history = await crud.get_snapshot_history(db_session, prod.id, days=7)
+    assert {s.id for s in history} == {s.id for s in created}
+    assert await crud.create_snapshots_bulk(db_session, []) == []
+
+
+@pytest.mark.asyncio
+async def test_price_buckets_ohlc(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='O', prompt='ohlc'))
+    midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    day1 = midnight - timedelta(days=3)
+    day2 = midnight - timedelta(days=2)
+    points = [
+        (day1 + timedelta(hours=1), 10),
+        (day1 + timedelta(hours=5), 7),
+        (day1 + timedelta(hours=9), 12),
+        (day1 + timedelta(hours=10), None),
+        (day2 + timedelta(hours=3), 9),
+    ]
+    await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(product_id=prod.id, title='t', price=price, captured_at=at)
+            for at, price in points
+        ],
+    )
+
+    buckets = await crud.get_price_buckets(db_session, prod.id, days=7, bucket='day')
+    assert len(buckets) == 2
+    first, second = buckets
+    assert first.bucket_start.date() == day1.date()
+    assert (first.open, first.high, first.low, first.close, first.count) == (10, 12, 7, 12, 3)
+    assert (second.open, second.close, second.count) == (9, 9, 1)
+
+    hourly = await crud.get_price_buckets(db_session, prod.id, days=7, bucket='hour')
+    assert len(hourly) == 4
+    capped = await crud.get_price_buckets(db_session, prod.id, days=7, bucket='hour', max_points=3)
+    assert len(capped) == 3
+    assert capped[0] == hourly[0] and capped[-1] == hourly[-1]
+
+
+@pytest.mark.asyncio
+async def test_price_stats_maintained_incrementally(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='S', prompt='stats'))
+    now = datetime.now(timezone.utc)
+    first = await crud.create_snapshot(
+        db_session, schemas.SnapshotCreate(product_id=prod.id, title='a', price=5)
+    )
+    batch = await crud.create_snapshots_bulk(
+        db_session,
+        [
+            # backfilled older capture must not become "latest"
+            schemas.SnapshotCreate(
+                product_id=prod.id, title='b', price=3, captured_at=now - timedelta(days=5)
+            ),
+            schemas.SnapshotCreate(
+                product_id=prod.id, title='c', price=3, captured_at=now - timedelta(days=1)
+            ),
+            schemas.SnapshotCreate(product_id=prod.id, title='d', price=None),
+            schemas.SnapshotCreate(
+                product_id=prod.id, title='e', price=9, captured_at=now - timedelta(days=2)
+            ),
+        ],
+    )
+    stats = (await crud.get_price_stats(db_session))[prod.id]
+    assert stats['snapshot_count'] == 5
+    # ties on the lowest price resolve to the most recent capture
+    assert stats['min_snapshot_id'] == batch[1].id
+    assert stats['max_snapshot_id'] == batch[3].id
+    assert stats['latest_snapshot_id'] in {first.id, batch[2].id}
+
+    best = await crud.get_lowest_price_period(db_session, prod.id, None, now + timedelta(hours=1))
+    assert best.id == batch[1].id
+    latest = await crud.get_latest_snapshots(db_session, prod.id)
+    assert latest[0].id == stats['latest_snapshot_id']
+
+    assert await crud.compute_price_stats(db_session) == await crud.get_price_stats(db_session)
+    assert await crud.rebuild_price_stats(db_session) == 1
+    assert (await crud.get_price_stats(db_session))[prod.id] == stats
+
+
+@pytest.mark.asyncio
+async def test_dedupe_extends_unchanged_snapshots(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='D', prompt='dedupe'))
+    now = datetime.now(timezone.utc)
+
+    def capture(hours_ago, price, title='a'):
+        return schemas.SnapshotCreate(
+            product_id=prod.id,
+            title=title,
+            price=price,
+            urls=['u'],
+            captured_at=now - timedelta(hours=hours_ago),
+        )
+
+    first = await crud.create_snapshots_bulk(db_session, [capture(5, 10), capture(4.5, 7, 'b')])
+    # same content for 'a' twice (stored + in-batch), then a price change and a return
+    runs = await crud.create_snapshots_bulk(
+        db_session, [capture(4, 10), capture(3, 10), capture(2, 12), capture(1, 10)], dedupe=True
+    )
+    assert runs[0].id == runs[1].id == first[0].id
+    assert runs[1].last_seen_at.replace(tzinfo=timezone.utc) == now - timedelta(hours=3)
+    assert len({runs[1].id, runs[2].id, runs[3].id}) == 3
+
+    # an out-of-order backfill never extends a run
+    (backfill,) = await crud.create_snapshots_bulk(db_session, [capture(6, 10)], dedupe=True)
+    assert backfill.id not in {s.id for s in first + runs}
+
+    history = await crud.get_snapshot_history(db_session, prod.id, days=1)
+    series = [(s.title, s.price, s.captured_at.replace(tzinfo=timezone.utc)) for s in history]
+    assert series == [
+        ('a', 10, now - timedelta(hours=6)),
+        ('a', 10, now - timedelta(hours=5)),
+        ('b', 7, now - timedelta(hours=4.5)),
+        ('a', 10, now - timedelta(hours=3)),
+        ('a', 12, now - timedelta(hours=2)),
+        ('a', 10, now - timedelta(hours=1)),
+    ]
+    streamed = [s async for s in crud.stream_snapshot_history(db_session, prod.id, days=1)]
+    assert streamed == history
+
+    buckets = await crud.get_price_buckets(db_session, prod.id, days=1, bucket='day')
+    assert sum(b.count for b in buckets) == len(history)
+
+    stats = (await crud.get_price_stats(db_session))[prod.id]
+    assert stats['snapshot_count'] == 5
+    assert (await crud.compute_price_stats(db_session))[prod.id] == stats
+
+
+@pytest.mark.asyncio
+async def test_runs_extended_into_a_range_are_found(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='R', prompt='range'))
+    now = datetime.now(timezone.utc)
+
+    def capture(days_ago, price, title):
+        return schemas.SnapshotCreate(
+            product_id=prod.id, title=title, price=price, captured_at=now - timedelta(days=days_ago)
+        )
+
+    # 'old' is first captured outside a 7-day window and last seen inside it
+    await crud.create_snapshots_bulk(
+        db_session, [capture(10, 5, 'old'), capture(8, 9, 'new')], dedupe=True
+    )
+    await crud.create_snapshots_bulk(
+        db_session, [capture(2, 5, 'old'), capture(1, 9, 'new')], dedupe=True
+    )
+
+    history = await crud.get_snapshot_history(db_session, prod.id, days=7)
+    assert [(s.title, s.repeat) for s in history] == [('old', True), ('new', True)]
+    rows = await crud.get_snapshot_history_rows(db_session, prod.id, days=7)
+    assert [(r['title'], r['repeat']) for r in rows] == [('old', True), ('new', True)]
+    full = await crud.get_snapshot_history(db_session, prod.id, days=30)
+    assert [s.repeat for s in full] == [False, False, True, True]
+    start = await crud.get_history_window_start(db_session, prod.id, days=7)
+    assert start.replace(tzinfo=timezone.utc) == now - timedelta(days=2)
+
+    week = now - timedelta(days=7)
+    best = await crud.get_lowest_price_period(db_session, prod.id, start=week)
+    assert best.title == 'old'
+    (item,) = await crud.get_dashboard(db_session, [prod.id], start=week)
+    assert item.best.title == 'old'
+    assert await crud.get_lowest_price_period(db_session, prod.id, start=now) is None
+
+
+@pytest.mark.asyncio
+async def test_urls_are_interned(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='U', prompt='urls'))
+    shared = 'https://shop.example/item'
+    await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(product_id=prod.id, title='a', urls=[shared, 'https://a']),
+            schemas.SnapshotCreate(product_id=prod.id, title='b', urls=['https://b', shared]),
+        ],
+    )
+    hits = url_cache.hits
+    await crud.create_snapshots_bulk(
+        db_session, [schemas.SnapshotCreate(product_id=prod.id, title='c', urls=[shared])]
+    )
+    assert url_cache.hits == hits + 1
+
+    stored = await db_session.scalar(select(func.count()).select_from(Url))
+    assert stored == 3
+    fetched = await crud.get_product(db_session, prod.id)
+    assert [s.urls for s in fetched.snapshots] == [
+        [shared, 'https://a'],
+        ['https://b', shared],
+        [shared],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_deleting_products_leaves_no_url_links(db_session, override_db):
+    gone = await crud.create_product(db_session, schemas.ProductCreate(name='G', prompt='gone'))
+    kept = await crud.create_product(db_session, schemas.ProductCreate(name='K', prompt='kept'))
+    await crud.create_snapshots_bulk(
+        db_session,
+        [
+            schemas.SnapshotCreate(product_id=gone.id, title='a', price=1, urls=['https://a']),
+            schemas.SnapshotCreate(product_id=kept.id, title='b', price=2, urls=['https://b']),
+        ],
+    )
+
+    assert await crud.delete_products(db_session, [gone.id]) == 1
+    links = await db_session.scalars(select(SnapshotUrl.snapshot_id))
+    kept_ids = [s.id for s in (await crud.get_product(db_session, kept.id)).snapshots]
+    assert list(links) == kept_ids
+    assert await crud.get_product(db_session, gone.id) is None
+    assert gone.id not in await crud.get_price_stats(db_session)
+
+    # links of snapshots deleted any other way are swept up
+    await db_session.execute(delete(Snapshot).where(Snapshot.product_id == kept.id))
+    await db_session.commit()
+    assert await crud.delete_orphan_snapshot_urls(db_session) == 1
+
+
+@pytest.mark.asyncio
+async def test_latest_returns_whole_scrape_run(db_session, override_db):
+    prod = await crud.create_product(db_session, schemas.ProductCreate(name='R', prompt='runs'))
+    now = datetime.now(timezone.utc)
+
+    def run_at(minutes_ago):
+        return schemas.ScrapeRunCreate(
+            product_id=prod.id, started_at=now - timedelta(minutes=minutes_ago), model='m'
+        )
+
+    def item(title, price, minutes_ago):
+        return schemas.SnapshotCreate(
+            product_id=prod.id,
+            title=title,
+            price=price,
+            captured_at=now - timedelta(minutes=minutes_ago),
+        )
+
+    await crud.record_scrape_run(db_session, run_at(30), [item('a', 1, 30), item('b', 2, 29)])
+    run, snaps = await crud.record_scrape_run(
+        db_session, run_at(10), [item('a', 1, 10), item('c', 3, 9)]
+    )
+    assert run.item_count == 2
+
+    latest = await crud.get_latest_snapshots(db_session, prod.id)
+    # 'a' was unchanged, so its first-run row was extended and moved to the newest run
+    assert sorted(s.title for s in latest) == ['a', 'c']
+    assert {s.id for s in latest} == {s.id for s in snaps}
+
+    # an empty run does not hide the last run that returned items
+    await crud.record_scrape_run(db_session, run_at(0), [])
+    assert len(await crud.get_latest_snapshots(db_session, prod.id)) == 2
+    runs = await crud.get_scrape_runs(db_session, prod.id, limit=2)
+    assert [r.item_count for r in runs] == [0, 2]
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import app.db as app_db
+
+
+def test_engine_options_from_env():
+    metrics = app_db.PoolMetrics()
+    env = {
+        'DB_POOL_SIZE': '12',
+        'DB_MAX_OVERFLOW': '3',
+        'DB_POOL_TIMEOUT': '2.5',
+        'DB_POOL_RECYCLE': '600',
+        'DB_POOL_PRE_PING': 'false',
+    }
+    opts = app_db.engine_options(env, metrics)
+    assert (opts['pool_size'], opts['max_overflow'], opts['pool_timeout']) == (12, 3, 2.5)
+    assert opts['pool_recycle'] == 600 and opts['pool_pre_ping'] is False
+    assert 'connect_args' not in opts
+
+    bouncer = app_db.engine_options({'DB_PGBOUNCER': '1'}, metrics)['connect_args']
+    assert bouncer['statement_cache_size'] == 0
+    assert bouncer['prepared_statement_cache_size'] == 0
+    assert bouncer['prepared_statement_name_func']() != bouncer['prepared_statement_name_func']()
+
+
+@pytest.mark.asyncio
+async def test_warmup_and_pool_metrics(tmp_path):
+    pytest.importorskip('aiosqlite')
+    metrics = app_db.PoolMetrics()
+    opts = app_db.engine_options({'DB_POOL_SIZE': '3', 'DB_MAX_OVERFLOW': '0'}, metrics)
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "pool.db"}', **opts)
+    try:
+        assert await app_db.warmup_pool(10, engine) == 3
+        assert engine.pool.checkedin() == 3
+        assert metrics.checkouts == 3
+
+        async with engine.connect() as conn:
+            await conn.execute(text('SELECT 1'))
+            stats = app_db.pool_stats(engine, metrics)
+            assert stats['checked_out'] == 1
+            assert stats['utilization'] == pytest.approx(1 / 3)
+        assert app_db.pool_stats(engine, metrics)['checkouts'] == 4
+    finally:
+        await engine.dispose()
@@ -0,0 +1,24 @@
+import math
+
+from app.downsample import lttb
+
+
+def test_lttb_keeps_endpoints_and_threshold():
+    points = [(float(i), math.sin(i / 10)) for i in range(1000)]
+    kept = lttb(points, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert kept == sorted(set(kept))
+
+
+def test_lttb_small_series_untouched():
+    points = [(0.0, 1.0), (1.0, 2.0), (2.0, 0.5)]
+    assert lttb(points, 10) == [0, 1, 2]
+    assert lttb(points, 2) == [0, 2]
+
+
+def test_lttb_picks_spike():
+    points = [(float(i), 0.0) for i in range(100)]
+    points[40] = (40.0, 100.0)
+    kept = lttb(points, 10)
+    assert 40 in kept
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.jobs import JobManager, JobQueueFull
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_with_bounded_concurrency():
+    jobs = JobManager(max_concurrency=2, max_pending=10)
+    gate = asyncio.Event()
+    running = []
+    peak = [0]
+
+    async def work(job):
+        running.append(job.id)
+        peak[0] = max(peak[0], len(running))
+        job.stage = 'waiting'
+        await gate.wait()
+        running.remove(job.id)
+        job.item_count = 1
+
+    submitted = [jobs.submit('test', work) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert [job.status for job in submitted].count('running') == 2
+    assert [job.status for job in submitted].count('queued') == 3
+
+    gate.set()
+    for job in submitted:
+        assert (await jobs.wait(job.id, timeout=1)).status == 'succeeded'
+    assert peak[0] == 2
+    assert all(job.item_count == 1 and job.finished_at for job in submitted)
+    assert jobs.stats()['succeeded'] == 5 and jobs.stats()['pending'] == 0
+
+
+@pytest.mark.asyncio
+async def test_job_failures_rejection_and_pruning():
+    jobs = JobManager(max_concurrency=1, max_pending=1, max_finished=1)
+
+    async def boom(job):
+        raise RuntimeError('model unavailable')
+
+    failed = jobs.submit('test', boom, product_id=7)
+    with pytest.raises(JobQueueFull):
+        jobs.submit('test', boom)
+    await jobs.wait(failed.id, timeout=1)
+    assert failed.status == 'failed' and failed.error == 'RuntimeError: model unavailable'
+    assert jobs.get(failed.id) is failed
+
+    async def ok(job):
+        pass
+
+    second = jobs.submit('test', ok)
+    await jobs.wait(second.id, timeout=1)
+    # only the most recent finished job is kept for lookups
+    assert jobs.get(failed.id) is None and jobs.get(second.id) is second
+    assert (jobs.stats()['failed'], jobs.stats()['rejected']) == (1, 1)
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from scraper.json_stream import JsonArrayParser, parse_json_array
+
+ITEMS = [
+    {'title': 'Brace } and [bracket] in "quotes"', 'price': 9.5, 'urls': ['https://a/{x}']},
+    {'title': 'Escapes \\ é \n', 'price': None, 'urls': []},
+    {'title': 'Nested', 'price': 1, 'urls': ['u'], 'meta': {'tags': [{'k': 'v'}]}},
+]
+
+
+def test_parser_yields_each_object_as_soon_as_it_closes():
+    text = '```json\n' + json.dumps(ITEMS, indent=2) + '\n```'
+    parser = JsonArrayParser()
+    completed_at = []
+    for i, ch in enumerate(text):
+        for item in parser.feed(ch):
+            completed_at.append(i)
+            assert item == ITEMS[len(completed_at) - 1]
+    parser.close()
+    assert parser.count == 3
+    # every object is returned on the character that closes it, not at the end of the array
+    assert [text[i] for i in completed_at] == ['}', '}', '}']
+    assert completed_at[0] < text.index(ITEMS[1]['title'][:7])
+
+
+def test_parser_handles_arbitrary_chunk_boundaries():
+    text = json.dumps(ITEMS)
+    for size in (1, 2, 3, 7, len(text)):
+        parser = JsonArrayParser()
+        items = []
+        for start in range(0, len(text), size):
+            items.extend(parser.feed(text[start : start + size]))
+        parser.close()
+        assert items == ITEMS
+
+
+@pytest.mark.parametrize(
+    'text, message',
+    [
+        ('sorry, no results', 'none was found'),
+        ('[{"title": "a"}, {"title": "b"', 'after 1 items'),
+        ('[{"title": "a"}, 42]', 'Expected a JSON object'),
+        ('[{"title": tru}]', 'Failed to parse JSON object'),
+    ],
+)
+def test_parser_rejects_malformed_output(text, message):
+    parser = JsonArrayParser()
+    with pytest.raises(RuntimeError, match=message):
+        parser.feed(text)
+        parser.close()
+
+
+@pytest.mark.asyncio
+async def test_parse_json_array_over_async_chunks():
+    async def chunks():
+        for piece in ('[', '{"title": "a"', '}, {"title"', ': "b"}', ']'):
+            yield piece
+
+    assert [item async for item in parse_json_array(chunks())] == [{'title': 'a'}, {'title': 'b'}]
+    assert [item async for item in parse_json_array(_aiter(['[]']))] == []
+
+
+async def _aiter(values):
+    for value in values:
+        yield value
@@ -0,0 +1,101 @@
+import random
+
+import pytest
+from openai import InternalServerError
+
+import scraper.openai_client as oc
+from scraper.llm_backend import FakeLLMTransport, fake_backend, resolve_backend
+from scraper.resilience import CircuitBreaker, ResilientCaller, RetryPolicy, TokenBucket
+
+
+def _use_fake(monkeypatch, transport):
+    """Point the OpenAI client at the fake and reset the shared caller, recording backoffs."""
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    caller = ResilientCaller(
+        TokenBucket(0),
+        CircuitBreaker(failure_threshold=100, reset_seconds=60),
+        RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=30, rng=random.Random(0)),
+        sleep=sleep,
+    )
+    monkeypatch.setattr(oc, '_client', fake_backend(transport).client)
+    monkeypatch.setattr(oc, 'upstream', caller)
+    return sleeps
+
+
+def test_resolve_backend_from_settings():
+    fake = resolve_backend(
+        {'LLM_BACKEND': 'fake', 'LLM_FAKE_ITEMS': '4', 'LLM_FAKE_ERROR_RATE': '0.5'}
+    )
+    assert fake.name == 'fake' and fake.model == 'fake-shopping'
+    assert fake.fake.items == 4 and fake.fake.error_rate == 0.5
+
+    compatible = resolve_backend(
+        {
+            'LLM_BACKEND': 'compatible',
+            'LLM_BASE_URL': 'http://localhost:8000/v1',
+            'LLM_MODEL': 'qwen',
+        }
+    )
+    assert str(compatible.client.base_url) == 'http://localhost:8000/v1/'
+    assert compatible.model == 'qwen' and compatible.fake is None
+
+    default = resolve_backend({'OPENAI_API_KEY': 'sk-test'})
+    assert default.name == 'openai' and default.model == 'gpt-4.1-nano'
+
+    with pytest.raises(ValueError, match='LLM_BASE_URL'):
+        resolve_backend({'LLM_BACKEND': 'compatible'})
+    with pytest.raises(ValueError, match='Unknown LLM_BACKEND'):
+        resolve_backend({'LLM_BACKEND': 'anthropic'})
+
+
+@pytest.mark.asyncio
+async def test_fake_answers_buffered_and_streamed_calls(monkeypatch):
+    transport = FakeLLMTransport(items=3, urls_per_item=2, seed=7)
+    _use_fake(monkeypatch, transport)
+
+    items = await oc.fetch_shopping_items('usb hubs')
+    assert items == transport.answer('usb hubs')
+    assert len(items) == 3 and len(items[0]['urls']) == 2
+    assert oc.last_total_tokens() > 0
+
+    streamed = [item async for item in oc.stream_shopping_items('usb hubs')]
+    assert streamed == items
+    assert oc.last_total_tokens() > 0
+    # answers depend only on the seed and the prompt
+    assert FakeLLMTransport(items=3, urls_per_item=2, seed=7).answer('usb hubs') == items
+    assert FakeLLMTransport(items=3, urls_per_item=2, seed=8).answer('usb hubs') != items
+
+
+async def _outcomes(prompts):
+    outcomes = {}
+    for prompt in prompts:
+        try:
+            await oc.fetch_shopping_items(prompt)
+            outcomes[prompt] = 'ok'
+        except InternalServerError:
+            outcomes[prompt] = 'failed'
+    return outcomes
+
+
+@pytest.mark.asyncio
+async def test_fake_errors_are_retried_and_repeatable(monkeypatch):
+    prompts = [f'prompt {i}' for i in range(20)]
+    transport = FakeLLMTransport(items=1, error_rate=0.5, seed=3)
+    sleeps = _use_fake(monkeypatch, transport)
+    forward = await _outcomes(prompts)
+
+    # every simulated 503 is retried, except the last attempt of a prompt that gave up
+    gave_up = list(forward.values()).count('failed')
+    assert transport.errors > gave_up > 0
+    assert len(sleeps) == transport.errors - gave_up
+    assert transport.requests == len(prompts) + len(sleeps)
+
+    # the same seed fails the same attempts, whatever order the prompts arrive in
+    again = FakeLLMTransport(items=1, error_rate=0.5, seed=3)
+    _use_fake(monkeypatch, again)
+    assert await _outcomes(reversed(prompts)) == forward
+    assert again.stats() == transport.stats()
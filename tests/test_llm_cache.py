@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+import scraper.openai_client as oc
+from app.models import LlmResponse
+from scraper.llm_cache import LLMResponseCache, cache_key, normalize_prompt
+
+
+def test_cache_key_normalizes_prompt():
+    assert normalize_prompt('  Gaming   Headsets\tUNDER $150 ') == 'gaming headsets under $150'
+    assert cache_key('Gaming headsets') == cache_key('gaming  HEADSETS ')
+    assert cache_key('gaming headsets') != cache_key('gaming headsets', model='other-model')
+    assert cache_key('gaming headsets') != cache_key('gaming headsets', system_prompt_hash='x')
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_hits_expiry_bypass_and_eviction(engine):
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    cache = LLMResponseCache(maker, ttl_seconds=60, max_entries=2)
+    calls = []
+
+    async def fetch(prompt):
+        calls.append(prompt)
+        oc._last_total_tokens.set(100)
+        return [{'title': prompt, 'price': 1, 'urls': []}]
+
+    assert await cache.fetch('Laptops', fetch) == (
+        [{'title': 'Laptops', 'price': 1, 'urls': []}],
+        False,
+    )
+    assert await cache.fetch(' laptops ', fetch) == (
+        [{'title': 'Laptops', 'price': 1, 'urls': []}],
+        True,
+    )
+    assert calls == ['Laptops']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['tokens_saved']) == (1, 1, 100)
+
+    # bypass skips the lookup but refreshes the stored answer
+    items, hit = await cache.fetch('LAPTOPS', fetch, bypass=True)
+    assert not hit and items[0]['title'] == 'LAPTOPS' and calls == ['Laptops', 'LAPTOPS']
+    assert (await cache.fetch('laptops', fetch))[0][0]['title'] == 'LAPTOPS'
+
+    # expired rows are misses
+    async with maker() as db:
+        await db.execute(
+            update(LlmResponse).values(created_at=datetime.now(timezone.utc) - timedelta(hours=1))
+        )
+        await db.commit()
+    assert (await cache.fetch('laptops', fetch))[1] is False
+
+    # only the two most recently used rows are kept
+    await cache.fetch('phones', fetch)
+    await cache.fetch('laptops', fetch)
+    await cache.fetch('tablets', fetch)
+    async with maker() as db:
+        prompts = set((await db.execute(select(LlmResponse.prompt))).scalars())
+        assert prompts == {'laptops', 'tablets'}
+        assert (await db.execute(select(func.count()).select_from(LlmResponse))).scalar() == 2
+    assert cache.stats()['evictions'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_llm_cache_disabled_and_failing_store_fall_through():
+    calls = []
+
+    async def fetch(prompt):
+        calls.append(prompt)
+        return []
+
+    def broken_session():
+        raise RuntimeError('database unavailable')
+
+    disabled = LLMResponseCache(broken_session, enabled=False)
+    assert await disabled.fetch('p', fetch) == ([], False)
+    failing = LLMResponseCache(broken_session)
+    assert await failing.fetch('p', fetch) == ([], False)
+    assert calls == ['p', 'p'] and failing.stats()['errors'] == 2
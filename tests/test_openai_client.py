@@ -1,6 +1,10 @@
+import asyncio
+import json
 from unittest.mock import AsyncMock
 
+import httpx
 import pytest
+from openai import AsyncOpenAI
 
 import scraper.openai_client as oc
 
@@ -36,3 +40,70 @@ async def test_fetch_shopping_items_invalid_json(monkeypatch):
     monkeypatch.setattr(oc._client.responses, 'create', AsyncMock(return_value=dummy))
     with pytest.raises(RuntimeError):
         await oc.fetch_shopping_items('p')
+
+
+@pytest.mark.asyncio
+async def test_fetch_shopping_items_records_token_usage(monkeypatch):
+    usage = type('U', (), {'total_tokens': 321})
+    dummy = type('R', (), {'output_text': '[]', 'usage': usage})
+    monkeypatch.setattr(oc._client.responses, 'create', AsyncMock(return_value=dummy))
+    assert await oc.fetch_shopping_items('p') == []
+    assert oc.last_total_tokens() == 321
+    oc.clear_total_tokens()
+    assert oc.last_total_tokens() is None
+
+
+def _sse(event):
+    return f'event: {event["type"]}\ndata: {json.dumps(event)}\n\n'.encode()
+
+
+@pytest.mark.asyncio
+async def test_stream_shopping_items_yields_items_before_the_response_ends(monkeypatch):
+    first_seen = asyncio.Event()
+    text = json.dumps(
+        [{'title': 'a', 'price': 1, 'urls': []}, {'title': 'b', 'price': 2, 'urls': []}]
+    )
+    split = text.index('}') + 1
+
+    async def body():
+        for i, chunk in enumerate((text[:5], text[5:split])):
+            yield _sse({'type': 'response.output_text.delta', 'delta': chunk, 'sequence_number': i})
+        # the rest is only sent once the client has handed out the first item
+        await first_seen.wait()
+        yield _sse(
+            {'type': 'response.output_text.delta', 'delta': text[split:], 'sequence_number': 2}
+        )
+        response = {
+            'id': 'resp_1',
+            'object': 'response',
+            'created_at': 0,
+            'model': oc.MODEL,
+            'status': 'completed',
+            'output': [],
+            'usage': {'input_tokens': 5, 'output_tokens': 7, 'total_tokens': 12},
+        }
+        yield _sse({'type': 'response.completed', 'response': response, 'sequence_number': 3})
+
+    def handler(request):
+        assert json.loads(request.content)['stream'] is True
+        return httpx.Response(200, content=body(), headers={'content-type': 'text/event-stream'})
+
+    client = AsyncOpenAI(
+        api_key='sk-test',
+        base_url='http://fake-openai/v1',
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    monkeypatch.setattr(oc, '_client', client)
+
+    async def consume():
+        items = []
+        async for item in oc.stream_shopping_items('p'):
+            items.append(item)
+            first_seen.set()
+        # usage is recorded in the consuming task's context
+        assert oc.last_total_tokens() == 12
+        return items
+
+    items = await asyncio.wait_for(consume(), timeout=5)
+    assert [item['title'] for item in items] == ['a', 'b']
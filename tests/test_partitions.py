@@ -0,0 +1,55 @@
+from datetime import date
+
+from app.partitions import (
+    add_months,
+    adopt_default_rows_sql,
+    create_partition_sql,
+    expire_links_sql,
+    month_start,
+    months_between,
+    parse_partition_name,
+    partition_name,
+)
+
+
+def test_month_arithmetic_wraps_years():
+    assert month_start(date(2025, 3, 17)) == date(2025, 3, 1)
+    assert add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert months_between(date(2025, 11, 20), date(2026, 1, 2)) == [
+        date(2025, 11, 1),
+        date(2025, 12, 1),
+        date(2026, 1, 1),
+    ]
+
+
+def test_partition_names_round_trip():
+    name = partition_name(date(2025, 7, 1))
+    assert name == 'snapshots_p2025_07'
+    assert parse_partition_name(name) == date(2025, 7, 1)
+    assert parse_partition_name('snapshots_default') is None
+
+
+def test_create_partition_sql_covers_one_month():
+    sql = create_partition_sql(date(2025, 12, 9))
+    assert 'snapshots_p2025_12 PARTITION OF snapshots' in sql
+    assert "FROM ('2025-12-01 00:00:00+00') TO ('2026-01-01 00:00:00+00')" in sql
+
+
+def test_new_partition_adopts_rows_parked_in_default():
+    statements = adopt_default_rows_sql(date(2025, 12, 1))
+    # rows leave DEFAULT before the partition is created, then return through the parent
+    assert statements[1].startswith('WITH moved AS (DELETE FROM snapshots_default WHERE ')
+    assert "captured_at < '2026-01-01 00:00:00+00' RETURNING *" in statements[1]
+    assert statements[2] == create_partition_sql(date(2025, 12, 1))
+    assert statements[3] == 'INSERT INTO snapshots SELECT * FROM snapshots_p2025_12_staging'
+    assert statements[-1] == 'DROP TABLE snapshots_p2025_12_staging'
+
+
+def test_expiring_a_partition_removes_its_url_links():
+    detached = expire_links_sql('snapshots_p2024_01', archive=True)
+    assert detached[0].startswith('CREATE TABLE IF NOT EXISTS snapshots_p2024_01_urls AS')
+    assert detached[1] == (
+        'DELETE FROM snapshot_urls su USING snapshots_p2024_01 s WHERE s.id = su.snapshot_id'
+    )
+    assert expire_links_sql('snapshots_p2024_01', archive=False) == detached[1:]
@@ -0,0 +1,151 @@
+import asyncio
+import io
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import crud, schemas
+from app.models import Base
+from app.urls import url_cache
+from scraper.llm_cache import LLMResponseCache
+from scraper.pipeline import scrape_many, stream_run
+from scraper.run_once import read_prompts
+
+
+@pytest.fixture
+async def file_engine(tmp_path):
+    """File-backed SQLite with a real pool, so concurrent sessions get their own connections."""
+    pytest.importorskip('aiosqlite')
+    engine = create_async_engine(f'sqlite+aiosqlite:///{tmp_path / "batch.db"}')
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    url_cache.clear()
+    yield engine
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_scrape_many_limits_concurrency_and_isolates_failures(file_engine):
+    maker = async_sessionmaker(bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+    async with maker() as db:
+        existing = await crud.create_product(db, schemas.ProductCreate(name='Old', prompt='old'))
+
+    in_flight = [0]
+    peak = [0]
+
+    async def fake_fetch(prompt):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0.01)
+        in_flight[0] -= 1
+        if prompt == 'bad':
+            raise RuntimeError('Failed to parse JSON')
+        return [{'title': f'{prompt}-item', 'price': 3, 'urls': [f'https://x/{prompt}']}]
+
+    finished = []
+    targets = [(existing.id, 'old'), (None, 'new-1'), (None, 'bad'), (None, 'new-2')]
+    results = await scrape_many(
+        targets, maker, concurrency=2, fetch=fake_fetch, on_result=finished.append
+    )
+
+    assert peak[0] == 2
+    assert [r.prompt for r in results] == ['old', 'new-1', 'bad', 'new-2']
+    assert sorted(r.prompt for r in finished) == sorted(r.prompt for r in results)
+    assert [r.ok for r in results] == [True, True, False, True]
+    assert results[2].error == 'RuntimeError: Failed to parse JSON' and results[2].run_id is None
+    assert results[0].product_id == existing.id
+    assert all(r.run_id is not None and r.fetch_ms is not None for r in results if r.ok)
+
+    async with maker() as db:
+        prompts = await crud.get_product_prompts(db)
+        assert [prompt for _, prompt in prompts] == ['old', 'new-1', 'new-2']
+        latest = await crud.get_latest_snapshots(db, results[1].product_id)
+        assert [snap.title for snap in latest] == ['new-1-item']
+
+
+@pytest.mark.asyncio
+async def test_stream_run_stores_items_as_they_arrive(file_engine):
+    maker = async_sessionmaker(bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+    async with maker() as db:
+        product = await crud.create_product(db, schemas.ProductCreate(name='p', prompt='p'))
+    cache = LLMResponseCache(maker)
+
+    async def visible_titles():
+        async with maker() as other:
+            return [snap.title for snap in await crud.get_latest_snapshots(other, product.id)]
+
+    async def fake_stream(prompt):
+        yield {'title': 'first', 'price': 1, 'urls': ['https://x/1']}
+        # committed and readable by other sessions before the model finishes
+        assert await visible_titles() == ['first']
+        yield {'title': 'second', 'price': 2, 'urls': []}
+
+    counts = []
+    async with maker() as db:
+        run, fetched = await stream_run(
+            db, product.id, 'p', stream=fake_stream, cache=cache, on_items=counts.append
+        )
+    assert counts == [1, 2] and run.item_count == 2 and run.duration_ms is not None
+    assert fetched.first_item_ms is not None and fetched.first_item_ms <= run.duration_ms
+    assert await visible_titles() == ['first', 'second']
+
+    # the complete answer was cached, so the next run is stored in one go without streaming
+    async with maker() as db:
+        cached_run, cached = await stream_run(db, product.id, 'p', stream=None, cache=cache)
+    assert cached.cache_hit and cached_run.item_count == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_run_keeps_items_stored_before_a_failure(file_engine):
+    maker = async_sessionmaker(bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def broken_stream(prompt):
+        yield {'title': 'kept', 'price': 5, 'urls': []}
+        raise RuntimeError('Model output ended inside the JSON list after 1 items')
+
+    async def streamed(prompt):
+        for title in ('s1', 's2'):
+            yield {'title': title, 'price': 1, 'urls': []}
+
+    results = await scrape_many([(None, 'bad')], maker, stream=broken_stream)
+    assert results[0].error.startswith('RuntimeError: Model output ended')
+    async with maker() as db:
+        runs = await crud.get_scrape_runs(db, results[0].product_id, limit=5)
+        assert [(r.item_count, r.duration_ms is not None) for r in runs] == [(1, True)]
+
+    results = await scrape_many([(None, 'good')], maker, stream=streamed)
+    assert results[0].ok and results[0].item_count == 2 and results[0].first_item_ms is not None
+
+
+@pytest.mark.asyncio
+async def test_scrape_many_refreshes_stored_products_past_the_response_cache(file_engine):
+    maker = async_sessionmaker(bind=file_engine, class_=AsyncSession, expire_on_commit=False)
+    cache = LLMResponseCache(maker)
+    calls = []
+
+    async def fake_fetch(prompt):
+        calls.append(prompt)
+        return [{'title': f'{prompt}-{len(calls)}', 'price': 1, 'urls': []}]
+
+    first = await scrape_many([(None, 'a'), (None, 'b')], maker, fetch=fake_fetch, cache=cache)
+    assert [r.cache_hit for r in first] == [False, False]
+
+    # both prompts now have products: by id (--all-products) or by prompt (--prompts-file)
+    refreshed = await scrape_many(
+        [(first[0].product_id, 'a'), (None, 'b'), (None, 'c')], maker, fetch=fake_fetch, cache=cache
+    )
+    assert [r.cache_hit for r in refreshed] == [False, False, False]
+    assert sorted(calls) == ['a', 'a', 'b', 'b', 'c']
+    assert refreshed[1].product_id == first[1].product_id
+    assert cache.stats()['bypasses'] == 2
+
+    # a new product with an already answered prompt is still served from the cache
+    async with maker() as db:
+        await crud.delete_products(db, [first[0].product_id])
+    (recreated,) = await scrape_many([(None, 'a')], maker, fetch=fake_fetch, cache=cache)
+    assert recreated.cache_hit and len(calls) == 5
+
+
+def test_read_prompts_skips_blanks_comments_and_repeats():
+    stream = io.StringIO('laptops under $800\n\n# weekly\n  headsets  \nlaptops under $800\n')
+    assert read_prompts(stream) == ['laptops under $800', 'headsets']
@@ -0,0 +1,110 @@
+"""
+Query-plan regression tests for the snapshot read paths.
+
+Each test captures the SQL that a crud reader actually emits and runs it through
+SQLite's EXPLAIN QUERY PLAN on a seeded dataset, asserting that the composite
+snapshot indexes are used instead of a full scan plus sort.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert, text, update
+
+from app import crud
+from app.models import Product, ScrapeRun, Snapshot
+
+LATEST_INDEX = 'ix_snapshots_product_id_captured_at'
+PRICE_INDEX = 'ix_snapshots_product_id_price_captured_at'
+RUN_INDEX = 'ix_scrape_runs_product_id_started_at'
+
+
+@pytest.fixture
+async def seeded(db_session):
+    """Seed a handful of products with enough snapshots to make a scan costly."""
+    now = datetime.now(timezone.utc)
+    products = [{'id': i, 'name': f'p{i}', 'prompt': f'p{i}'} for i in range(1, 21)]
+    await db_session.execute(insert(Product), products)
+    rows = [
+        {
+            'product_id': pid,
+            'title': f'item {n}',
+            'price': None if n % 7 == 0 else 10 + (n * pid) % 50,
+            'captured_at': now - timedelta(hours=n),
+        }
+        for pid in range(1, 21)
+        for n in range(200)
+    ]
+    await db_session.execute(insert(Snapshot), rows)
+    await db_session.commit()
+    await db_session.execute(text('ANALYZE'))
+    return db_session
+
+
+async def _plans_for(db_session, engine, call):
+    """Run a crud call, returning the EXPLAIN QUERY PLAN output of every snapshot query."""
+    captured = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM snapshots' in statement and not statement.startswith('EXPLAIN'):
+            captured.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', _capture)
+    try:
+        await call()
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', _capture)
+
+    assert captured, 'expected the crud call to query the snapshots table'
+    plans = []
+    for statement, parameters in captured:
+        conn = await db_session.connection()
+        raw = await conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters)
+        plans.append(' | '.join(row[-1] for row in raw.fetchall()))
+    return plans
+
+
+@pytest.mark.asyncio
+async def test_latest_snapshots_uses_product_captured_index(seeded, engine):
+    plans = await _plans_for(seeded, engine, lambda: crud.get_latest_snapshots(seeded, 3))
+    assert any(LATEST_INDEX in plan for plan in plans), plans
+    assert not any('TEMP B-TREE' in plan for plan in plans), plans
+
+
+@pytest.mark.asyncio
+async def test_latest_run_uses_run_indexes(seeded, engine):
+    run = ScrapeRun(product_id=3, started_at=datetime.now(timezone.utc), item_count=1)
+    seeded.add(run)
+    await seeded.flush()
+    await seeded.execute(
+        update(Snapshot)
+        .where(Snapshot.product_id == 3, Snapshot.title == 'item 1')
+        .values(run_id=run.id)
+    )
+    plans = await _plans_for(seeded, engine, lambda: crud.get_latest_snapshots(seeded, 3))
+    assert 'ix_snapshots_run_id' in plans[0] and RUN_INDEX in plans[0], plans
+    assert len(plans) == 1, plans
+
+
+@pytest.mark.asyncio
+async def test_history_uses_product_captured_index(seeded, engine):
+    plans = await _plans_for(seeded, engine, lambda: crud.get_snapshot_history(seeded, 3, 3))
+    assert any(LATEST_INDEX in plan for plan in plans), plans
+    assert not any('SCAN snapshots' in plan for plan in plans), plans
+
+
+@pytest.mark.asyncio
+async def test_lowest_price_uses_partial_price_index(seeded, engine):
+    end = datetime.now(timezone.utc)
+    plans = await _plans_for(
+        seeded, engine, lambda: crud.get_lowest_price_period(seeded, 3, None, end)
+    )
+    assert any(PRICE_INDEX in plan for plan in plans), plans
+    assert not any('TEMP B-TREE' in plan for plan in plans), plans
+
+
+@pytest.mark.asyncio
+async def test_product_snapshot_eager_load_uses_index(seeded, engine):
+    plans = await _plans_for(seeded, engine, lambda: crud.get_product(seeded, 3))
+    assert any('USING INDEX' in plan for plan in plans), plans
+    assert not any('SCAN snapshots' in plan for plan in plans), plans
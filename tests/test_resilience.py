@@ -0,0 +1,199 @@
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, BadRequestError, InternalServerError
+
+import scraper.openai_client as oc
+from scraper.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientCaller,
+    RetryPolicy,
+    TokenBucket,
+    parse_duration,
+    retry_after,
+)
+
+
+def _response_body(items):
+    """Minimal Responses API payload whose output_text is the JSON-encoded items."""
+    return {
+        'id': 'resp_1',
+        'object': 'response',
+        'created_at': 0,
+        'model': oc.MODEL,
+        'status': 'completed',
+        'output': [
+            {
+                'type': 'message',
+                'id': 'msg_1',
+                'role': 'assistant',
+                'status': 'completed',
+                'content': [{'type': 'output_text', 'text': json.dumps(items), 'annotations': []}],
+            }
+        ],
+        'usage': {'input_tokens': 10, 'output_tokens': 20, 'total_tokens': 30},
+    }
+
+
+def _fake_upstream(monkeypatch, handler, threshold=3):
+    """Point the OpenAI client at an in-process fake server and reset the shared caller."""
+    client = AsyncOpenAI(
+        api_key='sk-test',
+        base_url='http://fake-openai/v1',
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+
+    caller = ResilientCaller(
+        TokenBucket(0),
+        CircuitBreaker(failure_threshold=threshold, reset_seconds=60),
+        RetryPolicy(max_attempts=4, base_delay=0.5, max_delay=30, rng=random.Random(0)),
+        sleep=sleep,
+    )
+    monkeypatch.setattr(oc, '_client', client)
+    monkeypatch.setattr(oc, 'upstream', caller)
+    return caller, sleeps
+
+
+def test_retry_after_header_parsing():
+    assert parse_duration('6m0s') == 360 and parse_duration('20ms') == 0.02
+    assert parse_duration('1.5s') == 1.5 and parse_duration('soon') is None
+    assert retry_after(httpx.Headers({'retry-after-ms': '250', 'retry-after': '9'})) == 0.25
+    assert retry_after(httpx.Headers({'retry-after': '3'})) == 3
+    date = 'Wed, 21 Oct 2015 07:28:30 GMT'
+    assert retry_after(httpx.Headers({'retry-after': date}), now=1445412500) == 10
+    limited = {
+        'x-ratelimit-remaining-requests': '0',
+        'x-ratelimit-reset-requests': '2s',
+        'x-ratelimit-remaining-tokens': '0',
+        'x-ratelimit-reset-tokens': '1m0s',
+    }
+    assert retry_after(httpx.Headers(limited)) == 60
+    assert retry_after(httpx.Headers({'x-ratelimit-reset-requests': '2s'})) is None
+
+
+def test_token_bucket_bursts_then_paces_and_pauses():
+    now = [0.0]
+    bucket = TokenBucket(60, capacity=2, clock=lambda: now[0])
+    assert [bucket.reserve() for _ in range(4)] == [0.0, 0.0, 1.0, 2.0]
+    now[0] = 10.0  # refilled to capacity, not beyond
+    assert [bucket.reserve() for _ in range(3)] == [0.0, 0.0, 1.0]
+    now[0] = 20.0
+    bucket.pause(5)
+    assert bucket.reserve() == 5.0
+
+
+def test_circuit_breaker_opens_half_opens_and_closes():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    now[0] = 10.0
+    breaker.before_call()  # the single half-open trial
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    now[0] = 20.0
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.opened == 2
+
+
+@pytest.mark.asyncio
+async def test_fetch_retries_rate_limits_and_server_errors(monkeypatch):
+    responses = [
+        httpx.Response(
+            429, json={'error': {'message': 'slow down'}}, headers={'retry-after-ms': '1500'}
+        ),
+        httpx.Response(503, json={'error': {'message': 'overloaded'}}),
+        httpx.Response(200, json=_response_body([{'title': 'ok', 'price': 5, 'urls': []}])),
+    ]
+    seen = []
+
+    def handler(request):
+        seen.append(request.url.path)
+        return responses[len(seen) - 1]
+
+    caller, sleeps = _fake_upstream(monkeypatch, handler)
+    items = await oc.fetch_shopping_items('headsets')
+    assert items == [{'title': 'ok', 'price': 5, 'urls': []}]
+    assert seen == ['/v1/responses'] * 3
+    # the 429 waits at least the server's hint; the 503 falls back to jittered backoff
+    assert 1.5 <= sleeps[0] <= 1.65 and 0.5 <= sleeps[1] <= 1.0
+    assert caller.stats()['retries'] == 2 and caller.stats()['breaker_state'] == 'closed'
+    assert oc.last_total_tokens() == 30
+
+
+@pytest.mark.asyncio
+async def test_fetch_fails_fast_once_the_circuit_opens(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(1)
+        return httpx.Response(500, json={'error': {'message': 'down'}})
+
+    caller, _ = _fake_upstream(monkeypatch, handler, threshold=3)
+    with pytest.raises(InternalServerError):
+        await oc.fetch_shopping_items('p')
+    assert len(seen) == 3 and caller.breaker.state == 'open'
+    with pytest.raises(CircuitOpenError):
+        await oc.fetch_shopping_items('p')
+    assert len(seen) == 3 and caller.stats()['breaker_rejected'] == 1
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(1)
+        return httpx.Response(400, json={'error': {'message': 'bad input'}})
+
+    caller, sleeps = _fake_upstream(monkeypatch, handler)
+    with pytest.raises(BadRequestError):
+        await oc.fetch_shopping_items('p')
+    assert len(seen) == 1 and sleeps == [] and caller.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_frees_the_trial_slot():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=lambda: now[0])
+    caller = ResilientCaller(TokenBucket(0), breaker, RetryPolicy(max_attempts=1))
+    breaker.record_failure()
+    now[0] = 10.0
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def slow():
+        started.set()
+        await release.wait()
+        return 'late'
+
+    trial = asyncio.create_task(caller.call(slow))
+    await started.wait()
+    with pytest.raises(CircuitOpenError):
+        await caller.call(slow)  # only one trial at a time
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    # the cancelled trial had no outcome, so the next call becomes the trial and can close it
+    async def ok():
+        return 'ok'
+
+    assert breaker.state == 'half_open'
+    assert await caller.call(ok) == 'ok'
+    assert breaker.state == 'closed'
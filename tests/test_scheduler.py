@@ -0,0 +1,102 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, schemas
+from scraper.scheduler import RatePacer, RefreshScheduler, failure_delay, next_due
+
+
+def test_rate_pacer_spaces_requests_within_both_budgets():
+    now = [0.0]
+    # 60 rpm allows one request per second; 6000 tpm at 200 tokens allows one per 2 seconds
+    pacer = RatePacer(60, 6000, clock=lambda: now[0])
+    assert [pacer.reserve(200) for _ in range(3)] == [0.0, 2.0, 4.0]
+    # small requests are limited by the request budget alone
+    now[0] = 100.0
+    assert [pacer.reserve(10) for _ in range(3)] == [0.0, 1.0, 2.0]
+    # idle time is not banked into a burst
+    now[0] = 1000.0
+    assert pacer.reserve() == 0.0 and pacer.reserve() == 1.0
+
+
+def test_next_due_applies_jitter_around_the_interval():
+    now = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    last = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+    rng = random.Random(1)
+    assert next_due(None, timedelta(hours=6), 0.1, now, rng) == now
+    assert next_due(last, timedelta(hours=6), 0, now, rng) == last + timedelta(hours=6)
+    dues = {next_due(last, timedelta(hours=6), 0.1, now, rng) for _ in range(50)}
+    assert len(dues) > 1
+    assert all(
+        last + timedelta(hours=5, minutes=24) <= due <= last + timedelta(hours=6, minutes=36)
+        for due in dues
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_failures_back_off_up_to_the_interval_and_stay_scheduled(engine):
+    six_hours = timedelta(hours=6)
+    assert failure_delay(1, six_hours) == timedelta(minutes=1)
+    assert failure_delay(3, six_hours) == timedelta(minutes=4)
+    assert failure_delay(42, six_hours) == failure_delay(10_000, six_hours) == six_hours
+
+    async def failing_fetch(prompt):
+        raise RuntimeError('model unavailable')
+
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    scheduler = RefreshScheduler(maker, default_interval=six_hours, fetch=failing_fetch)
+    async with maker() as db:
+        product = await crud.create_product(db, schemas.ProductCreate(name='x', prompt='p'))
+    await scheduler.reload()
+    entry = scheduler.products[product.id]
+    entry.failures = 100
+    entry.running = True
+    await scheduler._slots.acquire()
+    await scheduler._refresh(entry)
+    # a long failure streak still puts the product back on the schedule
+    assert entry.failures == 101 and not entry.running
+    assert entry.due_at > datetime.now(timezone.utc) + timedelta(hours=5)
+
+
+@pytest.mark.asyncio
+async def test_scheduler_refreshes_due_products_and_resumes_after_restart(engine):
+    maker = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with maker() as db:
+        never = await crud.create_product(db, schemas.ProductCreate(name='new', prompt='p-new'))
+        fresh = await crud.create_product(db, schemas.ProductCreate(name='fresh', prompt='p-fresh'))
+        off = await crud.create_product(db, schemas.ProductCreate(name='off', prompt='p-off'))
+        await crud.set_refresh_interval(db, off.id, 0)
+        await crud.create_snapshots_bulk(
+            db, [schemas.SnapshotCreate(product_id=fresh.id, title='f', price=1)]
+        )
+
+    fetched = []
+
+    async def fake_fetch(prompt):
+        fetched.append(prompt)
+        return [{'title': 'item', 'price': 9, 'urls': []}]
+
+    def make_scheduler():
+        return RefreshScheduler(
+            maker, default_interval=timedelta(hours=1), max_concurrency=1, fetch=fake_fetch
+        )
+
+    scheduler = make_scheduler()
+    await asyncio.wait_for(scheduler.run(asyncio.Event(), once=True), timeout=5)
+    assert fetched == ['p-new']
+    assert set(scheduler.products) == {never.id, fresh.id}
+    assert scheduler.refreshed == 1
+    assert scheduler.products[never.id].due_at > datetime.now(timezone.utc) + timedelta(minutes=50)
+
+    async with maker() as db:
+        assert [s.title for s in await crud.get_latest_snapshots(db, never.id)] == ['item']
+
+    # a restarted scheduler derives due times from the stored runs, so nothing is due yet
+    restarted = make_scheduler()
+    await asyncio.wait_for(restarted.run(asyncio.Event(), once=True), timeout=5)
+    assert fetched == ['p-new']
+    entry, wake_at = restarted.pop_due(datetime.now(timezone.utc))
+    assert entry is None and wake_at is not None
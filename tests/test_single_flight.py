@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+import scraper.openai_client as oc
+from scraper.pipeline import scrape_many
+from scraper.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_prompts_share_one_upstream_call(monkeypatch):
+    calls = []
+    release = asyncio.Event()
+
+    async def fake_create(**kwargs):
+        calls.append(kwargs['input'][1]['content'])
+        await release.wait()
+        usage = type('U', (), {'total_tokens': 50})
+        return type(
+            'R', (), {'output_text': '[{"title": "t", "price": 1, "urls": []}]', 'usage': usage}
+        )
+
+    monkeypatch.setattr(oc._client.responses, 'create', fake_create)
+    monkeypatch.setattr(oc, 'coalescer', SingleFlight(capture=oc.last_total_tokens))
+
+    async def fetch(prompt):
+        items = await oc.fetch_shopping_items(prompt)
+        return items, oc.last_total_tokens()
+
+    tasks = [asyncio.create_task(fetch(p)) for p in ('Laptops', ' laptops', 'LAPTOPS ', 'phones')]
+    await asyncio.sleep(0)
+    assert oc.coalescer.stats()['in_flight'] == 2
+    release.set()
+    results = await asyncio.gather(*tasks)
+
+    assert sorted(calls) == ['Laptops', 'phones']
+    assert all(items == [{'title': 't', 'price': 1, 'urls': []}] for items, _ in results)
+    # every caller sees the shared call's usage, so cache writes keep the real cost
+    assert [tokens for _, tokens in results] == [50, 50, 50, 50]
+    stats = oc.coalescer.stats()
+    assert stats['calls'] == 4 and stats['flights'] == 2
+    assert stats['coalesced'] == 2 and stats['in_flight'] == 0
+
+    # once finished, the next request goes upstream again
+    await oc.fetch_shopping_items('laptops')
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_batch_with_duplicate_prompts_calls_the_model_once(monkeypatch):
+    calls = []
+
+    async def fake_create(**kwargs):
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return type('R', (), {'output_text': '[]'})
+
+    monkeypatch.setattr(oc._client.responses, 'create', fake_create)
+    monkeypatch.setattr(oc, 'coalescer', SingleFlight(capture=oc.last_total_tokens))
+    results = await scrape_many(
+        [(1, 'headsets'), (2, 'Headsets'), (3, 'keyboards')], None, fetch=oc.fetch_shopping_items
+    )
+    assert all(r.ok for r in results) and len(calls) == 2
+    assert oc.coalescer.stats()['coalesced'] == 1
+
+
+@pytest.mark.asyncio
+async def test_followers_replay_the_stream_and_share_its_error():
+    flights = SingleFlight()
+    step = asyncio.Event()
+
+    async def source():
+        yield 'a'
+        await step.wait()
+        yield 'b'
+        raise RuntimeError('stream cut off')
+
+    leader = flights.join('k', source)
+    leader_seen = []
+
+    async def follow(flight, seen):
+        try:
+            async for item in flight.follow():
+                seen.append(item)
+        except RuntimeError as e:
+            seen.append(str(e))
+
+    leading = asyncio.create_task(follow(leader, leader_seen))
+    while not leader.items:
+        await asyncio.sleep(0)
+
+    # a late streaming caller replays 'a', and a buffered caller waits for the outcome
+    late = flights.join('k', source)
+    assert late is leader
+    late_seen = []
+    following = asyncio.create_task(follow(late, late_seen))
+    buffered = asyncio.create_task(flights.join('k', source).result())
+    step.set()
+    await asyncio.gather(leading, following)
+    assert leader_seen == late_seen == ['a', 'b', 'stream cut off']
+    with pytest.raises(RuntimeError, match='stream cut off'):
+        await buffered
+    assert flights.stats()['coalesced'] == 2 and flights.stats()['in_flight'] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_cancel_the_request():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def source():
+        await release.wait()
+        yield 1
+
+    first = asyncio.create_task(flights.join('k', source).result())
+    second = asyncio.create_task(flights.join('k', source).result())
+    await asyncio.sleep(0)
+    first.cancel()
+    release.set()
+    assert await second == [1]
+    assert first.cancelled()